@@ -0,0 +1,87 @@
+"""
+Benchmark of the write path of the ActionController.
+
+For each number of UEs, every UE receives a handover command at each step and the time spent in
+create_control_action is measured for the list of tuples and the NumPy array inputs, for each durability policy.
+The previous implementation, which re-opens both files and flushes them after every action, is measured as reference.
+
+Usage:
+    python benchmarks/bench_action_controller.py --ues 7 70 700 1000 --steps 200
+"""
+import os
+import sys
+import time
+import json
+import argparse
+import tempfile
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from nsoran.base.action_controller import ActionController
+
+HEADER = ['timestamp', 'ueId', 'nrCellId']
+
+
+def legacy_create_control_action(directory, log_filename, control_filename, timestamp, actions):
+    """Write path of the ActionController before the files were kept open"""
+    with open(os.path.join(directory, log_filename), 'a') as logFile:
+        with open(os.path.join(directory, control_filename), 'a') as file:
+            for action in actions:
+                control_action = f"{timestamp},{','.join(map(str, action))}\n"
+                file.write(control_action)
+                logFile.write(control_action)
+                file.flush()
+                logFile.flush()
+
+
+def run_case(num_ues: int, steps: int, durability: str, as_array: bool) -> float:
+    """Return the mean time per step in microseconds"""
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as sim_path:
+        batches = [np.column_stack([np.arange(1, num_ues + 1), rng.integers(2, 9, num_ues)]) for _ in range(steps)]
+        if not as_array:
+            batches = [[tuple(action) for action in batch.tolist()] for batch in batches]
+
+        if durability == 'legacy':
+            ActionController(sim_path, 'TsActions.txt', 'ts_actions_for_ns3.csv', HEADER).close()
+            start = time.perf_counter_ns()
+            for step, batch in enumerate(batches):
+                legacy_create_control_action(sim_path, 'TsActions.txt', 'ts_actions_for_ns3.csv', step * 100, batch)
+            elapsed = time.perf_counter_ns() - start
+        else:
+            controller = ActionController(sim_path, 'TsActions.txt', 'ts_actions_for_ns3.csv', HEADER, durability=durability)
+            start = time.perf_counter_ns()
+            for step, batch in enumerate(batches):
+                controller.create_control_action(step * 100, batch)
+            elapsed = time.perf_counter_ns() - start
+            controller.close()
+    return elapsed / steps / 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of the ActionController write path')
+    parser.add_argument('--ues', type=int, nargs='+', default=[7, 70, 140, 350, 700, 1000], help='number of UEs (actions per step)')
+    parser.add_argument('--steps', type=int, default=200, help='number of steps for each case')
+    parser.add_argument('--durability', nargs='+', default=['legacy'] + ActionController.durability_policies)
+    parser.add_argument('--output', type=str, default=None, help='optional path of the JSON results')
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'UEs':>6} {'durability':>10} {'input':>6} {'us/step':>10}")
+    for num_ues in args.ues:
+        for durability in args.durability:
+            for as_array in (False, True):
+                if durability == 'legacy' and as_array:
+                    continue
+                mean_us = run_case(num_ues, args.steps, durability, as_array)
+                results.append({'ues': num_ues, 'durability': durability, 'input': 'array' if as_array else 'tuples',
+                                'us_per_step': mean_us})
+                print(f"{num_ues:>6} {durability:>10} {'array' if as_array else 'tuples':>6} {mean_us:>10.1f}")
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2)
+
+
+if __name__ == '__main__':
+    main()
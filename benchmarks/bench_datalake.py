@@ -0,0 +1,213 @@
+"""
+Micro-benchmark of the SQLiteDatabaseAPI.
+
+For each number of UEs per gNB and episode length, synthetic KPMs are generated for the five tables of the Datalake,
+i.e., every UE reports in each table at each indication, and the following metrics are measured:
+    - insert throughput (rows/s) of the row by row path of the csv files (insert_data) and of the batch path (insert_rows),
+      committing once per indication as the environment does
+    - read_kpms latency of a query on a single table and of a query joining three tables
+    - read_table latency of the du table
+    - Python memory peak (tracemalloc) of the ingestion and query of one indication, and size of the database file
+The results are emitted as JSON and can be compared with a baseline, flagging the regressions.
+The default cases are slow: they take about forty minutes, dominated by the 7M rows of 20 UEs per gNB over 10000 indications
+and of 200 UEs per gNB over 1000 indications (both ingestion paths write each case); the 70M rows of 200 UEs per gNB over
+10000 indications take about three hours, thus they are skipped by the default --max-rows and run with --max-rows 0.
+Smaller grids (e.g., --indications 10 100 1000 --max-rows 2000000) take a few minutes.
+
+Usage:
+    python benchmarks/bench_datalake.py run --ues 2 20 200 --indications 10 100 1000 10000 --output results.json
+    python benchmarks/bench_datalake.py run --ues 200 --indications 10000 --max-rows 0 --output long_episode.json
+    python benchmarks/bench_datalake.py compare baseline.json results.json --threshold 0.2
+"""
+import os
+import sys
+import time
+import json
+import sqlite3
+import argparse
+import platform
+import tempfile
+import tracemalloc
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from nsoran.base.datalake import SQLiteDatabaseAPI
+
+NUM_GNBS = 7
+TABLES = {
+    'lte_cu_cp': SQLiteDatabaseAPI.lte_cu_cp_keys,
+    'gnb_cu_cp': SQLiteDatabaseAPI.gnb_cu_cp_keys,
+    'lte_cu_up': SQLiteDatabaseAPI.lte_cu_up_keys,
+    'gnb_cu_up': SQLiteDatabaseAPI.gnb_cu_up_keys,
+    'du': SQLiteDatabaseAPI.du_keys,
+}
+SINGLE_TABLE_KPMS = ['RRU.PrbUsedDl', 'DRB.MeanActiveUeDl']
+JOIN_KPMS = ['RRU.PrbUsedDl', 'L3 serving SINR', 'DRB.PdcpSduBitRateDl.UEID (pdcpThroughput)']
+# Direction of each metric, i.e., whether higher values are better
+METRICS = {
+    'insert_rows_per_s': True,
+    'batch_insert_rows_per_s': True,
+    'read_kpms_ms_p50': False,
+    'read_kpms_ms_p95': False,
+    'read_kpms_join_ms_p50': False,
+    'read_kpms_join_ms_p95': False,
+    'read_table_ms': False,
+    'peak_python_memory_mb': False,
+    'db_size_mb': False,
+}
+
+
+def generate_rows(table_name: str, timestamp: int, num_ues: int, rng: np.random.Generator) -> list[dict]:
+    """Synthetic rows of a table at one indication, one for each UE, keyed as in the csv files"""
+    keys = TABLES[table_name]
+    values = rng.random((num_ues, len(keys))) * 100
+    serving_cells = rng.integers(2, NUM_GNBS + 2, num_ues)
+    rows = []
+    for ue in range(num_ues):
+        row = {key: (int(value) if kind == 'INTEGER' else float(value)) for (key, kind), value in zip(keys.items(), values[ue])}
+        row['timestamp'] = timestamp
+        row['ueImsiComplete'] = ue + 1
+        if 'cellId' in row:
+            row['cellId'] = 1 if table_name.startswith('lte') else int(serving_cells[ue])
+        if 'nrCellId' in row:
+            row['nrCellId'] = int(serving_cells[ue])
+        rows.append(row)
+    return rows
+
+
+def insert_indication(datalake: SQLiteDatabaseAPI, rows: dict, batch: bool):
+    datalake.acquire_connection()
+    for table_name, table_rows in rows.items():
+        if batch:
+            columns = [SQLiteDatabaseAPI.sanitize_column_name(key) for key in TABLES[table_name]]
+            datalake.insert_rows(table_name, columns, [tuple(row.values()) for row in table_rows])
+        else:
+            for row in table_rows:
+                datalake.insert_data(table_name, row)
+    datalake.release_connection()
+
+
+def timed_queries(datalake: SQLiteDatabaseAPI, timestamps: list, required_kpms: list) -> np.ndarray:
+    latencies = []
+    for timestamp in timestamps:
+        start = time.perf_counter()
+        datalake.read_kpms(timestamp, required_kpms)
+        latencies.append(time.perf_counter() - start)
+    return np.array(latencies) * 1e3
+
+
+def run_case(ues_per_gnb: int, indications: int, queries: int) -> dict:
+    num_ues = ues_per_gnb * NUM_GNBS
+    rng = np.random.default_rng(0)
+    result = {'ues_per_gnb': ues_per_gnb, 'indications': indications, 'rows': num_ues * len(TABLES) * indications}
+    with tempfile.TemporaryDirectory() as row_path, tempfile.TemporaryDirectory() as batch_path:
+        for path, batch, metric in ((row_path, False, 'insert_rows_per_s'), (batch_path, True, 'batch_insert_rows_per_s')):
+            datalake = SQLiteDatabaseAPI(path, num_ues_gnb=ues_per_gnb)
+            elapsed = 0.0
+            for indication in range(indications):
+                # The generation of the rows is not measured
+                rows = {table_name: generate_rows(table_name, indication * 100, num_ues, rng) for table_name in TABLES}
+                start = time.perf_counter()
+                insert_indication(datalake, rows, batch)
+                elapsed += time.perf_counter() - start
+            result[metric] = result['rows'] / elapsed
+            if batch:
+                del datalake
+                continue
+
+            timestamps = (rng.integers(0, indications, queries) * 100).tolist()
+            single = timed_queries(datalake, timestamps, SINGLE_TABLE_KPMS)
+            join = timed_queries(datalake, timestamps, JOIN_KPMS)
+            result['read_kpms_ms_p50'], result['read_kpms_ms_p95'] = np.percentile(single, [50, 95]).tolist()
+            result['read_kpms_join_ms_p50'], result['read_kpms_join_ms_p95'] = np.percentile(join, [50, 95]).tolist()
+
+            start = time.perf_counter()
+            datalake.read_table('du')
+            result['read_table_ms'] = (time.perf_counter() - start) * 1e3
+            result['db_size_mb'] = os.path.getsize(datalake.database_path) / 2**20
+
+            # Memory of one more indication, as in a step of the environment
+            rows = {table_name: generate_rows(table_name, indications * 100, num_ues, rng) for table_name in TABLES}
+            tracemalloc.start()
+            insert_indication(datalake, rows, False)
+            datalake.read_kpms(indications * 100, JOIN_KPMS)
+            result['peak_python_memory_mb'] = tracemalloc.get_traced_memory()[1] / 2**20
+            tracemalloc.stop()
+            del datalake
+    return result
+
+
+def run(args):
+    results = []
+    print(f"{'UEs/gNB':>7} {'inds':>6} {'rows/s':>10} {'batch/s':>10} {'kpms ms':>8} {'join ms':>8} {'table ms':>9} {'mem MB':>7}")
+    for ues_per_gnb in args.ues:
+        for indications in args.indications:
+            rows = ues_per_gnb * NUM_GNBS * len(TABLES) * indications
+            if args.max_rows and rows > args.max_rows:
+                print(f'{ues_per_gnb:>7} {indications:>6} skipped: {rows} rows above --max-rows')
+                continue
+            result = run_case(ues_per_gnb, indications, args.queries)
+            results.append(result)
+            print(f"{ues_per_gnb:>7} {indications:>6} {result['insert_rows_per_s']:>10.0f} {result['batch_insert_rows_per_s']:>10.0f} "
+                  f"{result['read_kpms_ms_p50']:>8.3f} {result['read_kpms_join_ms_p50']:>8.3f} {result['read_table_ms']:>9.2f} "
+                  f"{result['peak_python_memory_mb']:>7.2f}")
+
+    report = {'meta': {'python': platform.python_version(), 'sqlite': sqlite3.sqlite_version, 'machine': platform.machine(),
+                       'queries': args.queries}, 'results': results}
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+
+
+def compare(args) -> int:
+    """Flag the metrics of the current results that are worse than the baseline by more than the threshold
+        Returns:
+            the number of regressions
+    """
+    with open(args.baseline, 'r') as baseline_file:
+        baseline = {(r['ues_per_gnb'], r['indications']): r for r in json.load(baseline_file)['results']}
+    with open(args.current, 'r') as current_file:
+        current = json.load(current_file)['results']
+
+    regressions = 0
+    for result in current:
+        reference = baseline.get((result['ues_per_gnb'], result['indications']))
+        if reference is None:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            if metric not in reference or metric not in result or reference[metric] == 0:
+                continue
+            change = (result[metric] - reference[metric]) / reference[metric]
+            worse = -change if higher_is_better else change
+            if worse > args.threshold:
+                regressions += 1
+                print(f"REGRESSION ues_per_gnb={result['ues_per_gnb']} indications={result['indications']} {metric}: "
+                      f"{reference[metric]:.4g} -> {result[metric]:.4g} ({change:+.1%})")
+    print(f'{regressions} regressions above {args.threshold:.0%}')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Micro-benchmark of the SQLiteDatabaseAPI')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    run_parser = subparsers.add_parser('run', help='run the benchmark')
+    run_parser.add_argument('--ues', type=int, nargs='+', default=[2, 20, 200], help='numbers of UEs per gNB')
+    run_parser.add_argument('--indications', type=int, nargs='+', default=[10, 100, 1000, 10000], help='episode lengths (indications)')
+    run_parser.add_argument('--queries', type=int, default=50, help='number of read_kpms queries for each case')
+    run_parser.add_argument('--max-rows', type=int, default=10_000_000,
+                            help='cases with more rows in total are skipped, 0 for no limit')
+    run_parser.add_argument('--output', type=str, default=None, help='optional path of the JSON results')
+    compare_parser = subparsers.add_parser('compare', help='compare results with a baseline')
+    compare_parser.add_argument('baseline', type=str, help='JSON results of the baseline')
+    compare_parser.add_argument('current', type=str, help='JSON results to check')
+    compare_parser.add_argument('--threshold', type=float, default=0.2, help='relative change considered a regression')
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        run(args)
+    else:
+        sys.exit(1 if compare(args) else 0)
+
+
+if __name__ == '__main__':
+    main()
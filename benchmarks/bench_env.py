@@ -0,0 +1,120 @@
+"""
+End-to-end throughput benchmark of the TrafficSteeringEnv, without ns-3.
+
+The environment drives the local stand-in simulator (see nsoran/base/local_sim.py) with random actions. For each
+number of UEs and traffic model, the benchmark runs an episode with the phases of the steps profiled (ProfilingOptions.phase_timing)
+and reports the steps per second, the Python overhead per step (i.e., the step time not spent waiting for the simulator)
+and the breakdown of the overhead in control, ingestion of the KPMs, observation and reward.
+If --min-steps-per-s is set, the benchmark fails when a case is slower.
+
+Usage:
+    python benchmarks/bench_env.py --ues 2 4 8 --traffic-models 0 1 2 3 --steps 100 --min-steps-per-s 20
+"""
+import os
+import sys
+import time
+import json
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from nsoran.environments.ts_env import TrafficSteeringEnv
+from nsoran.base.local_sim import LOCAL_SIM_COMMAND
+from nsoran.base.options import EnvOptions, TransportOptions, ProfilingOptions
+
+BASE_CONFIGURATION = {
+    "configuration": [0],
+    "bufferSize": [10],
+    "rlcAmEnabled": [1],
+    "e2nrEnabled": [1],
+    "hoSinrDifference": [5],
+    "dataRate": [0],
+    "useSemaphores": [1]
+}
+
+
+def phase_ms(summary: dict, names: list) -> float:
+    """Mean time per step (ms) of a group of phases"""
+    return sum(summary[name]['mean'] * summary[name]['count'] for name in names if name in summary) / summary['total']['count'] * 1e3
+
+
+def run_case(ues: int, traffic_model: int, steps: int, indication_periodicity: float, output_folder: str,
+             transport: TransportOptions = None) -> dict:
+    scenario_configuration = dict(BASE_CONFIGURATION, ues=[ues], trafficModel=[traffic_model],
+                                  indicationPeriodicity=[indication_periodicity],
+                                  # One more indication for the reset
+                                  simTime=[round((steps + 1) * indication_periodicity, 6)])
+    env = TrafficSteeringEnv(ns3_path=None, scenario_configuration=scenario_configuration, output_folder=output_folder,
+                             optimized=False, options=EnvOptions(sim_command=LOCAL_SIM_COMMAND, transport=transport or TransportOptions(),
+                                                                 profiling=ProfilingOptions(phase_timing=True)))
+    try:
+        env.reset()
+        done_steps = 0
+        start = time.perf_counter()
+        for _ in range(steps):
+            _, _, terminated, truncated, _ = env.step(env.action_space.sample())
+            done_steps += 1
+            if terminated or truncated:
+                break
+        elapsed = time.perf_counter() - start
+        summary = env.timing_summary()
+    finally:
+        env.close()
+
+    total_ms = phase_ms(summary, ['total'])
+    wait_ms = phase_ms(summary, ['wait_metrics'])
+    return {
+        'ues': ues,
+        'traffic_model': traffic_model,
+        'steps': done_steps,
+        'steps_per_s': done_steps / elapsed,
+        'step_ms': total_ms,
+        'simulator_ms': wait_ms,
+        'python_overhead_ms': total_ms - wait_ms,
+        'action_ms': phase_ms(summary, ['compute_action', 'control_write']),
+        'ingest_ms': phase_ms(summary, [name for name in summary if name.startswith('fill_')]),
+        'obs_ms': phase_ms(summary, ['get_obs']),
+        'reward_ms': phase_ms(summary, ['compute_reward']),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='End-to-end throughput benchmark of the TrafficSteeringEnv with the local simulator')
+    parser.add_argument('--ues', type=int, nargs='+', default=[2, 4, 6, 8, 10], help='numbers of UEs per gNB')
+    parser.add_argument('--traffic-models', type=int, nargs='+', default=[0, 1, 2, 3], help='traffic models of the simulator')
+    parser.add_argument('--steps', type=int, default=100, help='number of steps for each case')
+    parser.add_argument('--indication-periodicity', type=float, default=0.1, help='simulated period of the indications (s)')
+    parser.add_argument('--kpm-transport', type=str, default='csv', help='KPM transport of the environment, see TransportOptions')
+    parser.add_argument('--control-transport', type=str, default='file', help='control transport of the environment, see TransportOptions')
+    parser.add_argument('--min-steps-per-s', type=float, default=None, help='fail if a case is slower')
+    parser.add_argument('--output', type=str, default=None, help='optional path of the JSON results')
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'UEs':>4} {'traffic':>7} {'steps/s':>8} {'step ms':>8} {'sim ms':>7} {'python ms':>9} "
+          f"{'action':>7} {'ingest':>7} {'obs':>6} {'reward':>7}")
+    with tempfile.TemporaryDirectory() as output_folder:
+        for ues in args.ues:
+            for traffic_model in args.traffic_models:
+                result = run_case(ues, traffic_model, args.steps, args.indication_periodicity, output_folder,
+                                  TransportOptions(control=args.control_transport, kpm=args.kpm_transport))
+                results.append(result)
+                print(f"{ues:>4} {traffic_model:>7} {result['steps_per_s']:>8.1f} {result['step_ms']:>8.2f} {result['simulator_ms']:>7.2f} "
+                      f"{result['python_overhead_ms']:>9.2f} {result['action_ms']:>7.2f} {result['ingest_ms']:>7.2f} "
+                      f"{result['obs_ms']:>6.2f} {result['reward_ms']:>7.2f}")
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2)
+
+    if args.min_steps_per_s is not None:
+        slow = [result for result in results if result['steps_per_s'] < args.min_steps_per_s]
+        for result in slow:
+            print(f"FAIL ues={result['ues']} traffic_model={result['traffic_model']}: "
+                  f"{result['steps_per_s']:.1f} steps/s below {args.min_steps_per_s}")
+        if slow:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Long-run memory growth profiling of the TrafficSteeringEnv, without ns-3.
+
+The environment drives the local stand-in simulator with random actions for several episodes, wrapped in a
+MemoryProfileWrapper (see nsoran/base/memory.py): the RSS of the Python process and of the simulator is sampled
+at each step, the allocators that grew the most are recorded every --every steps, and the slope of the RSS is
+estimated for each episode. The run fails if the slope is above --max-slope-kb.
+
+Usage:
+    python benchmarks/profile_memory.py --ues 4 --episodes 5 --steps 500 --every 100 --max-slope-kb 16 --report memory.json
+"""
+import os
+import sys
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from nsoran.environments.ts_env import TrafficSteeringEnv
+from nsoran.base.local_sim import LOCAL_SIM_COMMAND
+from nsoran.base.options import EnvOptions
+from nsoran.base.memory import MemoryProfileWrapper
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Memory growth profiling of the TrafficSteeringEnv with the local simulator')
+    parser.add_argument('--ues', type=int, default=4, help='number of UEs per gNB')
+    parser.add_argument('--episodes', type=int, default=3, help='number of episodes')
+    parser.add_argument('--steps', type=int, default=200, help='number of steps of each episode')
+    parser.add_argument('--indication-periodicity', type=float, default=0.1, help='simulated period of the indications (s)')
+    parser.add_argument('--every', type=int, default=50, help='steps between two tracemalloc snapshots')
+    parser.add_argument('--top', type=int, default=10, help='allocators reported for each snapshot')
+    parser.add_argument('--max-slope-kb', type=float, default=None, help='fail if the RSS grows faster (kB per step)')
+    parser.add_argument('--report', type=str, default='memory_report.json', help='path of the JSON report')
+    args = parser.parse_args()
+
+    scenario_configuration = {'configuration': [0], 'bufferSize': [10], 'rlcAmEnabled': [1], 'e2nrEnabled': [1],
+                              'hoSinrDifference': [5], 'dataRate': [0], 'useSemaphores': [1], 'ues': [args.ues],
+                              'indicationPeriodicity': [args.indication_periodicity],
+                              'simTime': [round((args.steps + 1) * args.indication_periodicity, 6)]}
+    with tempfile.TemporaryDirectory() as output_folder:
+        env = MemoryProfileWrapper(TrafficSteeringEnv(ns3_path=None, scenario_configuration=scenario_configuration,
+                                                      output_folder=output_folder, optimized=False,
+                                                      options=EnvOptions(sim_command=LOCAL_SIM_COMMAND)),
+                                   report_path=args.report, every=args.every, top=args.top, max_slope_kb=args.max_slope_kb)
+        try:
+            for _ in range(args.episodes):
+                env.reset()
+                while True:
+                    _, _, terminated, truncated, _ = env.step(env.action_space.sample())
+                    if terminated or truncated:
+                        break
+                episode = env.profiler.episodes[-1]
+                print(f"episode {episode['episode']}: {episode['steps']} steps, RSS slope {episode['rss_slope_kb_per_step']:.2f} kB/step, "
+                      f"simulator RSS slope {episode['child_rss_slope_kb_per_step']:.2f} kB/step")
+        finally:
+            env.close()
+
+    for allocators in env.profiler.top_allocators[-1:]:
+        print(f"Top allocators at step {allocators['step']}:")
+        for allocator in allocators['allocators']:
+            print(f"  {allocator['size_diff_kb']:+.1f} kB {allocator['traceback'][-1].strip()}")
+    print(f'Report written in {args.report}')
+
+
+if __name__ == '__main__':
+    main()
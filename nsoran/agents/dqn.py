@@ -19,7 +19,8 @@ class BaseAgentDQN:
     def __init__(self, config):
         self.state_space = config.state_space
         self.action_space = config.action_space
-        self.action_mapper = ActionMapper(minVal=0, maxVal=self.action_space)
+        # Each of the action_space actions is a combination of num_bits boolean actions, e.g., 128 actions for 7 gNBs
+        self.action_mapper = ActionMapper(minVal=0, maxVal=self.action_space, num_bits=(self.action_space - 1).bit_length())
 
         self.agent_type = config.agent
 
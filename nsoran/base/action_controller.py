@@ -1,42 +1,121 @@
+import os
 from os import path
+from itertools import chain
+import numpy as np
+from .action_log import action_records, binary_log_filename
 
 class ActionController():
     """
-    The ActionController class is responsible for delivering the action to ns-O-RAN. 
+    The ActionController class is responsible for delivering the action to ns-O-RAN.
     In the stand-alone mode, the action is delivered by writing on the appropriate file.
+    The files are kept open for the whole simulation and each batch of actions is formatted and written at once.
     """
     directory : str
     log_filename : str
     control_filename : str
+    durability : str
+    log_format : str
+    durability_policies = ['buffered', 'flush', 'fsync']
+    log_formats = ['csv', 'binary']
 
-    def __init__(self, sim_path, log_filename, control_filename, header):
+    def __init__(self, sim_path, log_filename, control_filename, header, durability='flush', log_format='csv'):
         """Initialize Controller and its files
         Args:
             sim_path (str): the simulation path
             log_filename (str): the name of the file where the; This file is purely for logging purposed and it is not read by ns-3
             control_filename (str): the name of the control file that delivers the action to ns-3; This file is read by ns-3
-            header (dict): dictionary whose keys represent the fields of the action that the agent is going to write 
+            header (dict): dictionary whose keys represent the fields of the action that the agent is going to write
+            durability (str): when the written actions reach the files:
+                              'buffered' flushes the control file at each step and the log file only when closed,
+                              'flush' flushes both files at each step,
+                              'fsync' flushes and synchronizes both files to the disk at each step.
+            log_format (str): 'csv' logs the actions as the lines of the control file, 'binary' as fixed-width records
+                              (see action_log.py) in a file named after log_filename with the .bin extension.
+                              The binary format supports actions of two integer fields plus the timestamp.
         """
+        if durability not in self.durability_policies:
+            raise ValueError(f'{durability} is not a valid durability policy. Values accepted are: {self.durability_policies}')
+        if log_format not in self.log_formats:
+            raise ValueError(f'{log_format} is not a valid log format. Values accepted are: {self.log_formats}')
         self.directory = sim_path
-        self.log_filename = log_filename
         self.control_filename = control_filename
-        with open(path.join(self.directory, self.log_filename), 'w') as file:
-                file.write(f"{','.join(header)}\n")
-                file.flush()        
+        self.durability = durability
+        self.log_format = log_format
+        # Number of steps, i.e., calls of create_control_action, logged in the binary format
+        self.step = 0
+        if log_format == 'binary':
+            if len(header) != 3:
+                raise ValueError(f'The binary log supports actions of two fields plus the timestamp, {header} given.')
+            self.log_filename = binary_log_filename(log_filename)
+            self.log_file = open(path.join(self.directory, self.log_filename), 'wb')
+        else:
+            self.log_filename = log_filename
+            self.log_file = open(path.join(self.directory, self.log_filename), 'w')
+            self.log_file.write(f"{','.join(header)}\n")
+        self.log_file.flush()
+        self.control_file = None
+        self._open_control_file()
 
-        open(path.join(self.directory, self.control_filename), 'a').close()
+    def _open_control_file(self):
+        if self.control_file is not None:
+            self.control_file.close()
+        self.control_file = open(path.join(self.directory, self.control_filename), 'a')
 
-    def create_control_action(self, timestamp: int, actions):    
+    @staticmethod
+    def format_actions(timestamp: int, actions) -> str:
+        """Format a batch of actions as the lines of the control file, i.e., timestamp followed by the fields of the action
+            timestamp (int) : action's timestamp
+            actions [(tuple)] or np.ndarray: list of tuples or 2D integer array with one action per row
+        """
+        if len(actions) == 0:
+            return ''
+        if isinstance(actions, np.ndarray):
+            actions = actions.reshape(len(actions), -1)
+            line_format = ','.join(['%d'] * (actions.shape[1] + 1)) + '\n'
+            values = np.column_stack([np.full(len(actions), timestamp, dtype=actions.dtype), actions]).ravel().tolist()
+        else:
+            line_format = ','.join(['%s'] * (len(actions[0]) + 1)) + '\n'
+            values = list(chain.from_iterable((timestamp, *action) for action in actions))
+        return (line_format * len(actions)) % tuple(values)
+
+    def _sync(self, file, flush: bool):
+        if flush:
+            file.flush()
+            if self.durability == 'fsync':
+                os.fsync(file.fileno())
+
+    def log_actions(self, timestamp: int, actions, lines: str = None):
+        """Append the actions to the log file according to the durability policy
+            timestamp (int) : action's timestamp
+            actions [(tuple)] or np.ndarray: the actions sent
+            lines (str): the actions already formatted by format_actions(), if available
+        """
+        if self.log_format == 'binary':
+            self.log_file.write(action_records(self.step, timestamp, actions).tobytes())
+        else:
+            self.log_file.write(self.format_actions(timestamp, actions) if lines is None else lines)
+        self._sync(self.log_file, self.durability != 'buffered')
+
+    def create_control_action(self, timestamp: int, actions):
         """Applies the control action by writing it in the appropriate file
             timestamp (int) : action's timestamp
-            actions [(tuple)]: list of tuples representing the actions to be sent
+            actions [(tuple)] or np.ndarray: list of tuples or 2D integer array representing the actions to be sent
         """
-        with open(path.join(self.directory, self.log_filename), 'a') as logFile:
-            with open(path.join(self.directory, self.control_filename), 'a') as file:
-                for action in actions:
-                    control_action = f"{timestamp},{','.join(map(str, action))}\n"
-                    file.write(control_action)
-                    logFile.write(control_action)
-                    file.flush()
-                    logFile.flush()
-                
+        self.step += 1
+        lines = self.format_actions(timestamp, actions)
+        if not lines:
+            return
+        # The simulation may remove the control file once consumed, in that case we start a new one
+        if os.fstat(self.control_file.fileno()).st_nlink == 0:
+            self._open_control_file()
+        self.control_file.write(lines)
+        # The control file is always flushed, since the simulation reads it as soon as the control semaphore is posted
+        self._sync(self.control_file, True)
+        self.log_actions(timestamp, actions, lines)
+
+    def close(self):
+        """Flush and close the files"""
+        for file in (self.control_file, self.log_file):
+            if file is not None and not file.closed:
+                self._sync(file, True)
+                file.close()
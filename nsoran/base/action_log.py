@@ -0,0 +1,61 @@
+import os
+import numpy as np
+import pandas as pd
+from .datalake import SQLiteDatabaseAPI
+
+# Fixed-width record of the binary action log, one for each action sent to the simulation
+ACTION_LOG_DTYPE = np.dtype([('timestamp', '<i8'), ('step', '<i8'), ('ueId', '<i4'), ('target', '<i4')])
+ACTION_LOG_EXTENSION = '.bin'
+
+
+def binary_log_filename(log_filename: str) -> str:
+    """Name of the binary action log that replaces the text log_filename, e.g., TsActions.txt -> TsActions.bin"""
+    return os.path.splitext(log_filename)[0] + ACTION_LOG_EXTENSION
+
+
+def action_records(step: int, timestamp: int, actions) -> np.ndarray:
+    """Build the records of a batch of actions of two integer fields"""
+    actions = np.asarray(actions, dtype=np.int64).reshape(-1, 2)
+    records = np.empty(len(actions), dtype=ACTION_LOG_DTYPE)
+    records['timestamp'] = timestamp
+    records['step'] = step
+    records['ueId'] = actions[:, 0]
+    records['target'] = actions[:, 1]
+    return records
+
+
+def read_action_log(file_path: str) -> np.ndarray:
+    """Memory-map a binary action log
+        Returns:
+            read-only structured array of ACTION_LOG_DTYPE, whose fields (e.g., records['ueId']) are NumPy arrays
+    """
+    if os.path.getsize(file_path) == 0:
+        return np.empty(0, dtype=ACTION_LOG_DTYPE)
+    return np.memmap(file_path, dtype=ACTION_LOG_DTYPE, mode='r')
+
+
+def join_actions_kpms(actions: np.ndarray, datalake: SQLiteDatabaseAPI, required_kpms: list) -> pd.DataFrame:
+    """Align the actions with the KPMs that the UE reported in the Datalake at the timestamp of the action
+        Args:
+            actions (np.ndarray): records of the action log, see read_action_log()
+            datalake (SQLiteDatabaseAPI): Datalake of the same simulation
+            required_kpms (list): list of KPMs to be retrieved, see SQLiteDatabaseAPI.read_kpms()
+        Returns:
+            one row per action with the fields of the action followed by the KPMs; the KPMs are NaN if the UE did not report
+    """
+    actions_df = pd.DataFrame({name: np.asarray(actions[name]) for name in ACTION_LOG_DTYPE.names})
+    kpm_columns = ['timestamp', 'ueId'] + list(required_kpms)
+    rows = None
+    if len(actions_df):
+        # A single query for all the timestamps of the actions
+        rows = datalake.read_kpms_range(int(actions_df['timestamp'].min()), int(actions_df['timestamp'].max()), required_kpms)
+    if not rows:
+        return actions_df.reindex(columns=list(actions_df.columns) + list(required_kpms))
+    kpms_df = pd.DataFrame.from_records(rows)
+    if len(kpms_df.columns) != len(kpm_columns):
+        raise ValueError(f'KPMs appearing in more than one table are not supported: {required_kpms}')
+    kpms_df.columns = kpm_columns
+    kpms_df['timestamp'] = kpms_df['timestamp'].astype(np.int64)
+    kpms_df['ueId'] = kpms_df['ueId'].astype(np.int64)
+    actions_df['ueId'] = actions_df['ueId'].astype(np.int64)
+    return actions_df.merge(kpms_df, on=['timestamp', 'ueId'], how='left')
@@ -2,6 +2,10 @@ from collections import defaultdict
 import os
 import sqlite3
 import re
+import logging
+from .tracing import trace_span
+
+logger = logging.getLogger(__name__)
 
 class SQLiteDatabaseAPI:
     lte_cu_cp_keys = {
@@ -119,14 +123,16 @@ class SQLiteDatabaseAPI:
     }
 
     debug: bool = False
+    tracer = None # ChromeTracer of the environment, if the operations are traced
 
-    def __init__(self, simulation_dir, num_ues_gnb, debug=False):
+    def __init__(self, simulation_dir, num_ues_gnb, debug=False, keep_database=False):
         """Create an SQLite Database inside the simulation folder and use it as data source
 
         Args:
             simulation_dir (str): path of the folder of the simulation
             num_ues_gnb (int): number of UEs for each gNB in the simulation
             debug (bool): if True, do not erase the db at the end of the simulation
+            keep_database (bool): if True, do not erase the db at the end of the simulation, e.g., to analyze it offline
         """        
         self.simulation_dir = simulation_dir
         self.num_ues = num_ues_gnb * 7 # number of gNBs in the scenario
@@ -135,7 +141,7 @@ class SQLiteDatabaseAPI:
         # key is the table name, value is the dictionary {kpm name: type}
 
         self.acquire_connection()
-        print("Connected to the database.")
+        logger.debug("Connected to the database %s", self.database_path)
         self._create_table("lte_cu_cp", self.lte_cu_cp_keys)
         self._create_table("gnb_cu_cp", self.gnb_cu_cp_keys)
         self._create_table("lte_cu_up", self.lte_cu_up_keys)
@@ -144,6 +150,7 @@ class SQLiteDatabaseAPI:
         self.release_connection()
 
         self.debug = debug
+        self.keep_database = keep_database
 
     @staticmethod
     def sanitize_column_name(column_name):
@@ -167,9 +174,10 @@ class SQLiteDatabaseAPI:
     
     def release_connection(self):
         if self.connection is None:
-            print("Error: Not connected to the database, no need to release.")
+            logger.warning("Not connected to the database, no need to release.")
             return True
-        self.connection.commit()
+        with trace_span(self.tracer, 'commit', 'datalake'):
+            self.connection.commit()
         self.connection.close()
         self.connection = None
         return True
@@ -194,7 +202,7 @@ class SQLiteDatabaseAPI:
         columns (dict[str,str]): dictionary having the keys as the names of the kpms and the types
         """
         if self.connection is None:
-            print(f"Error in creating table {table_name}: Not connected to the database.")
+            logger.error("Error in creating table %s: Not connected to the database.", table_name)
             return
 
         column_definitions = ', '.join([f"{SQLiteDatabaseAPI.sanitize_column_name(name)} {type}" for name, type in columns.items()])
@@ -253,6 +261,28 @@ class SQLiteDatabaseAPI:
         self.cursor.execute(query, values)
         # print("Data inserted into the table.")
 
+    @lock_connection
+    def insert_rows(self, table_name, columns: list, rows: list[tuple]):
+        """Insert a batch of rows with a single statement. 
+            Rows whose timestamp and ueImsiComplete are already in the table are ignored, as in insert_data.
+           Args:
+              table_name (str): name of the table
+              columns (list): sanitized names of the columns, in the order of the values of each row
+              rows (list[tuple]): values of the rows
+        """
+        if table_name not in self.tables:
+            raise ValueError(f'Input table name not found in the tables: {table_name} not in {self.tables.keys()}')
+
+        admitted_columns = set(SQLiteDatabaseAPI.sanitize_column_name(key) for key in self.tables[table_name])
+        unknown_columns = [column for column in columns if column not in admitted_columns]
+        if unknown_columns:
+            raise ValueError(f"Columns {unknown_columns} not found in table {table_name}.")
+
+        placeholders = ', '.join(['?' for _ in columns])
+        query = f"INSERT OR IGNORE INTO {table_name} ({', '.join(columns)}) VALUES ({placeholders})"
+        with trace_span(self.tracer, f'insert_rows {table_name}', 'datalake', {'rows': len(rows)}):
+            self.cursor.executemany(query, rows)
+
     @lock_connection
     def read_table(self, table_name):
         query = f"SELECT * FROM {table_name}"
@@ -260,15 +290,31 @@ class SQLiteDatabaseAPI:
         return result.fetchall()
 
     @lock_connection
-    def read_kpms(self, timestamp : int, required_kpms: list) -> list[tuple]:
-        """Query the datalake to retrieve the observation vector. 
-            The return value is the list of tuples of the size of the number of UEs in the scenario. 
-            Each tuple is built by having as the first element the ueImsiComplete following the required_kpms.
-            Order is ensured, i.e., the KPMs will be returned as the listed in the KPM.
-            KPM with the same name are both returned expliciting the source table
+    def read_timestamps(self, table_name: str = 'du', before: int = None, limit: int = None) -> list[int]:
+        """Return the distinct timestamps of a table in ascending order, looked up through its (timestamp, ueImsiComplete) index
            Args:
-              timestamp (int): timestamp of the observation vector to retrieve
-              required_kpms (list): list of KPMs to be retrieved
+              table_name (str): name of the table
+              before (int): if set, only the timestamps lower than before are returned
+              limit (int): if set, only the last limit timestamps are returned
+        """
+        if table_name not in self.tables:
+            raise ValueError(f'Input table name not found in the tables: {table_name} not in {self.tables.keys()}')
+        query = f"SELECT DISTINCT timestamp FROM {table_name}"
+        values = []
+        if before is not None:
+            query += " WHERE timestamp < ?"
+            values.append(before)
+        query += " ORDER BY timestamp DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            values.append(limit)
+        result = self.cursor.execute(query, values).fetchall()
+        return [timestamp for timestamp, in reversed(result)]
+
+    def _kpms_query(self, required_kpms: list, with_timestamp: bool = False) -> tuple[str, str]:
+        """Build the query that joins the tables of the required_kpms, without the WHERE clause, see read_kpms()
+            Returns:
+                the query and the table of its FROM clause
         """
         tables_involved: dict[list] = {} # key: table_name, value: list of the names of the kpms 
 
@@ -297,6 +343,8 @@ class SQLiteDatabaseAPI:
         # Construct the SQL query
         from_clause = next(iter(tables_involved))  # Get the first table for the FROM clause
         select_clause = [f"{from_clause}.ueImsiComplete"] # Add ueImsiComplete to the select clause once
+        if with_timestamp:
+            select_clause.insert(0, f"{from_clause}.timestamp")
         join_clause = []
         joined_tables = set([from_clause])
 
@@ -320,14 +368,77 @@ class SQLiteDatabaseAPI:
         query = f"SELECT {', '.join(select_clause)} FROM {from_clause}"
         if join_clause:
             query += " " + " ".join(join_clause)
+        return query, from_clause
+
+    @lock_connection
+    def read_kpms_range(self, first_timestamp: int, last_timestamp: int, required_kpms: list) -> list[tuple]:
+        """Query the datalake to retrieve the KPMs of all the timestamps in [first_timestamp, last_timestamp] with a single query.
+            Each tuple is built as in read_kpms(), preceded by the timestamp.
+           Args:
+              first_timestamp (int): first timestamp to retrieve
+              last_timestamp (int): last timestamp to retrieve
+              required_kpms (list): list of KPMs to be retrieved
+        """
+        query, from_clause = self._kpms_query(required_kpms, with_timestamp=True)
+        query += f" WHERE {from_clause}.timestamp BETWEEN ? AND ?"
+        logger.debug("query: %s", query)
+
+        with trace_span(self.tracer, 'read_kpms_range', 'datalake'):
+            result = self.cursor.execute(query, (first_timestamp, last_timestamp)).fetchall()
+        return result if result else None # [(timestamp, observation_tuple)]
+
+    @lock_connection
+    def read_kpms(self, timestamp : int, required_kpms: list) -> list[tuple]:
+        """Query the datalake to retrieve the observation vector. 
+            The return value is the list of tuples of the size of the number of UEs in the scenario. 
+            Each tuple is built by having as the first element the ueImsiComplete following the required_kpms.
+            Order is ensured, i.e., the KPMs will be returned as the listed in the KPM.
+            KPM with the same name are both returned expliciting the source table
+           Args:
+              timestamp (int): timestamp of the observation vector to retrieve
+              required_kpms (list): list of KPMs to be retrieved
+        """
+        query, from_clause = self._kpms_query(required_kpms)
 
         # Add the WHERE clause using the from_clause table's timestamp
         query += f" WHERE {from_clause}.timestamp = ?"
-        print(f"\nquery: {query}\n")
+        logger.debug("query: %s", query)
 
-        result = self.cursor.execute(query, (timestamp,)).fetchall()
+        with trace_span(self.tracer, 'read_kpms', 'datalake'):
+            result = self.cursor.execute(query, (timestamp,)).fetchall()
         return result if result else None # [(observation_tuple)]
 
+    @lock_connection
+    def read_cell_kpms(self, timestamp: int, required_kpms: list, aggregations: list = None) -> list[tuple]:
+        """Query the datalake to retrieve the KPMs of the du table aggregated per cell, with a single query.
+            The return value is the list of tuples of the cells with at least one UE at the timestamp.
+            Each tuple is built by having as the first elements the nrCellId and the number of UEs of the cell, following
+            the aggregated required_kpms.
+           Args:
+              timestamp (int): timestamp of the KPMs to retrieve
+              required_kpms (list): list of KPMs of the du table to be retrieved
+              aggregations (list): SQL aggregate function of each KPM among AVG, SUM, MIN and MAX. AVG by default,
+                                   which returns the per cell KPMs, since they are repeated in the rows of each UE
+        """
+        aggregations = aggregations if aggregations is not None else ['AVG'] * len(required_kpms)
+        if len(aggregations) != len(required_kpms):
+            raise ValueError(f"{len(aggregations)} aggregations for {len(required_kpms)} KPMs")
+        invalid_aggregations = [aggregation for aggregation in aggregations if aggregation not in ('AVG', 'SUM', 'MIN', 'MAX')]
+        if invalid_aggregations:
+            raise ValueError(f"Aggregations {invalid_aggregations} not valid. Values accepted are: ['AVG', 'SUM', 'MIN', 'MAX']")
+        not_found_kpms = [kpm for kpm in required_kpms if kpm not in self.tables['du']]
+        if not_found_kpms:
+            raise ValueError(f"Columns {not_found_kpms} not found in table du.")
+
+        select_clause = ['nrcellid', 'COUNT(*)'] + [f"{aggregation}({self.sanitize_column_name(kpm)})"
+                                                     for kpm, aggregation in zip(required_kpms, aggregations)]
+        query = f"SELECT {', '.join(select_clause)} FROM du WHERE timestamp = ? GROUP BY nrcellid ORDER BY nrcellid"
+        logger.debug("query: %s", query)
+
+        with trace_span(self.tracer, 'read_cell_kpms', 'datalake'):
+            result = self.cursor.execute(query, (timestamp,)).fetchall()
+        return result if result else None # [(nrCellId, num_ues, kpms...)]
+
     @staticmethod
     def extract_cellId(filepath) -> int:
         # Define a regular expression pattern to match the number at the end of the path
@@ -348,7 +459,7 @@ class SQLiteDatabaseAPI:
             self.release_connection()
             # print("Connection to the database closed.")
         
-        if not self.debug:
+        if not self.debug and not self.keep_database:
             if os.path.exists(self.database_path):
                 os.remove(self.database_path)
                 # print("Database file removed.")
@@ -0,0 +1,150 @@
+import os
+import signal
+import pstats
+import cProfile
+from collections import Counter
+
+PROFILER_MODES = ['cprofile', 'sampling']
+PROFILE_FILE = 'profile'
+# Limits of the call graph walk that derives the collapsed stacks from the cProfile statistics
+MAX_STACK_DEPTH = 64
+MIN_STACK_SECONDS = 1e-6
+
+
+def _function_label(code) -> str:
+    """Label of a function in the collapsed stacks, i.e., file:line(function)"""
+    file_name, line, function = code
+    return f'{os.path.basename(file_name)}:{line}({function})' if file_name != '~' else function
+
+
+def collapsed_stacks_from_stats(stats: pstats.Stats) -> Counter:
+    """Approximate the collapsed stacks (microseconds) from the call graph of the cProfile statistics:
+        the time of each function is split among its callers in proportion to the time spent in each call edge.
+    """
+    callees = {}
+    for function, (_, _, _, _, callers) in stats.stats.items():
+        for caller, (_, _, _, cumulative) in callers.items():
+            callees.setdefault(caller, []).append((function, cumulative))
+    roots = [function for function, (_, _, _, _, callers) in stats.stats.items() if not callers]
+
+    stacks = Counter()
+
+    def walk(function, scale, path):
+        _, _, total_time, cumulative_time, _ = stats.stats[function]
+        path = path + [_function_label(function)]
+        self_time = total_time * scale
+        if self_time * 1e6 >= 1:
+            stacks[';'.join(path)] += int(self_time * 1e6)
+        if len(path) >= MAX_STACK_DEPTH or cumulative_time <= 0:
+            return
+        for callee, edge_time in callees.get(function, []):
+            # Recursion is cut, its time is accounted to the first call
+            if _function_label(callee) in path:
+                continue
+            callee_scale = scale * edge_time / stats.stats[callee][3] if stats.stats[callee][3] > 0 else 0
+            if edge_time * scale >= MIN_STACK_SECONDS:
+                walk(callee, callee_scale, path)
+
+    for root in roots:
+        walk(root, 1.0, [])
+    return stacks
+
+
+class EpisodeProfiler:
+    """
+    The EpisodeProfiler profiles one episode of an environment, or a range of its steps, and dumps the profile
+    in the simulation folder as a statistics file and a collapsed-stack file (one 'frame;frame;... value' line per stack),
+    which can be rendered by flamegraph.pl, speedscope or inferno.
+    Two profilers are available:
+        'cprofile' records every call with cProfile; the statistics are in profile.prof (see pstats) and the stacks
+                   are derived from its call graph, thus they are approximate.
+        'sampling' samples the Python stack at every interval of CPU time with a SIGPROF timer, with a lower overhead;
+                   the statistics are the samples of each function in profile.txt. It must run in the main thread.
+    """
+    mode: str
+    episode: int
+    steps: tuple
+    interval: float
+
+    def __init__(self, mode: str, episode: int = 0, steps: tuple = None, interval: float = 0.005):
+        """Initialize the profiler
+        Args:
+            mode (str): 'cprofile' or 'sampling'
+            episode (int): index of the episode to profile, the first one is 0
+            steps (tuple): if set, range [first, last) of the steps of the episode to profile, where the reset is step 0;
+                           the whole episode otherwise
+            interval (float): period (s) of the samples of the sampling profiler
+        """
+        if mode not in PROFILER_MODES:
+            raise ValueError(f'{mode} is not a valid profiler. Values accepted are: {PROFILER_MODES}')
+        self.mode = mode
+        self.episode = episode
+        self.steps = steps
+        self.interval = interval
+        self.active = False
+        self.done = False
+        self.profile = None
+        self.samples = Counter()
+
+    @classmethod
+    def from_environment(cls):
+        """Profiler configured by the NSORAN_PROFILER (mode), NSORAN_PROFILER_EPISODE and NSORAN_PROFILER_STEPS (e.g., 10-50)
+            environment variables, None if NSORAN_PROFILER is not set
+        """
+        mode = os.environ.get('NSORAN_PROFILER')
+        if not mode:
+            return None
+        steps = os.environ.get('NSORAN_PROFILER_STEPS')
+        return cls(mode, episode=int(os.environ.get('NSORAN_PROFILER_EPISODE', 0)),
+                   steps=tuple(int(step) for step in steps.split('-')) if steps else None)
+
+    def update(self, episode: int, step: int, sim_path: str):
+        """Start or stop profiling before a step (the reset is step 0)"""
+        in_range = episode == self.episode and (self.steps is None or self.steps[0] <= step < self.steps[1])
+        if in_range and not self.active and not self.done:
+            self.start()
+        elif self.active and not in_range:
+            self.stop(sim_path)
+
+    def start(self):
+        self.active = True
+        if self.mode == 'cprofile':
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+        else:
+            self.samples = Counter()
+            signal.signal(signal.SIGPROF, self._sample)
+            signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def _sample(self, signum, frame):
+        stack = []
+        while frame is not None:
+            stack.append(f'{os.path.basename(frame.f_code.co_filename)}:{frame.f_code.co_firstlineno}({frame.f_code.co_name})')
+            frame = frame.f_back
+        self.samples[';'.join(reversed(stack))] += 1
+
+    def stop(self, sim_path: str):
+        """Stop profiling and dump the profile in the simulation folder"""
+        if not self.active:
+            return
+        self.active = False
+        self.done = True
+        prefix = os.path.join(sim_path, PROFILE_FILE)
+        if self.mode == 'cprofile':
+            self.profile.disable()
+            self.profile.dump_stats(prefix + '.prof')
+            stacks = collapsed_stacks_from_stats(pstats.Stats(self.profile))
+        else:
+            signal.setitimer(signal.ITIMER_PROF, 0, 0)
+            signal.signal(signal.SIGPROF, signal.SIG_DFL)
+            stacks = self.samples
+            functions = Counter()
+            for stack, count in stacks.items():
+                functions[stack.rsplit(';', 1)[-1]] += count
+            with open(prefix + '.txt', 'w') as stats_file:
+                stats_file.write(f'{sum(stacks.values())} samples every {self.interval} s of CPU time\n')
+                for function, count in functions.most_common():
+                    stats_file.write(f'{count:>8} {function}\n')
+        with open(prefix + '.collapsed', 'w') as collapsed_file:
+            for stack, value in stacks.items():
+                collapsed_file.write(f'{stack} {value}\n')
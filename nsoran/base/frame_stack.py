@@ -0,0 +1,122 @@
+import numpy as np
+import gymnasium as gym
+from gymnasium import spaces
+from .normalization import NormalizeObservationWrapper
+
+PADDING_MODES = ['repeat', 'zero']
+
+
+class FrameStackWrapper(gym.Wrapper):
+    """
+    Wrapper that stacks the last num_stack observations of an NsOranEnv, the oldest first, in an array of shape
+    (num_stack, *observation shape).
+    The frames are kept in a ring buffer where each one is written twice, at position i and i + num_stack, so that
+    the last num_stack frames are always a contiguous slice: the stacked observation is a view of the buffer, which is
+    overwritten by the next steps, unless copy is True.
+    At the reset, the history is filled with the KPMs of the previous indications stored in the datalake, if the
+    environment can build the observation of a past timestamp (i.e., it implements _observation_at, see
+    TrafficSteeringEnv); the frames that are not available are padded according to padding. The past observations go
+    through the observation wrappers between this wrapper and the environment, e.g., a NormalizeObservationWrapper, which
+    normalizes them without updating its statistics.
+    """
+    num_stack: int
+    padding: str
+    copy: bool
+
+    def __init__(self, env: gym.Env, num_stack: int, padding: str = 'repeat', copy: bool = False):
+        """Wrap the environment
+        Args:
+            env (gym.Env): environment whose observations are arrays
+            num_stack (int): number of stacked observations
+            padding (str): 'repeat' repeats the oldest available observation, 'zero' pads with zeros
+            copy (bool): whether the stacked observation is a copy of the buffer instead of a view
+        """
+        super().__init__(env)
+        if padding not in PADDING_MODES:
+            raise ValueError(f'{padding} is not a valid padding. Values accepted are: {PADDING_MODES}')
+        if num_stack < 1:
+            raise ValueError(f'num_stack must be positive, got {num_stack}')
+        self.num_stack = num_stack
+        self.padding = padding
+        self.copy = copy
+        space = env.observation_space
+        self.observation_space = spaces.Box(low=np.repeat(space.low[np.newaxis], num_stack, axis=0),
+                                            high=np.repeat(space.high[np.newaxis], num_stack, axis=0), dtype=space.dtype)
+        self.frames = np.zeros((2 * num_stack, *space.shape), dtype=space.dtype)
+        self.position = num_stack - 1  # The last frame written
+
+    def _next_frame(self) -> np.ndarray:
+        self.position = (self.position + 1) % self.num_stack
+        return self.frames[self.position]
+
+    def _commit_frame(self):
+        self.frames[self.position + self.num_stack] = self.frames[self.position]
+
+    def _push(self, observation: np.ndarray):
+        self._next_frame()[...] = observation
+        self._commit_frame()
+
+    def _stacked(self) -> np.ndarray:
+        stacked = self.frames[self.position + 1:self.position + 1 + self.num_stack]
+        return stacked.copy() if self.copy else stacked
+
+    def _history(self) -> list[int]:
+        """Timestamps of the previous indications stored in the datalake, the oldest first"""
+        ns_env = self.env.unwrapped
+        if self.num_stack == 1 or not hasattr(ns_env, '_observation_at') or not getattr(ns_env, 'is_open', False):
+            return []
+        return ns_env.datalake.read_timestamps(before=ns_env.last_timestamp, limit=self.num_stack - 1)
+
+    def _inner_wrappers(self) -> list:
+        """Wrappers between this wrapper and the environment, the innermost first"""
+        wrappers = []
+        env = self.env
+        while env is not env.unwrapped:
+            wrappers.append(env)
+            env = env.env
+        return wrappers[::-1]
+
+    def _past_observation(self, timestamp: int):
+        """Write the observation of a past timestamp in the next frame, without the cache of the environment"""
+        ns_env = self.env.unwrapped
+        wrappers = [wrapper for wrapper in self._inner_wrappers() if isinstance(wrapper, gym.ObservationWrapper)]
+        if not wrappers:
+            # Built directly in the ring buffer
+            ns_env._observation_at(timestamp, self._next_frame(), cache=False)
+            return
+        observation = np.zeros(ns_env.observation_space.shape, dtype=ns_env.observation_space.dtype)
+        slots, _ = ns_env._observation_at(timestamp, observation, cache=False)
+        obs_mask = None
+        if getattr(ns_env, 'obs_mask', None) is not None:
+            obs_mask = np.zeros(len(observation), dtype=bool)
+            obs_mask[slots] = True
+        for wrapper in wrappers:
+            if isinstance(wrapper, NormalizeObservationWrapper):
+                observation = wrapper.normalize(observation, obs_mask, update=False)
+            else:
+                observation = wrapper.observation(observation)
+        self._next_frame()[...] = observation
+
+    def reset(self, **kwargs):
+        observation, info = self.env.reset(**kwargs)
+        timestamps = self._history()
+        missing = self.num_stack - 1 - len(timestamps)
+        for _ in range(missing):
+            self._next_frame()
+            self._commit_frame()
+        for timestamp in timestamps:
+            self._past_observation(timestamp)
+            self._commit_frame()
+        self._push(observation)
+        if missing:
+            first = self.frames[(self.position + 1 + missing) % self.num_stack]
+            for index in range(missing):
+                position = (self.position + 1 + index) % self.num_stack
+                self.frames[position] = first if self.padding == 'repeat' else 0
+                self.frames[position + self.num_stack] = self.frames[position]
+        return self._stacked(), info
+
+    def step(self, action):
+        observation, reward, terminated, truncated, info = self.env.step(action)
+        self._push(observation)
+        return self._stacked(), reward, terminated, truncated, info
@@ -0,0 +1,84 @@
+import numpy as np
+
+
+class HandoverTracker:
+    """
+    The HandoverTracker keeps the handover history of each UE in NumPy arrays, whose slots are assigned to the IMSIs
+    through a dense lookup array, so that a whole indication is recorded with array operations.
+    For each UE it stores the time and the number of handovers, the number of ping-pongs, i.e., handovers back to
+    the previous serving cell within ping_pong_window, and the previous serving cell.
+    """
+    ping_pong_window: int
+
+    def __init__(self, capacity: int = 0, ping_pong_window: int = 1000):
+        """Initialize the tracker
+        Args:
+            capacity (int): expected number of UEs, the arrays grow if needed
+            ping_pong_window (int): maximum time (same unit of the timestamps, e.g., ms) between two handovers of a ping-pong
+        """
+        self.ping_pong_window = ping_pong_window
+        self.slot_of_imsi = np.full(capacity + 1, -1, dtype=np.int64)
+        self.num_ues = 0
+        self.last_handover = np.zeros(capacity, dtype=np.int64)  # 0 if the UE never performed a handover
+        self.handover_count = np.zeros(capacity, dtype=np.int64)
+        self.ping_pong_count = np.zeros(capacity, dtype=np.int64)
+        self.previous_cell = np.zeros(capacity, dtype=np.int64)  # 0 if the UE never performed a handover
+
+    def reset(self):
+        """Forget the history of all the UEs, e.g., at the start of a new episode; the arrays keep their capacity"""
+        self.slot_of_imsi.fill(-1)
+        self.num_ues = 0
+        for array in (self.last_handover, self.handover_count, self.ping_pong_count, self.previous_cell):
+            array.fill(0)
+
+    def _grow(self, capacity: int):
+        for name in ('last_handover', 'handover_count', 'ping_pong_count', 'previous_cell'):
+            array = getattr(self, name)
+            setattr(self, name, np.concatenate([array, np.zeros(capacity - len(array), dtype=array.dtype)]))
+
+    def slots(self, imsis: np.ndarray) -> np.ndarray:
+        """Return the slots of the IMSIs, assigning new slots to the unknown ones"""
+        imsis = np.asarray(imsis, dtype=np.int64)
+        if len(imsis) == 0:
+            return imsis
+        if imsis.max() >= len(self.slot_of_imsi):
+            self.slot_of_imsi = np.concatenate([self.slot_of_imsi, np.full(imsis.max() + 1 - len(self.slot_of_imsi), -1, dtype=np.int64)])
+        new_imsis = np.unique(imsis[self.slot_of_imsi[imsis] < 0])
+        if len(new_imsis):
+            self.slot_of_imsi[new_imsis] = np.arange(self.num_ues, self.num_ues + len(new_imsis))
+            self.num_ues += len(new_imsis)
+            if self.num_ues > len(self.last_handover):
+                self._grow(max(self.num_ues, 2 * len(self.last_handover)))
+        return self.slot_of_imsi[imsis]
+
+    def last_handover_time(self, imsis: np.ndarray) -> np.ndarray:
+        """Time of the last handover of each UE, 0 if it never performed a handover"""
+        return self.last_handover[self.slots(imsis)]
+
+    def record(self, timestamp: int, imsis: np.ndarray, source_cells: np.ndarray, target_cells: np.ndarray):
+        """Record the handovers of an indication
+        Args:
+            timestamp (int): time of the handovers
+            imsis (np.ndarray): IMSIs of the UEs that performed a handover, each at most once
+            source_cells (np.ndarray): serving cells before the handovers
+            target_cells (np.ndarray): serving cells after the handovers
+        """
+        slots = self.slots(imsis)
+        last_handover = self.last_handover[slots]
+        ping_pong = ((last_handover != 0) & (self.previous_cell[slots] == np.asarray(target_cells))
+                     & (timestamp - last_handover <= self.ping_pong_window))
+        self.ping_pong_count[slots] += ping_pong
+        self.handover_count[slots] += 1
+        self.last_handover[slots] = timestamp
+        self.previous_cell[slots] = source_cells
+
+    def summary(self) -> dict:
+        """Statistics of the handovers of the UEs tracked so far"""
+        handover_count = self.handover_count[:self.num_ues]
+        return {
+            'tracked_ues': self.num_ues,
+            'handovers': int(handover_count.sum()),
+            'ping_pongs': int(self.ping_pong_count[:self.num_ues].sum()),
+            'ues_with_handover': int(np.count_nonzero(handover_count)),
+            'max_handovers_per_ue': int(handover_count.max()) if self.num_ues else 0,
+        }
@@ -0,0 +1,262 @@
+"""
+Local stand-in for the ns-O-RAN scenario, to run the environments without ns-3.
+
+The stand-in follows the same protocol of the ns-3 scenario: it runs in the simulation folder, writes the KPMs
+of every indication in the cu-up-cell-*.txt, cu-cp-cell-*.txt and du-cell-*.txt files, posts the metrics
+semaphore, waits on the control semaphore and applies the handovers read from the control file, or from the
+shared memory control segment when the environment created it. Likewise, the KPMs are written as binary records
+in the KPM shared memory segment instead of the csv files when the environment created it.
+The KPMs are synthetic: each UE follows a random walk of its SINR towards every gNB and the throughput depends
+on the SINR and on the cell load.
+
+Usage (as done by NsOranEnv when sim_command=LOCAL_SIM_COMMAND):
+    python -m nsoran.base.local_sim --ues=2 --simTime=0.7 --indicationPeriodicity=0.1
+"""
+import os
+import sys
+import csv
+import argparse
+import numpy as np
+from posix_ipc import Semaphore, ExistentialError
+from .datalake import SQLiteDatabaseAPI
+from .shm_control import SharedMemoryActionReader, control_segment_name
+from .shm_kpm import SharedMemoryKpmWriter
+
+LOCAL_SIM_COMMAND = [sys.executable, '-m', 'nsoran.base.local_sim']
+
+LTE_CELL_ID = 1
+GNB_CELL_IDS = np.arange(2, 9)  # The scenario has always 7 gNBs
+NUM_PRBS = 100
+PRB_BANDWIDTH_HZ = 180e3
+# Probability of a UE having traffic in an indication for each trafficModel
+TRAFFIC_ACTIVITY = {0: 1.0, 1: 0.5, 2: 0.25, 3: 0.75}
+
+
+class LocalSimulator:
+    """
+    The LocalSimulator class generates synthetic KPMs for the traffic steering scenario and
+    applies the handover commands of the agent.
+    """
+
+    def __init__(self, sim_path: str, ues: int, sim_time: float, indication_periodicity: float, use_semaphores: bool = True,
+                 traffic_model: int = 0, seed: int = 1, control_file: str = 'ts_actions_for_ns3.csv'):
+        """Initialize the simulator
+        Args:
+            sim_path (str): simulation folder, the names of the semaphores are derived from it
+            ues (int): number of UEs for each gNB
+            sim_time (float): duration of the simulation in seconds
+            indication_periodicity (float): period of the KPM indications in seconds
+            use_semaphores (bool): if set, synchronize with the agent through the semaphores
+            traffic_model (int): traffic model, see TRAFFIC_ACTIVITY
+            seed (int): seed of the random generator
+            control_file (str): name of the control file written by the agent
+        """
+        self.sim_path = sim_path
+        self.num_ues = ues * len(GNB_CELL_IDS)
+        self.period_ms = int(round(indication_periodicity * 1000))
+        self.num_indications = int(round(sim_time / indication_periodicity))
+        self.use_semaphores = use_semaphores
+        self.activity = TRAFFIC_ACTIVITY.get(traffic_model, 1.0)
+        self.rng = np.random.default_rng(seed)
+        self.control_path = os.path.join(sim_path, control_file)
+        self.control_offset = 0
+
+        self.imsis = np.arange(1, self.num_ues + 1)
+        # Each UE starts attached to its own gNB, with a better SINR towards it
+        self.serving = np.repeat(GNB_CELL_IDS, ues)
+        self.sinr = self.rng.normal(5.0, 8.0, size=(self.num_ues, len(GNB_CELL_IDS)))
+        self.sinr[np.arange(self.num_ues), self.serving - GNB_CELL_IDS[0]] += 10.0
+        self.handovers = 0
+
+        name = os.path.basename(os.path.normpath(sim_path))
+        self.metricsReadySemaphore = Semaphore("/sem_metrics_" + name) if use_semaphores else None
+        self.controlSemaphore = Semaphore("/sem_control_" + name) if use_semaphores else None
+        try:
+            self.control_reader = SharedMemoryActionReader(control_segment_name(sim_path))
+        except ExistentialError:
+            self.control_reader = None
+
+        try:
+            self.kpm_writer = SharedMemoryKpmWriter(sim_path)
+        except ExistentialError:
+            self.kpm_writer = None
+
+        # Datalake table and cellId of the rows of each KPM file
+        self.tables = {}
+        for cell_id in [LTE_CELL_ID] + list(GNB_CELL_IDS):
+            prefix = 'lte' if cell_id == LTE_CELL_ID else 'gnb'
+            self.tables[f'cu-up-cell-{cell_id}.txt'] = (f'{prefix}_cu_up', cell_id)
+            self.tables[f'cu-cp-cell-{cell_id}.txt'] = (f'{prefix}_cu_cp', cell_id)
+        for cell_id in GNB_CELL_IDS:
+            self.tables[f'du-cell-{cell_id}.txt'] = ('du', cell_id)
+
+        self.writers = {}
+        if self.kpm_writer is None:
+            for file_name, (table_name, _) in self.tables.items():
+                self._open_writer(file_name, getattr(SQLiteDatabaseAPI, f'{table_name}_keys'))
+
+    def _open_writer(self, file_name: str, keys: dict):
+        csvfile = open(os.path.join(self.sim_path, file_name), 'w', newline='')
+        writer = csv.writer(csvfile)
+        writer.writerow(keys.keys())
+        csvfile.flush()
+        self.writers[file_name] = (csvfile, writer, list(keys.keys()))
+
+    def _write_rows(self, file_name: str, rows: dict):
+        """Append the rows to a KPM file; rows maps each KPM to an array with one value per row"""
+        csvfile, writer, keys = self.writers[file_name]
+        size = len(rows['ueImsiComplete'])
+        columns = [np.broadcast_to(rows.get(key, 0), size) for key in keys]
+        writer.writerows(zip(*(column.tolist() for column in columns)))
+
+    def _compute_kpms(self, timestamp: int) -> dict:
+        """Evolve the channel and the traffic and return the per-UE KPMs of the indication"""
+        self.sinr += self.rng.normal(0.0, 1.0, size=self.sinr.shape)
+        serving_index = self.serving - GNB_CELL_IDS[0]
+        serving_sinr = self.sinr[np.arange(self.num_ues), serving_index]
+        active = self.rng.random(self.num_ues) < self.activity
+
+        # PRBs are shared evenly among the active UEs of the cell
+        active_per_cell = np.bincount(serving_index, weights=active, minlength=len(GNB_CELL_IDS))
+        share = np.where(active, 1.0 / np.maximum(active_per_cell[serving_index], 1), 0.0)
+        spectral_efficiency = np.log2(1 + 10 ** (serving_sinr / 10))
+        throughput = share * NUM_PRBS * PRB_BANDWIDTH_HZ * spectral_efficiency / 1e3  # kbps
+        tx_bytes = throughput * self.period_ms / 8
+        prbs = share * NUM_PRBS * self.period_ms
+        tbs = np.where(active, self.period_ms, 0)
+
+        # The six strongest neighbours of each UE
+        neighbours = np.argsort(-self.sinr, axis=1)
+        neighbours = neighbours[neighbours != serving_index[:, None]].reshape(self.num_ues, -1)[:, :6]
+
+        return {
+            'timestamp': timestamp, 'active': active, 'serving_index': serving_index,
+            'active_per_cell': active_per_cell, 'serving_sinr': serving_sinr, 'throughput': throughput,
+            'tx_bytes': tx_bytes, 'prbs': prbs, 'tbs': tbs, 'neighbours': neighbours,
+        }
+
+    def _rows(self, kpms: dict) -> dict:
+        """Build the rows of every KPM file from the per-UE KPMs
+            Returns:
+                dictionary whose keys are the file names and values are the rows, see _write_rows()
+        """
+        timestamp = kpms['timestamp']
+        sinr = kpms['serving_sinr']
+        prb_used_cell = np.bincount(kpms['serving_index'], weights=kpms['prbs'], minlength=len(GNB_CELL_IDS))
+        tbs = kpms['tbs']
+        qpsk = np.where(sinr < 5, tbs, 0)
+        qam16 = np.where((sinr >= 5) & (sinr < 15), tbs, 0)
+        qam64 = np.where(sinr >= 15, tbs, 0)
+
+        rows = {}
+        rows[f'cu-up-cell-{LTE_CELL_ID}.txt'] = {'timestamp': timestamp, 'ueImsiComplete': self.imsis}
+        rows[f'cu-cp-cell-{LTE_CELL_ID}.txt'] = {
+            'timestamp': timestamp, 'ueImsiComplete': self.imsis, 'numActiveUes': self.num_ues,
+            'DRB.EstabSucc.5QI.UEID (numDrb)': 1, 'sameCellSinr': sinr, 'sameCellSinr 3gpp encoded': sinr,
+        }
+        for index, cell_id in enumerate(GNB_CELL_IDS):
+            ues = kpms['serving_index'] == index
+            neighbours = kpms['neighbours'][ues]
+            cu_cp = {
+                'timestamp': timestamp, 'ueImsiComplete': self.imsis[ues], 'numActiveUes': int(kpms['active_per_cell'][index]),
+                'DRB.EstabSucc.5QI.UEID (numDrb)': 1, 'L3 serving Id(m_cellId)': cell_id, 'UE (imsi)': self.imsis[ues],
+                'L3 serving SINR': sinr[ues], 'L3 serving SINR 3gpp': sinr[ues],
+            }
+            for n in range(neighbours.shape[1]):
+                neighbour_sinr = self.sinr[ues, neighbours[:, n]]
+                cu_cp[f'L3 neigh Id {n + 1} (cellId)'] = neighbours[:, n] + GNB_CELL_IDS[0]
+                cu_cp[f'L3 neigh SINR {n + 1}'] = neighbour_sinr
+                cu_cp[f'L3 neigh SINR 3gpp {n + 1} (convertedSinr)'] = neighbour_sinr
+            rows[f'cu-cp-cell-{cell_id}.txt'] = cu_cp
+            rows[f'cu-up-cell-{cell_id}.txt'] = {
+                'timestamp': timestamp, 'ueImsiComplete': self.imsis[ues],
+                'QosFlow.PdcpPduVolumeDL_Filter.UEID(txPdcpPduBytesNrRlc)': kpms['tx_bytes'][ues],
+                'DRB.PdcpPduNbrDl.Qos.UEID (txPdcpPduNrRlc)': tbs[ues],
+            }
+            rows[f'du-cell-{cell_id}.txt'] = {
+                'timestamp': timestamp, 'ueImsiComplete': self.imsis[ues], 'nrCellId': cell_id,
+                'dlAvailablePrbs': NUM_PRBS, 'ulAvailablePrbs': NUM_PRBS, 'qci': 1,
+                'dlPrbUsage': prb_used_cell[index] / (NUM_PRBS * self.period_ms) * 100,
+                'TB.TotNbrDl.1': tbs[ues].sum(), 'TB.TotNbrDlInitial': tbs[ues].sum(),
+                'TB.TotNbrDlInitial.Qpsk': qpsk[ues].sum(), 'TB.TotNbrDlInitial.16Qam': qam16[ues].sum(),
+                'TB.TotNbrDlInitial.64Qam': qam64[ues].sum(), 'RRU.PrbUsedDl': prb_used_cell[index],
+                'QosFlow.PdcpPduVolumeDL_Filter': kpms['tx_bytes'][ues].sum(),
+                'L1M.RS-SINR.Bin34': np.sum(sinr[ues] < 0), 'DRB.MeanActiveUeDl': kpms['active_per_cell'][index],
+                'TB.TotNbrDl.1.UEID': tbs[ues], 'TB.TotNbrDlInitial.UEID': tbs[ues],
+                'TB.TotNbrDlInitial.Qpsk.UEID': qpsk[ues], 'TB.TotNbrDlInitial.16Qam.UEID': qam16[ues],
+                'TB.TotNbrDlInitial.64Qam.UEID': qam64[ues], 'QosFlow.PdcpPduVolumeDL_Filter.UEID': kpms['tx_bytes'][ues],
+                'RRU.PrbUsedDl.UEID': kpms['prbs'][ues], 'DRB.UEThpDl.UEID': kpms['throughput'][ues],
+                'DRB.UEThpDlPdcpBased.UEID': kpms['throughput'][ues],
+            }
+        return rows
+
+    def _write_indication(self, timestamp: int):
+        for file_name, rows in self._rows(self._compute_kpms(timestamp)).items():
+            if self.kpm_writer is not None:
+                # The environment sets the cellId of the csv rows from the name of the file
+                table_name, cell_id = self.tables[file_name]
+                if table_name != 'du':
+                    rows['cellId'] = cell_id
+                self.kpm_writer.write(table_name, rows)
+            else:
+                self._write_rows(file_name, rows)
+        for csvfile, _, _ in self.writers.values():
+            csvfile.flush()
+
+    def _read_actions(self) -> np.ndarray:
+        """Read the new handover commands as an array of (ueId, target cell) rows"""
+        if self.control_reader is not None:
+            records = self.control_reader.read()
+            return np.stack([records['ueId'], records['target']], axis=1)
+
+        if not os.path.exists(self.control_path):
+            return np.empty((0, 2), dtype=np.int64)
+        with open(self.control_path, 'r') as control_file:
+            control_file.seek(self.control_offset)
+            lines = control_file.readlines()
+            self.control_offset = control_file.tell()
+        actions = [line.strip().split(',')[1:3] for line in lines if line.strip()]
+        return np.array(actions, dtype=np.int64).reshape(-1, 2)
+
+    def _apply_actions(self, actions: np.ndarray):
+        valid = (actions[:, 0] >= 1) & (actions[:, 0] <= self.num_ues) & np.isin(actions[:, 1], GNB_CELL_IDS)
+        ue_index = actions[valid, 0] - 1
+        self.handovers += int(np.count_nonzero(self.serving[ue_index] != actions[valid, 1]))
+        self.serving[ue_index] = actions[valid, 1]
+
+    def run(self):
+        for indication in range(1, self.num_indications + 1):
+            self._write_indication(indication * self.period_ms)
+            if self.use_semaphores:
+                self.metricsReadySemaphore.release()
+                self.controlSemaphore.acquire()
+            self._apply_actions(self._read_actions())
+
+        for csvfile, _, _ in self.writers.values():
+            csvfile.close()
+        if self.control_reader is not None:
+            self.control_reader.close()
+        if self.kpm_writer is not None:
+            self.kpm_writer.close()
+        print(f'Local simulation completed: {self.num_indications} indications, {self.handovers} handovers')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Local stand-in for the ns-O-RAN scenario')
+    parser.add_argument('--ues', type=int, required=True)
+    parser.add_argument('--simTime', type=float, default=1.0)
+    parser.add_argument('--indicationPeriodicity', type=float, default=0.1)
+    parser.add_argument('--useSemaphores', type=int, default=1)
+    parser.add_argument('--trafficModel', type=int, default=0)
+    parser.add_argument('--RngRun', type=int, default=1)
+    # The other parameters of the scenario (e.g., hoSinrDifference) are accepted and ignored
+    args, _ = parser.parse_known_args(argv)
+
+    simulator = LocalSimulator(os.getcwd(), ues=args.ues, sim_time=args.simTime,
+                               indication_periodicity=args.indicationPeriodicity, use_semaphores=bool(args.useSemaphores),
+                               traffic_model=args.trafficModel, seed=args.RngRun)
+    simulator.run()
+
+
+if __name__ == '__main__':
+    main()
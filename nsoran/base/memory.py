@@ -0,0 +1,153 @@
+import os
+import json
+import tracemalloc
+import numpy as np
+import gymnasium as gym
+
+
+def rss_bytes(pid='self') -> int:
+    """Resident memory of a process read from /proc, 0 if it cannot be read"""
+    try:
+        with open(f'/proc/{pid}/statm', 'r') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+class MemoryProfiler:
+    """
+    The MemoryProfiler looks for memory growth in long runs: at each step it samples the RSS of the Python process
+    (which includes the agent) and of the simulation, and every few steps it takes a tracemalloc snapshot and keeps
+    the allocators that grew the most since the previous snapshot. At the end of each episode, the growth of the RSS
+    per step is estimated with a linear fit and, if a bound is given, checked.
+    """
+    every: int
+    top: int
+    max_slope_kb: float
+    warmup_steps: int
+
+    def __init__(self, every: int = 100, top: int = 10, max_slope_kb: float = None, warmup_steps: int = 10, frames: int = 5):
+        """Initialize the profiler and start tracemalloc, if it is not tracing yet
+        Args:
+            every (int): number of steps between two tracemalloc snapshots
+            top (int): number of allocators kept for each snapshot difference
+            max_slope_kb (float): if set, maximum growth of the RSS of the Python process in kB per step within an episode
+            warmup_steps (int): steps at the beginning of each episode that are not considered for the slope
+            frames (int): number of frames of the tracebacks recorded by tracemalloc
+        """
+        self.every = every
+        self.top = top
+        self.max_slope_kb = max_slope_kb
+        self.warmup_steps = warmup_steps
+        self.samples = []
+        self.episodes = []
+        self.top_allocators = []
+        self.total_steps = 0
+        self.episode_start = 0
+        self.previous_snapshot = None
+        # The tracing started by someone else (e.g., python -X tracemalloc) is left running at the close
+        self.started_tracing = not tracemalloc.is_tracing()
+        if self.started_tracing:
+            tracemalloc.start(frames)
+
+    def begin_episode(self):
+        self.episode_start = len(self.samples)
+
+    def sample(self, child_pid: int = None):
+        """Record the memory after a step
+        Args:
+            child_pid (int): pid of the simulation, if running
+        """
+        self.total_steps += 1
+        self.samples.append({
+            'step': self.total_steps,
+            'episode': len(self.episodes),
+            'rss_mb': rss_bytes() / 2**20,
+            'child_rss_mb': rss_bytes(child_pid) / 2**20 if child_pid else 0.0,
+            'traced_mb': tracemalloc.get_traced_memory()[0] / 2**20,
+        })
+        if self.total_steps % self.every == 0:
+            self.snapshot()
+
+    def snapshot(self):
+        """Take a tracemalloc snapshot and record the allocators that grew the most since the previous one"""
+        snapshot = tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+        if self.previous_snapshot is not None:
+            stats = snapshot.compare_to(self.previous_snapshot, 'traceback')[:self.top]
+            self.top_allocators.append({
+                'step': self.total_steps,
+                'allocators': [{'size_diff_kb': stat.size_diff / 1024, 'count_diff': stat.count_diff,
+                                'traceback': stat.traceback.format()} for stat in stats],
+            })
+        self.previous_snapshot = snapshot
+
+    def end_episode(self) -> float:
+        """Estimate the growth of the RSS in the episode that just ended
+            Returns:
+                slope of the RSS of the Python process in kB per step, NaN if the episode is too short
+        """
+        samples = self.samples[self.episode_start + self.warmup_steps:]
+        slope = float('nan')
+        child_slope = float('nan')
+        if len(samples) >= 2:
+            slope = float(np.polyfit([sample['step'] for sample in samples], [sample['rss_mb'] * 1024 for sample in samples], 1)[0])
+        # The simulation is not running after its last step
+        child_samples = [sample for sample in samples if sample['child_rss_mb'] > 0]
+        if len(child_samples) >= 2:
+            child_slope = float(np.polyfit([sample['step'] for sample in child_samples],
+                                           [sample['child_rss_mb'] * 1024 for sample in child_samples], 1)[0])
+        self.episodes.append({'episode': len(self.episodes), 'steps': len(self.samples) - self.episode_start,
+                              'rss_slope_kb_per_step': slope, 'child_rss_slope_kb_per_step': child_slope})
+        self.episode_start = len(self.samples)
+        if self.max_slope_kb is not None and slope > self.max_slope_kb:
+            raise AssertionError(f'Memory grows by {slope:.1f} kB per step in episode {len(self.episodes) - 1}, '
+                                 f'above the bound of {self.max_slope_kb} kB per step')
+        return slope
+
+    def write_report(self, file_path: str):
+        with open(file_path, 'w') as report:
+            json.dump({'episodes': self.episodes, 'top_allocators': self.top_allocators, 'samples': self.samples}, report, indent=1)
+
+    def close(self):
+        self.previous_snapshot = None
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+
+
+class MemoryProfileWrapper(gym.Wrapper):
+    """
+    Wrapper that profiles the memory of an NsOranEnv and of the agent that uses it with a MemoryProfiler,
+    e.g., MemoryProfileWrapper(TrafficSteeringEnv(...), every=500, max_slope_kb=16, report_path='memory.json').
+    The report is written when the environment is closed.
+    """
+    def __init__(self, env: gym.Env, report_path: str = None, **profiler_kwargs):
+        """Wrap the environment
+        Args:
+            env (gym.Env): environment to profile
+            report_path (str): if set, path of the JSON report
+            profiler_kwargs: arguments of the MemoryProfiler
+        """
+        super().__init__(env)
+        self.report_path = report_path
+        self.profiler = MemoryProfiler(**profiler_kwargs)
+
+    def reset(self, **kwargs):
+        result = self.env.reset(**kwargs)
+        self.profiler.begin_episode()
+        return result
+
+    def step(self, action):
+        result = self.env.step(action)
+        ns_env = self.env.unwrapped
+        self.profiler.sample(ns_env.sim_process.pid if ns_env.is_open else None)
+        terminated, truncated = result[2], result[3]
+        if terminated or truncated:
+            self.profiler.end_episode()
+        return result
+
+    def close(self):
+        super().close()
+        if self.report_path:
+            self.profiler.write_report(self.report_path)
+        self.profiler.close()
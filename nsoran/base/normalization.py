@@ -0,0 +1,119 @@
+import numpy as np
+import gymnasium as gym
+
+
+class RunningStatistics:
+    """
+    The RunningStatistics keeps the running mean and variance of each KPM column of the observations, updated with a
+    whole batch of rows at a time through the parallel form of Welford's algorithm (Chan et al.).
+    A single instance can be shared by the wrappers of several environments, e.g., the sub-environments of a
+    SyncVectorEnv, while the statistics of different processes can be combined with merge().
+    """
+    mean: np.ndarray
+    var: np.ndarray
+    count: int
+
+    def __init__(self, num_columns: int):
+        self.mean = np.zeros(num_columns, dtype=np.float64)
+        self.var = np.ones(num_columns, dtype=np.float64)
+        self.count = 0
+
+    def update(self, rows: np.ndarray):
+        """Add a batch of rows, i.e., an array of shape (n, num_columns)"""
+        if len(rows) == 0:
+            return
+        self.update_from_moments(rows.mean(axis=0, dtype=np.float64), rows.var(axis=0, dtype=np.float64), len(rows))
+
+    def update_from_moments(self, batch_mean: np.ndarray, batch_var: np.ndarray, batch_count: int):
+        total = self.count + batch_count
+        delta = batch_mean - self.mean
+        m2 = self.var * self.count + batch_var * batch_count + delta ** 2 * self.count * batch_count / total
+        self.mean = self.mean + delta * batch_count / total
+        self.var = m2 / total
+        self.count = total
+
+    def merge(self, other: 'RunningStatistics'):
+        """Add the statistics of another instance, e.g., the one of another process"""
+        if other.count:
+            self.update_from_moments(other.mean, other.var, other.count)
+
+    def save(self, file_path: str):
+        with open(file_path, 'wb') as statistics_file:
+            np.savez(statistics_file, mean=self.mean, var=self.var, count=self.count)
+
+    @classmethod
+    def load(cls, file_path: str) -> 'RunningStatistics':
+        with np.load(file_path) as data:
+            statistics = cls(len(data['mean']))
+            statistics.mean = data['mean']
+            statistics.var = data['var']
+            statistics.count = int(data['count'])
+        return statistics
+
+
+class NormalizeObservationWrapper(gym.ObservationWrapper):
+    """
+    Wrapper that standardizes each KPM column of the observations of an NsOranEnv with its running mean and variance,
+    e.g., NormalizeObservationWrapper(TrafficSteeringEnv(...), skip_columns=[0]) leaves the ueImsiComplete untouched.
+    The observation is normalized in place, thus it must be a float array; if the environment exposes an obs_mask,
+    only the valid rows update the statistics. The statistics are frozen by freeze(), e.g., for the evaluation.
+    The observations must not be stacked: a FrameStackWrapper is wrapped around this wrapper, not the other way around.
+    """
+    def __init__(self, env: gym.Env, statistics: RunningStatistics = None, skip_columns: list = None,
+                 epsilon: float = 1e-8, clip: float = None, training: bool = True):
+        """Wrap the environment
+        Args:
+            env (gym.Env): environment whose observations are (rows, KPM columns) arrays
+            statistics (RunningStatistics): statistics to use, possibly shared with other wrappers or loaded from a
+                                            checkpoint; new ones otherwise
+            skip_columns (list): columns that are not normalized, e.g., the identifiers
+            epsilon (float): added to the variance to avoid the division by 0
+            clip (float): if set, the normalized values are clipped in [-clip, clip]
+            training (bool): whether the observations update the statistics
+        """
+        super().__init__(env)
+        if len(self.observation_space.shape) > 2:
+            raise ValueError(f'The observations of shape {self.observation_space.shape} are stacked: '
+                             f'wrap the FrameStackWrapper around the NormalizeObservationWrapper instead')
+        num_columns = self.observation_space.shape[-1]
+        columns = np.setdiff1d(np.arange(num_columns), skip_columns if skip_columns is not None else [])
+        # Contiguous columns are normalized through a view of the observation, without copies
+        contiguous = len(columns) > 0 and columns[-1] - columns[0] + 1 == len(columns)
+        self.columns = slice(columns[0], columns[-1] + 1) if contiguous else columns
+        self.statistics = statistics if statistics is not None else RunningStatistics(num_columns)
+        if len(self.statistics.mean) != num_columns:
+            raise ValueError(f'The statistics have {len(self.statistics.mean)} columns, the observations {num_columns}')
+        self.epsilon = epsilon
+        self.clip = clip
+        self.training = training
+
+    def freeze(self):
+        self.training = False
+
+    def unfreeze(self):
+        self.training = True
+
+    def observation(self, observation: np.ndarray) -> np.ndarray:
+        return self.normalize(observation, getattr(self.env.unwrapped, 'obs_mask', None), self.training)
+
+    def normalize(self, observation: np.ndarray, obs_mask: np.ndarray = None, update: bool = False) -> np.ndarray:
+        """Normalize an observation in place, e.g., a past one rebuilt by a FrameStackWrapper
+        Args:
+            observation (np.ndarray): (rows, KPM columns) observation
+            obs_mask (np.ndarray): if set, valid rows of the observation; the other ones are zeroed
+            update (bool): whether the valid rows update the statistics
+        """
+        if update:
+            self.statistics.update(observation[obs_mask] if obs_mask is not None else observation.reshape(-1, observation.shape[-1]))
+        columns = self.columns
+        values = observation[..., columns]
+        values -= self.statistics.mean[columns]
+        values /= np.sqrt(self.statistics.var[columns] + self.epsilon)
+        if self.clip is not None:
+            np.clip(values, -self.clip, self.clip, out=values)
+        if obs_mask is not None:
+            # The padding of the missing rows is left as is
+            values[~obs_mask] = 0
+        if not isinstance(columns, slice):
+            observation[..., columns] = values
+        return observation
@@ -1,8 +1,8 @@
 from abc import abstractmethod
 import sem
 import pprint
+import logging
 import fcntl
-import selectors
 import time
 from typing import Any, SupportsFloat
 import uuid
@@ -10,16 +10,32 @@ import gymnasium as gym
 import os
 import glob
 import csv
-from posix_ipc import Semaphore, O_CREAT, BusyError
+import json
+from posix_ipc import Semaphore, O_CREAT
 from .action_controller import ActionController
 from .datalake import SQLiteDatabaseAPI
+from .shm_control import SharedMemoryActionController
+from .shm_kpm import SharedMemoryKpmReader, KPM_DTYPES
+from .stream_capture import StreamCapture
+from .scratch import ArtifactPromoter
+from .profiling import PhaseTimer
+from .episode_profiler import EpisodeProfiler
+from .tracing import ChromeTracer, trace_span, trace_clock, TRACE_FILE
+from .retention import SimulationDirectoryManager, SIM_RESULT_FILE, KEEP_FLAG_FILE
+from .sim_pool import SimulationInstance, SimulationPool
+from .waiter import SimulationWaiter
+from .options import EnvOptions
 from importlib.machinery import SourceFileLoader
 import types
 import subprocess
 
+logger = logging.getLogger(__name__)
+
 class NsOranEnv(gym.Env):
     """Base abstract class for a ns-O-RAN enviroment compliant with Gymnasium"""
     metadata = {'render_modes': ['ansi']}
+    control_transports = {'file': ActionController, 'shm': SharedMemoryActionController}
+    kpm_transports = ['csv', 'shm']
     ns3_path: str
     scenario : str  
     scenario_configuration: dict
@@ -30,15 +46,27 @@ class NsOranEnv(gym.Env):
     sim_process : subprocess.Popen
     metricsReadySemaphore : Semaphore
     controlSemaphore : Semaphore
+    sim_instance : SimulationInstance
+    waiter : SimulationWaiter
+    stdout_capture : StreamCapture
+    stderr_capture : StreamCapture
     control_header : list
     log_file: str
     control_file: str
     is_open: bool
     action_controller: ActionController
     datalake: SQLiteDatabaseAPI
+    pool: SimulationPool
+    promoter: ArtifactPromoter
+    retention: SimulationDirectoryManager
+    timer: PhaseTimer
+    tracer: ChromeTracer
+    episode_profiler: EpisodeProfiler
+    options: EnvOptions
 
     def __init__(self, render_mode:str=None, ns3_path:str=None, scenario:str=None, scenario_configuration:dict=None, output_folder:str=None,
-                 optimized:bool=True, skip_configuration:bool=False, control_header: list = [], log_file: str = '', control_file: str = ''):
+                 optimized:bool=True, skip_configuration:bool=False, control_header: list = [], log_file: str = '', control_file: str = '',
+                 options: EnvOptions = None):
         """Initialize environment 
         Args:
             render_mode (str): Select one of the render modes available.
@@ -51,11 +79,22 @@ class NsOranEnv(gym.Env):
             control_header (list): list of features that composes the control action specific to the use case.
             log_file (str): name of the file that saves the action generated by the agent in the simulation output folder.
             control_file (str): name of the file that delivers the action generated by the agent to the simulation.
+            options (EnvOptions): opt-in features, e.g., the pool of simulations, the transports, the scratch folder, the
+                                  retention policies and the profiling, see options.py. All of them are disabled by default.
         """
-
+        self.options = options = options if options is not None else EnvOptions()
+        transport = options.transport
+        if transport.control not in self.control_transports:
+            raise ValueError(f'{transport.control} is not a valid control transport. Values accepted are: {list(self.control_transports)}')
+        if transport.kpm not in self.kpm_transports:
+            raise ValueError(f'{transport.kpm} is not a valid KPM transport. Values accepted are: {self.kpm_transports}')
         if render_mode and render_mode not in self.metadata['render_modes']:
             raise ValueError(f'{render_mode} is not a valid render mode. Values accepted are: {self.metadata["render_modes"]}')
         self.render_mode = render_mode
+        for value, name in ((transport.control, 'control'), (transport.kpm, 'kpm')):
+            if value == 'shm' and not options.sim_command:
+                logger.warning("The %s transport 'shm' requires a simulation that supports it (e.g., the local stand-in simulator), "
+                               "the ns-3 scenario does not", name)
 
         self.ns3_path = ns3_path
         self.scenario = scenario            
@@ -69,14 +108,47 @@ class NsOranEnv(gym.Env):
 
         self.is_open = False
         self.return_info = False
-
-        self.setup_sim()
-        print("\nsetup_sim finished!")
+        self.pool = None
+        self.retention = None
+        if options.retention.enabled:
+            self.retention = SimulationDirectoryManager(output_folder, keep_last=options.retention.keep_last,
+                                                        keep_failed=options.retention.keep_failed, max_total_mb=options.retention.max_mb)
+        self.promoter = None
+        if options.scratch.folder:
+            # The retention policies are applied once the artifacts of a simulation reach the output folder
+            self.promoter = ArtifactPromoter(options.scratch.folder, output_folder, artifacts=options.scratch.artifacts,
+                                             archive=options.scratch.archive, budget_mb=options.scratch.budget_mb,
+                                             on_promoted=self.retention.schedule if self.retention is not None else None)
+        profiling = options.profiling
+        self.tracer = ChromeTracer(type(self).__name__) if profiling.trace else None
+        self.timer = PhaseTimer(profiling.phase_timing, self.tracer)
+        self.episode_profiler = (EpisodeProfiler(profiling.profiler, profiling.profiler_episode, profiling.profiler_steps)
+                                 if profiling.profiler else EpisodeProfiler.from_environment())
+        self.episode_index = -1
+        self.step_index = 0
+
+        with trace_span(self.tracer, 'setup_sim'):
+            self.setup_sim()
+        logger.info("setup_sim finished")
+
+        if options.pool.size > 0:
+            self.pool = SimulationPool(self._launch_sim, size=options.pool.size, max_memory_mb=options.pool.max_memory_mb)
+            with trace_span(self.tracer, 'fill_pool'):
+                self.pool.fill()
     
     def setup_sim(self):
         """Setup all the relevant parameters to configure, compile and execute the simulation.
            This should be called once and it is mostly taken from sem.runner.SimulationRunner::__init__().
         """
+        if self.options.sim_command:
+            # The simulation is not ns-3 (e.g., the local stand-in simulator), thus there is nothing to build
+            package_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+            self.script_executable = self.options.sim_command[0]
+            self.environment = {
+                'PATH': os.environ.get('PATH', ''),
+                'PYTHONPATH': os.pathsep.join(filter(None, [package_root, os.environ.get('PYTHONPATH')]))}
+            return
+
         if self.optimized:
             # For old ns-3 installations, the library is in build, while for
             # recent ns-3 installations it's in build/lib. Both paths are
@@ -96,7 +168,8 @@ class NsOranEnv(gym.Env):
         
         # Configure and build ns-3
         # print('Start configuration')
-        self.configure_and_build_ns3()
+        with trace_span(self.tracer, 'build'):
+            self.configure_and_build_ns3()
         # print('Configuration complete')
 
         # ns-3's build status output is used to get the executable path for the
@@ -185,39 +258,46 @@ class NsOranEnv(gym.Env):
         j_argument = ['-j', str(os.cpu_count())] # if this makes problems just cut it
         subprocess.run(['python3', build_program] + j_argument + ['build'],
                                          cwd=self.ns3_path, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
-        print(f"\nself.ns3_path: {self.ns3_path}\n")
+        logger.info("ns-3 built in %s", self.ns3_path)
 
     def start_sim(self):
         """
-            Start the ns-3 simulation and all the entities to manage the control, i.e.,:
+            Start the ns-3 simulation and all the entities to manage the control, see _launch_sim().
+        """
+        if self.is_open:
+            raise ValueError('The environment is open and a new start_sim has been called.')
+
+        self._attach_sim(self._launch_sim())
+
+    def _launch_sim(self) -> SimulationInstance:
+        """
+            Launch a new ns-3 simulation and all the entities to manage its control, i.e.,:
                 1 - Create simulation folder inside the output folder chosen by the user.
                 2 - Create Datalake and Action Controller.
                 3 - Create the Semaphores.
                 4 - Start the Simulation.
+            The simulation is not bound to the environment, see _attach_sim().
         """
-        if self.is_open:
-            raise ValueError('The environment is open and a new start_sim has been called.')
-
-        self.is_open = True
         # We may need to explicit the default values as well here, but for the moment we only change the values of the configuration
         # A good way would be to explict such values is to port here sem.manager.CampaignManager::check_and_fill_parameters
         parameters = self.scenario_configuration
-        print("\nparameters (scenario configuration): ")
-        pprint.pprint(parameters)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("parameters (scenario configuration):\n%s", pprint.pformat(parameters))
         
         # sem.CampaignManager.check_and_fill_parameters()
 
         ### Create simulation folder inside the output folder chosen by the user, mostly taken from sem.runner.SimulationRunner::run_simulations() ###
-        self.sim_result = { 'params': {}, 'meta': {} }
-        self.sim_result['params'].update(parameters)
+        sim_result = { 'params': {}, 'meta': {} }
+        sim_result['params'].update(parameters)
 
-        command = [self.script_executable] + ['--%s=%s' % (param, value) for param, value in parameters.items()]
+        command = (self.options.sim_command or [self.script_executable]) + ['--%s=%s' % (param, value) for param, value in parameters.items()]
         
-        # Run from dedicated self.sim_path folder
+        # Run from dedicated sim_path folder
         sim_uuid = str(uuid.uuid4())
-        self.sim_result['meta']['id'] = sim_uuid
-        self.sim_path = os.path.join(self.output_folder, self.sim_result['meta']['id'])
-        os.makedirs(self.sim_path)
+        sim_result['meta']['id'] = sim_uuid
+        sim_folder = self.promoter.scratch_path() if self.promoter is not None else self.output_folder
+        sim_path = os.path.join(sim_folder, sim_result['meta']['id'])
+        os.makedirs(sim_path)
 
         ### End create simulation folder ###
 
@@ -232,25 +312,24 @@ class NsOranEnv(gym.Env):
         if not self.control_header:
             raise ValueError('Missing the list of values to perform control.')
         
-        print(f"\nself.sim_path: {self.sim_path}\n")
-        self.action_controller = ActionController(self.sim_path, self.log_file, self.control_file, self.control_header)
-        self.datalake = SQLiteDatabaseAPI(self.sim_path, num_ues_gnb=self.sim_result['params']['ues'])
-        pprint.pprint(self.datalake.__dict__)
-        # print(f"\nself.datalake: {self.datalake.__dict__}")
+        logger.info("sim_path: %s", sim_path)
+        transport = self.options.transport
+        action_controller = self.control_transports[transport.control](sim_path, self.log_file, self.control_file, self.control_header,
+                                                                       durability=transport.control_durability,
+                                                                       log_format=transport.action_log_format)
+        datalake = SQLiteDatabaseAPI(sim_path, num_ues_gnb=sim_result['params']['ues'], keep_database=self.options.output.keep_datalake)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("datalake: %s", pprint.pformat(datalake.__dict__))
+        kpm_reader = SharedMemoryKpmReader(sim_path, num_ues=datalake.num_ues) if transport.kpm == 'shm' else None
 
         ### End Datalake and Action Controller ###
 
         ### Create the Semaphores ###
 
-        nameMetricsReadySemaphore = "/sem_metrics_" + self.sim_path.split('/')[-1]
-        nameControlSemaphore = "/sem_control_" + self.sim_path.split('/')[-1]
-        self.metricsReadySemaphore = Semaphore(nameMetricsReadySemaphore, O_CREAT, 0)
-        self.controlSemaphore = Semaphore(nameControlSemaphore, O_CREAT, 0)
-        self.last_timestamp = 0
-
-        # print()
-        # print(nameControlSemaphore)
-        # print(nameMetricsReadySemaphore)
+        nameMetricsReadySemaphore = "/sem_metrics_" + sim_path.split('/')[-1]
+        nameControlSemaphore = "/sem_control_" + sim_path.split('/')[-1]
+        metricsReadySemaphore = Semaphore(nameMetricsReadySemaphore, O_CREAT, 0)
+        controlSemaphore = Semaphore(nameControlSemaphore, O_CREAT, 0)
         
         ### End create the Semaphores ###
         
@@ -259,23 +338,42 @@ class NsOranEnv(gym.Env):
         # launch the simulation with the wanted configuration
         # Store process id or whatever reference we can use for the simulation
         
-        self.sim_result['meta']['start_time'] = time.time()
+        sim_result['meta']['start_time'] = time.time()
 
-        print(f"\ncommand: {command}\n")
-        self.sim_process = subprocess.Popen(command, cwd=self.sim_path, env=self.environment,
+        logger.info("command: %s", command)
+        sim_process = subprocess.Popen(command, cwd=sim_path, env=self.environment,
                                         stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
 
-        # Register the stdout and stderr file descriptors with the selector
-        self.selector = selectors.DefaultSelector()
-
         # Set non-blocking mode for stdout and stderr
-        self._set_nonblocking(self.sim_process.stdout)
-        self._set_nonblocking(self.sim_process.stderr)
-
-        self.selector.register(self.sim_process.stdout, selectors.EVENT_READ)
-        self.selector.register(self.sim_process.stderr, selectors.EVENT_READ)
+        self._set_nonblocking(sim_process.stdout)
+        self._set_nonblocking(sim_process.stderr)
+        # The output is appended to files that stay open for the whole simulation
+        output = self.options.output
+        stdout_capture = StreamCapture(os.path.join(sim_path, 'stdout'), output.stream_tail_kb * 1024, output.compress_streams)
+        stderr_capture = StreamCapture(os.path.join(sim_path, 'stderr'), output.stream_tail_kb * 1024, output.compress_streams)
         ### End create simulation ###
 
+        return SimulationInstance(sim_path, sim_result, sim_process, metricsReadySemaphore, controlSemaphore,
+                                  action_controller, datalake, kpm_reader, stdout_capture, stderr_capture)
+
+    def _attach_sim(self, instance: SimulationInstance):
+        """Bind a launched simulation to the environment, which becomes open"""
+        self.is_open = True
+        self.sim_instance = instance
+        self.sim_path = instance.sim_path
+        self.sim_result = instance.sim_result
+        self.sim_process = instance.sim_process
+        self.metricsReadySemaphore = instance.metricsReadySemaphore
+        self.controlSemaphore = instance.controlSemaphore
+        self.action_controller = instance.action_controller
+        self.datalake = instance.datalake
+        self.waiter = instance.waiter
+        self.kpm_reader = instance.kpm_reader
+        self.datalake.tracer = self.tracer
+        self.last_timestamp = 0
+        self.stdout_capture = instance.stdout_capture
+        self.stderr_capture = instance.stderr_capture
+
     @staticmethod
     def _set_nonblocking(fileobj):
         """Function to set non-blocking mode a fileobject. This ensures that the select() and read() of I/O are not blocking
@@ -285,21 +383,8 @@ class NsOranEnv(gym.Env):
         fcntl.fcntl(fd, fcntl.F_SETFL, flags | os.O_NONBLOCK)
         
     def read_streams(self):
-        events = self.selector.select(timeout=0)  # Non-blocking check
-        
-        stdout_file_path = os.path.join(self.sim_path, 'stdout')
-        stderr_file_path = os.path.join(self.sim_path, 'stderr')
-        
-        with open(stdout_file_path, 'w+') as stdout_file, open(
-                stderr_file_path, 'w+') as stderr_file:
-            for key, _ in events:
-                data = key.fileobj.read()
-                if not data:
-                    continue               
-                if key.fileobj is self.sim_process.stdout:
-                    stdout_file.write(data.strip())
-                elif key.fileobj is self.sim_process.stderr:
-                    stderr_file.write(data.strip())
+        """Move the available output of the simulation to the stdout and stderr captures"""
+        self.sim_instance.read_streams()
     
     def is_simulation_over(self) -> bool:
         """Checks whether the simulation is over or not.
@@ -319,18 +404,15 @@ class NsOranEnv(gym.Env):
             self.terminated = False
             self.truncated = True
 
-            stdout_file_path = os.path.join(self.sim_path, 'stdout')
-            stderr_file_path = os.path.join(self.sim_path, 'stderr')
-
-            with open(stdout_file_path, 'r') as stdout_file, open(
-                        stderr_file_path, 'r') as stderr_file:
-                complete_command = sem.utils.get_command_from_result(self.scenario, self.sim_result)
-                complete_command_debug = sem.utils.get_command_from_result(self.scenario, self.sim_result, debug=True)
-                error_message = (f'\nSimulation exited with an error.\nStderr: {stderr_file.read()}\n'
-                                    f'Stdout: {stdout_file.read()}\nUse this command to reproduce:\n{complete_command}\n'
-                                    f'Debug with gdb:\n{complete_command_debug}')
-                
-                print(error_message) 
+            # The complete output is in the capture files, the error reports the last part only
+            complete_command = sem.utils.get_command_from_result(self.scenario, self.sim_result)
+            complete_command_debug = sem.utils.get_command_from_result(self.scenario, self.sim_result, debug=True)
+            error_message = (f'\nSimulation exited with an error.\nStderr (tail): {self.stderr_capture.tail()}\n'
+                                f'Stdout (tail): {self.stdout_capture.tail()}\nUse this command to reproduce:\n{complete_command}\n'
+                                f'Debug with gdb:\n{complete_command_debug}\n'
+                                f'Complete output in {self.stdout_capture.file_path} and {self.stderr_capture.file_path}')
+            
+            logger.error(error_message)
         else:
             # The environment should return terminated and truncated since it is a time limit imposed
             self.terminated = True
@@ -343,10 +425,25 @@ class NsOranEnv(gym.Env):
 
     def reset(self, *, seed: int | None = None, options: dict[str, Any] | None = None):
         super().reset(seed=seed)
-        self.start_sim()
-        self.close()
-        print("Finished start_sim!")
-        print(f"\nself.is_open: {self.is_open}\n")
+        self.timer.new_step('reset/')
+        reset_start = time.perf_counter()
+        # Stop the simulation of the previous episode, if any
+        with self.timer.phase('stop_sim'):
+            self._stop_sim()
+        with self.timer.phase('start_sim'):
+            if self.pool is not None:
+                # The simulation has been launched in advance and it has already been waited for its first metrics
+                instance = self.pool.get()
+                self._attach_sim(instance)
+                metrics_acquired = instance.metrics_acquired
+            else:
+                self.start_sim()
+                metrics_acquired = False
+        logger.debug("Finished start_sim, is_open: %s", self.is_open)
+        self.episode_index += 1
+        self.step_index = 0
+        if self.episode_profiler is not None:
+            self.episode_profiler.update(self.episode_index, self.step_index, self.sim_path)
         if options:
             if 'return_info' in options:
                 self.return_info = options['return_info']
@@ -356,90 +453,149 @@ class NsOranEnv(gym.Env):
             self.return_info = False
 
         # The simulation is started, thus we have to wait to the first set of observations
-        print("Start metricsReadySemaphore.acquire ......")
-        self.metricsReadySemaphore.acquire()
-        print("Finished metricsReadySemaphore.acquire")
+        if not metrics_acquired:
+            logger.debug("Waiting for the first metrics")
+            with self.timer.phase('wait_metrics'):
+                metrics_acquired = self._wait_metrics()
+        if not metrics_acquired:
+            # The simulation exited before its first metrics, thus there is nothing to observe
+            error_message = (f'The simulation exited with code {self.sim_process.returncode} before its first metrics.\n'
+                             f'Stderr (tail): {self.stderr_capture.tail()}\nComplete output in {self.sim_path}')
+            self._stop_sim()
+            raise RuntimeError(error_message)
+        logger.debug("First metrics received")
         self._fill_datalake()
-        print("Finished _fill_datalake")
 
         self.terminated = False
         self.truncated = False
-        print("Start _get_obs, render......")
         # The Action is computed in the step, thus the control semaphore is not released
-        return (self._get_obs(), self.render()) if self.return_info else (self._get_obs(), {})
+        with self.timer.phase('get_obs'):
+            obs = self._get_obs()
+        return obs, self._step_info(reset_start)
 
     def step(self, action: object) -> tuple[object, SupportsFloat, bool, bool, dict[str, Any]]:
+        self.timer.new_step()
+        step_start = time.perf_counter()
+        self.step_index += 1
+        if self.episode_profiler is not None:
+            self.episode_profiler.update(self.episode_index, self.step_index, self.sim_path)
         # Simulation is open in Gym, but it can be terminated in ns-3
         if not self.is_simulation_over():
             # Take a step in the environment based on the given action
-            actions = self._compute_action(action)
-            print(f"\nactions: {actions}\n")
+            with self.timer.phase('compute_action'):
+                actions = self._compute_action(action)
+            logger.debug("actions: %s", actions)
 
             # Update the environment state and calculate the reward
-            self.action_controller.create_control_action(self.last_timestamp, actions)
-            # the action was written: notify the environment
-            self.controlSemaphore.release()
+            with self.timer.phase('control_write'):
+                self.action_controller.create_control_action(self.last_timestamp, actions)
+                # the action was written: notify the environment
+                self.controlSemaphore.release()
             
             # Wait for the new metrics to be available
-            is_still_active = True
-            while is_still_active:
-                try:
-                    self.metricsReadySemaphore.acquire(timeout=10)
-                    break
-                except BusyError: # The timeout has elapsed, so we need to check again whether the simulation is over or not
-                    is_still_active = not self.is_simulation_over()
+            with self.timer.phase('wait_metrics'):
+                self._wait_metrics()
             
             self._fill_datalake()
+            if self.promoter is not None and self.promoter.is_scratch(self.sim_path) and self.promoter.over_budget():
+                # The episode is truncated, the simulation is stopped and promoted at the next reset
+                logger.warning('Scratch folder %s above its budget of %s MB, truncating the episode',
+                               self.promoter.scratch_folder, self.promoter.budget_mb)
+                self.truncated = True
         
-        if self.return_info:
-            return_tuple = (self._get_obs(), self._compute_reward(), self.terminated, self.truncated, self.render()) 
-        else:
-            return_tuple = (self._get_obs(), self._compute_reward(), self.terminated, self.truncated, {})
-
-        return return_tuple
+        with self.timer.phase('get_obs'):
+            obs = self._get_obs()
+        with self.timer.phase('compute_reward'):
+            reward = self._compute_reward()
+        return obs, reward, self.terminated, self.truncated, self._step_info(step_start)
+
+    def _step_info(self, step_start: float):
+        """Return the info of reset() and step(), with the timings of the phases if phase_timing is set"""
+        info = self.render() if self.return_info else {}
+        usecase_info = self._usecase_info()
+        if usecase_info:
+            info = dict(info or {}, **usecase_info)
+        if self.timer.enabled:
+            self.timer.record(self.timer.prefix + 'total', time.perf_counter() - step_start)
+            info = dict(info or {}, timings=dict(self.timer.end_step()))
+        return info
+
+    def timing_summary(self) -> dict:
+        """Return count, mean, p50, p95, p99 and max (seconds) of each phase of reset() (prefixed by 'reset/') and step()"""
+        return self.timer.summary()
     
+    def _wait_metrics(self) -> bool:
+        """Wait until the simulation posts new metrics or it ends, whichever happens first.
+            The output of the simulation is consumed while waiting, so that ns-3 never blocks on a full pipe.
+            Returns:
+                True if new metrics are available, False if the simulation is over.
+        """
+        if self.waiter.wait(streams=[self.sim_process.stdout, self.sim_process.stderr], on_output=self.read_streams):
+            return True
+        return not self.is_simulation_over()
+
     def _fill_datalake(self):
         """Helper function that collects from the csv files the latest kpms and uploads them in the Datalake
         """
         self.datalake.acquire_connection()
-        for file_path in glob.glob(os.path.join(self.sim_path, 'cu-up-cell-*.txt')):
-            with open(file_path, 'r') as csvfile:
-                for row in csv.DictReader(csvfile):
-                    timestamp = int(row['timestamp'])
-                    if timestamp >= self.last_timestamp:
-                        cellId = self.datalake.extract_cellId(file_path)
-                        row['cellId'] = cellId
-                        if cellId == 1:
-                            self.datalake.insert_lte_cu_up(row)
-                        else:
-                            self.datalake.insert_gnb_cu_up(row)
-                        self.last_timestamp = timestamp
-
-        for file_path in glob.glob(os.path.join(self.sim_path, 'cu-cp-cell-*.txt')):            
-            with open(file_path, 'r') as csvfile:
-                for row in csv.DictReader(csvfile):
-                    timestamp = int(row['timestamp'])
-                    if timestamp >= self.last_timestamp:
-                        cellId = self.datalake.extract_cellId(file_path)
-                        row['cellId'] = cellId
-                        if cellId == 1:
-                            self.datalake.insert_lte_cu_cp(row)
-                        else:
-                            self.datalake.insert_gnb_cu_cp(row)
-                        self.last_timestamp = timestamp
-
-        for file_path in glob.glob(os.path.join(self.sim_path, 'du-cell-*.txt')):     
-            with open(file_path, 'r') as csvfile:
-                for row in csv.DictReader(csvfile):
-                    timestamp = int(row['timestamp'])
-                    if timestamp >= self.last_timestamp:
-                        self.datalake.insert_du(row)
-                        self.last_timestamp = timestamp
+        if self.kpm_reader is not None:
+            self._fill_datalake_shm()
+        else:
+            self._fill_datalake_csv()
         
-        self._fill_datalake_usecase()
+        with self.timer.phase('fill_usecase'):
+            self._fill_datalake_usecase()
         
         self.datalake.release_connection()
 
+    def _fill_datalake_shm(self):
+        """Upload in the Datalake the binary records written in the KPM shared memory segment since the last indication"""
+        for table_name in KPM_DTYPES:
+            with self.timer.phase(f'fill_{table_name}'):
+                records = self.kpm_reader.read(table_name)
+                if len(records):
+                    self.datalake.insert_rows(table_name, records.dtype.names, records.tolist())
+                    self.last_timestamp = max(self.last_timestamp, int(records['timestamp'].max()))
+
+    def _fill_datalake_csv(self):
+        """Upload in the Datalake the rows of the csv files whose timestamp is not older than the last one"""
+        with self.timer.phase('fill_cu_up'):
+            for file_path in glob.glob(os.path.join(self.sim_path, 'cu-up-cell-*.txt')):
+                with open(file_path, 'r') as csvfile:
+                    for row in csv.DictReader(csvfile):
+                        timestamp = int(row['timestamp'])
+                        if timestamp >= self.last_timestamp:
+                            cellId = self.datalake.extract_cellId(file_path)
+                            row['cellId'] = cellId
+                            if cellId == 1:
+                                self.datalake.insert_lte_cu_up(row)
+                            else:
+                                self.datalake.insert_gnb_cu_up(row)
+                            self.last_timestamp = timestamp
+
+        with self.timer.phase('fill_cu_cp'):
+            for file_path in glob.glob(os.path.join(self.sim_path, 'cu-cp-cell-*.txt')):
+                with open(file_path, 'r') as csvfile:
+                    for row in csv.DictReader(csvfile):
+                        timestamp = int(row['timestamp'])
+                        if timestamp >= self.last_timestamp:
+                            cellId = self.datalake.extract_cellId(file_path)
+                            row['cellId'] = cellId
+                            if cellId == 1:
+                                self.datalake.insert_lte_cu_cp(row)
+                            else:
+                                self.datalake.insert_gnb_cu_cp(row)
+                            self.last_timestamp = timestamp
+
+        with self.timer.phase('fill_du'):
+            for file_path in glob.glob(os.path.join(self.sim_path, 'du-cell-*.txt')):
+                with open(file_path, 'r') as csvfile:
+                    for row in csv.DictReader(csvfile):
+                        timestamp = int(row['timestamp'])
+                        if timestamp >= self.last_timestamp:
+                            self.datalake.insert_du(row)
+                            self.last_timestamp = timestamp
+
     @abstractmethod
     def _compute_action(self, action) -> list[tuple]:
         """Helper function that converts the agents action defined in Gym into the ns-O-RAN required format according to the use case"""
@@ -462,6 +618,12 @@ class NsOranEnv(gym.Env):
         """
         pass
 
+    def _usecase_info(self) -> dict:
+        """Function to be implemented by children to add use case statistics to the info of reset() and step()
+            This function is optional, thus it does not raise an exception.
+        """
+        return {}
+
     def _get_info(self):
         # TODO deliver last timestamp and time elapsed in the simulation
         return {'isopen': self.is_open, 'results': self.sim_result}
@@ -474,15 +636,54 @@ class NsOranEnv(gym.Env):
    
     def close(self):
         super().close()
+        self._stop_sim(span_name='close')
+        if self.pool is not None:
+            # The warm simulations never ran an episode, their folders are removed
+            self.pool.close()
+        if self.promoter is not None:
+            # Make sure that the artifacts are in the output folder before returning
+            self.promoter.wait()
+
+    def flag_keep(self):
+        """Flag the current simulation so that it is never deleted by the retention policies"""
+        if not self.is_open:
+            raise ValueError('The environment is not open, there is no simulation to flag.')
+        open(os.path.join(self.sim_path, KEEP_FLAG_FILE), 'a').close()
+
+    def _stop_sim(self, span_name: str = None):
+        """Terminate the simulation bound to the environment, if any
+        Args:
+            span_name (str): if set and the environment is traced, the termination is recorded as a span with this name
+        """
         if self.is_open:
-            # TODO save sim_result in the folder
+            stop_start = trace_clock()
             self.metricsReadySemaphore.release()
-            print("metricsReadySemaphore.release() executed!")
+            self.read_streams()
             self.sim_process.kill()
+            # The artifacts are promoted once the simulation cannot write them anymore
+            self.sim_process.wait()
+            self.sim_instance.close_streams()
+            self.waiter.close()
+            self.action_controller.close()
+            if self.kpm_reader is not None:
+                self.kpm_reader.close()
             self.controlSemaphore.unlink()
             self.metricsReadySemaphore.unlink()
             self.is_open = False 
+            if self.episode_profiler is not None:
+                self.episode_profiler.stop(self.sim_path)
+            if self.tracer is not None:
+                # The trace of the episode is stored with its simulation
+                if span_name:
+                    self.tracer.add_span(span_name, 'env', stop_start, trace_clock() - stop_start)
+                self.tracer.write(os.path.join(self.sim_path, TRACE_FILE))
+            with open(os.path.join(self.sim_path, SIM_RESULT_FILE), 'w') as sim_result_file:
+                json.dump(self.sim_result, sim_result_file, default=str)
+            promoting = self.promoter is not None and self.promoter.promote(self.sim_path)
+            if self.retention is not None and not promoting:
+                # Otherwise, the policies are applied once the promotion is over
+                self.retention.schedule()
 
     def __del__(self):
-        if self.is_open:
+        if self.is_open or self.pool is not None:
             self.close()
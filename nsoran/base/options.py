@@ -0,0 +1,128 @@
+from dataclasses import dataclass, field
+
+# The opt-in features of NsOranEnv are configured by a single EnvOptions, made of one dataclass for each subsystem, e.g.,
+# NsOranEnv(..., options=EnvOptions(sim_command=LOCAL_SIM_COMMAND, pool=PoolOptions(size=2))).
+# The defaults of every field reproduce the behavior of the environment without options.
+
+
+@dataclass
+class PoolOptions:
+    """
+    Simulations launched in advance in the background, see SimulationPool.
+        size (int): if greater than 0, the number of warm simulations, so that reset() starts from an already initialized
+                    simulation. Disabled by default.
+        max_memory_mb (float): if set, the pool does not pre-spawn new simulations while the warm ones use more than this
+                               memory (MB).
+    """
+    size: int = 0
+    max_memory_mb: float = None
+
+
+@dataclass
+class TransportOptions:
+    """
+    How the actions and the KPMs are exchanged with the simulation.
+        control (str): 'file' to deliver the actions through the control file, 'shm' through a shared memory ring buffer.
+                       The 'shm' transport requires a simulation that reads the ring buffer, which is only the local
+                       stand-in simulator for now: the stock ns-3 scenario ignores it and reads the control file only.
+        kpm (str): 'csv' to collect the KPMs from the csv files, 'shm' from a shared memory segment of binary records.
+                   The 'shm' transport requires a simulation that supports it, e.g., the local stand-in simulator.
+        control_durability (str): durability policy of the files written by the ActionController, i.e., 'buffered',
+                                  'flush' or 'fsync'.
+        action_log_format (str): 'csv' to log the actions as text in log_file, 'binary' as fixed-width records (see action_log.py).
+    """
+    control: str = 'file'
+    kpm: str = 'csv'
+    control_durability: str = 'flush'
+    action_log_format: str = 'csv'
+
+
+@dataclass
+class OutputOptions:
+    """
+    What is kept of the simulations.
+        keep_datalake (bool): if set, the Datalake (database.db) is kept in the folder of each simulation once it is over,
+                              e.g., to join the actions with the KPMs offline (see action_log.join_actions_kpms); it is
+                              removed otherwise.
+        stream_tail_kb (int): size in KB of the last part of stdout and stderr kept in memory to report the simulation errors.
+        compress_streams (bool): if set, stdout and stderr of the simulation are compressed with gzip, e.g., for verbose
+                                 debug builds.
+    """
+    keep_datalake: bool = False
+    stream_tail_kb: int = 64
+    compress_streams: bool = False
+
+
+@dataclass
+class ScratchOptions:
+    """
+    Fast folder where the simulations run, see ArtifactPromoter.
+        folder (str): if set, fast folder (e.g., /dev/shm/nsoran) where the simulations run; once a simulation is over,
+                      its artifacts are promoted to output_folder in the background.
+        artifacts (list): glob patterns of the artifacts to promote from the scratch folder, all the files by default.
+        archive (bool): if set, the artifacts of each simulation are promoted as a single <uuid>.tar.gz archive.
+        budget_mb (float): if set, maximum disk space (MB) used by the simulations in the scratch folder: a new simulation
+                           runs in output_folder if the scratch folder is full, and the episode of a simulation running in
+                           scratch is truncated once the folder goes above the budget.
+    """
+    folder: str = None
+    artifacts: list = None
+    archive: bool = False
+    budget_mb: float = None
+
+
+@dataclass
+class RetentionOptions:
+    """
+    Retention policies of the simulations in output_folder, see SimulationDirectoryManager. Disabled if neither keep_last
+    nor max_mb is set.
+        keep_last (int): if set, only the last simulations are kept.
+        keep_failed (bool): if set, the simulations that exited with an error are kept regardless of keep_last.
+        max_mb (float): if set, maximum size (MB) of the simulations; the oldest ones are deleted.
+    """
+    keep_last: int = None
+    keep_failed: bool = True
+    max_mb: float = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.keep_last is not None or self.max_mb is not None
+
+
+@dataclass
+class ProfilingOptions:
+    """
+    Measures of the performance of the environment.
+        phase_timing (bool): if set, the phases of reset() and step() are timed with a PhaseTimer (unlike profiler, there is
+                             no function-level profile); the timings of each step are in info['timings'] and their
+                             percentiles are returned by timing_summary()
+        trace (bool): if set, the spans of the lifecycle of the environment, of the phases of the steps and of the Datalake
+                      operations are written in a Chrome trace-event file (trace.json) in the folder of each simulation,
+                      see tracing.py
+        profiler (str): if set, 'cprofile' or 'sampling' profiler of an episode, dumped in its simulation folder, see
+                        EpisodeProfiler. If not set, the NSORAN_PROFILER, NSORAN_PROFILER_EPISODE and NSORAN_PROFILER_STEPS
+                        environment variables are used
+        profiler_episode (int): index of the profiled episode, the first one is 0
+        profiler_steps (tuple): if set, range [first, last) of the profiled steps of the episode, where the reset is step 0
+    """
+    phase_timing: bool = False
+    trace: bool = False
+    profiler: str = None
+    profiler_episode: int = 0
+    profiler_steps: tuple = None
+
+
+@dataclass
+class EnvOptions:
+    """
+    Opt-in features of NsOranEnv, one dataclass for each subsystem.
+        sim_command (list): if set, the command that launches the simulation instead of the ns-3 scenario, e.g., the local
+                            stand-in simulator nsoran.base.local_sim.LOCAL_SIM_COMMAND. ns-3 is not configured nor built.
+    """
+    sim_command: list = None
+    pool: PoolOptions = field(default_factory=PoolOptions)
+    transport: TransportOptions = field(default_factory=TransportOptions)
+    output: OutputOptions = field(default_factory=OutputOptions)
+    scratch: ScratchOptions = field(default_factory=ScratchOptions)
+    retention: RetentionOptions = field(default_factory=RetentionOptions)
+    profiling: ProfilingOptions = field(default_factory=ProfilingOptions)
@@ -0,0 +1,117 @@
+import math
+import time
+from contextlib import nullcontext
+
+# Relative width of the buckets of the histograms, i.e., the precision of the percentiles
+HISTOGRAM_GROWTH = 1.02
+_NULL_PHASE = nullcontext()
+
+
+class StreamingHistogram:
+    """
+    The StreamingHistogram aggregates a stream of positive durations in logarithmic buckets,
+    so that the percentiles are estimated within HISTOGRAM_GROWTH relative error in constant memory.
+    """
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value: float):
+        index = math.floor(math.log(value, HISTOGRAM_GROWTH)) if value > 0 else None
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, q: float) -> float:
+        """Estimate the q-th percentile (0 < q <= 100) of the stream, 0 if empty"""
+        rank = q / 100 * self.count
+        seen = 0
+        # Zero durations come first
+        for index in sorted(self.buckets, key=lambda index: -math.inf if index is None else index):
+            seen += self.buckets[index]
+            if seen >= rank:
+                # Geometric center of the bucket, never above the largest value seen
+                return 0.0 if index is None else min(HISTOGRAM_GROWTH ** (index + 0.5), self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else 0.0,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+            'max': self.max,
+        }
+
+
+class _Phase:
+    __slots__ = ('timer', 'name', 'start')
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+
+    def __exit__(self, *exc):
+        duration = time.perf_counter_ns() - self.start
+        if self.timer.enabled:
+            self.timer.record(self.name, duration / 1e9)
+        if self.timer.tracer is not None:
+            self.timer.tracer.add_span(self.name, 'step', self.start // 1000, duration // 1000)
+
+
+class PhaseTimer:
+    """
+    The PhaseTimer measures with a monotonic clock the phases of the steps of the environment, e.g.,
+        with timer.phase('get_obs'):
+            obs = self._get_obs()
+    The durations (seconds) of the current step are in timings, while end_step() aggregates them in histograms.
+    If a ChromeTracer is given, each phase is also recorded as a span of the timeline.
+    When disabled and without tracer, phase() returns a shared no-op context manager and nothing is measured.
+    """
+    enabled: bool
+    prefix: str
+
+    def __init__(self, enabled: bool = False, tracer=None):
+        self.enabled = enabled
+        self.tracer = tracer
+        self.prefix = ''
+        self.timings = {}
+        self.histograms = {}
+
+    def phase(self, name: str):
+        return _Phase(self, self.prefix + name) if self.enabled or self.tracer is not None else _NULL_PHASE
+
+    def record(self, name: str, duration: float):
+        # A phase repeated in the same step (e.g., a file family read twice) is accumulated
+        self.timings[name] = self.timings.get(name, 0.0) + duration
+
+    def new_step(self, prefix: str = ''):
+        """Forget the timings of the previous step
+        Args:
+            prefix (str): prefix of the names of the phases of this step, e.g., 'reset/' to aggregate them apart
+        """
+        self.timings = {}
+        self.prefix = prefix
+
+    def end_step(self) -> dict:
+        """Aggregate the timings of the current step in the histograms
+            Returns:
+                the timings of the current step
+        """
+        for name, duration in self.timings.items():
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = StreamingHistogram()
+            histogram.add(duration)
+        return self.timings
+
+    def summary(self) -> dict:
+        """Return count, mean, p50, p95, p99 and max (seconds) of each phase"""
+        return {name: histogram.summary() for name, histogram in self.histograms.items()}
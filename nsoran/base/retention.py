@@ -0,0 +1,162 @@
+import os
+import json
+import logging
+import queue
+import shutil
+import tarfile
+import threading
+
+SIM_RESULT_FILE = 'sim_result.json'
+KEEP_FLAG_FILE = 'KEEP'
+INDEX_FILE = 'runs_index.json'
+ARCHIVE_EXTENSION = '.tar.gz'
+
+logger = logging.getLogger(__name__)
+
+
+class SimulationDirectoryManager:
+    """
+    The SimulationDirectoryManager applies retention policies to the simulations in the output folder, i.e.,
+    the <uuid> folders and the <uuid>.tar.gz archives (see ArtifactPromoter), deleting the ones that are not kept
+    in a background worker and writing a compact index of the kept ones with their sim_result metadata.
+    Only finished simulations, i.e., the ones with a sim_result.json file, are managed.
+    A simulation is always kept if flagged with a KEEP file, see NsOranEnv.flag_keep().
+    """
+    output_folder: str
+    keep_last: int
+    keep_failed: bool
+    max_total_mb: float
+
+    def __init__(self, output_folder: str, keep_last: int = None, keep_failed: bool = True, max_total_mb: float = None):
+        """Initialize the manager and start its worker
+        Args:
+            output_folder (str): folder of the simulations
+            keep_last (int): if set, number of most recent simulations to keep, all of them otherwise
+            keep_failed (bool): if set, the simulations that exited with an error are kept regardless of keep_last
+            max_total_mb (float): if set, maximum size (MB) of the simulations; the oldest ones that are not flagged are deleted
+                                  to respect it, even if they would be kept by the other policies
+        """
+        self.output_folder = output_folder
+        self.keep_last = keep_last
+        self.keep_failed = keep_failed
+        self.max_total_mb = max_total_mb
+        self.queue = queue.Queue()
+        self.worker = threading.Thread(target=self._work, daemon=True)
+        self.worker.start()
+
+    @staticmethod
+    def _size(path: str) -> int:
+        if os.path.isfile(path):
+            return os.path.getsize(path)
+        size = 0
+        for root, _, files in os.walk(path):
+            for file_name in files:
+                try:
+                    size += os.path.getsize(os.path.join(root, file_name))
+                except OSError:
+                    pass
+        return size
+
+    @staticmethod
+    def _read_run(path: str) -> dict:
+        """Return the description of a finished simulation, None if the simulation is not finished or it cannot be read"""
+        try:
+            if path.endswith(ARCHIVE_EXTENSION):
+                sim_uuid = os.path.basename(path)[:-len(ARCHIVE_EXTENSION)]
+                with tarfile.open(path, 'r:gz') as archive:
+                    names = archive.getnames()
+                    if f'{sim_uuid}/{SIM_RESULT_FILE}' not in names:
+                        return None
+                    sim_result = json.load(archive.extractfile(f'{sim_uuid}/{SIM_RESULT_FILE}'))
+                    flagged = f'{sim_uuid}/{KEEP_FLAG_FILE}' in names
+            elif os.path.isdir(path):
+                with open(os.path.join(path, SIM_RESULT_FILE), 'r') as sim_result_file:
+                    sim_result = json.load(sim_result_file)
+                flagged = os.path.exists(os.path.join(path, KEEP_FLAG_FILE))
+            else:
+                return None
+        except (OSError, ValueError, tarfile.TarError):
+            return None
+
+        exitcode = sim_result.get('meta', {}).get('exitcode')
+        return {
+            'id': sim_result.get('meta', {}).get('id', os.path.basename(path)),
+            'path': path,
+            'start_time': sim_result.get('meta', {}).get('start_time', os.path.getmtime(path)),
+            'size_bytes': SimulationDirectoryManager._size(path),
+            'flagged': flagged,
+            # A simulation stopped by the environment before its end has no exit code
+            'failed': exitcode not in (0, None),
+            'sim_result': sim_result,
+        }
+
+    def runs(self) -> list[dict]:
+        """Finished simulations in the output folder, from the oldest to the most recent"""
+        runs = []
+        for entry in os.listdir(self.output_folder):
+            run = self._read_run(os.path.join(self.output_folder, entry))
+            if run is not None:
+                runs.append(run)
+        return sorted(runs, key=lambda run: run['start_time'])
+
+    def select(self, runs: list[dict]) -> tuple[list[dict], list[dict]]:
+        """Apply the policies to the runs (from the oldest to the most recent)
+            Returns:
+                the kept runs and the runs to delete
+        """
+        recent = runs if self.keep_last is None else runs[max(len(runs) - self.keep_last, 0):] if self.keep_last > 0 else []
+        recent_ids = set(run['id'] for run in recent)
+        kept, deleted = [], []
+        for run in runs:
+            if run['id'] in recent_ids or run['flagged'] or (self.keep_failed and run['failed']):
+                kept.append(run)
+            else:
+                deleted.append(run)
+
+        if self.max_total_mb is not None:
+            total = sum(run['size_bytes'] for run in kept)
+            for run in list(kept):
+                if total <= self.max_total_mb * 2**20:
+                    break
+                if not run['flagged']:
+                    kept.remove(run)
+                    deleted.append(run)
+                    total -= run['size_bytes']
+        return kept, deleted
+
+    def apply(self):
+        """Delete the simulations that are not kept and write the index of the kept ones"""
+        kept, deleted = self.select(self.runs())
+        for run in deleted:
+            if os.path.isdir(run['path']):
+                shutil.rmtree(run['path'], ignore_errors=True)
+            else:
+                try:
+                    os.remove(run['path'])
+                except FileNotFoundError:
+                    pass
+
+        index = [{key: run[key] for key in ('id', 'path', 'size_bytes', 'flagged', 'failed')} |
+                 {'params': run['sim_result'].get('params', {}), 'meta': run['sim_result'].get('meta', {})} for run in kept]
+        index_path = os.path.join(self.output_folder, INDEX_FILE)
+        with open(index_path + '.tmp', 'w') as index_file:
+            json.dump(index, index_file, indent=1)
+        os.replace(index_path + '.tmp', index_path)
+
+    def schedule(self):
+        """Apply the policies in the background"""
+        self.queue.put(None)
+
+    def _work(self):
+        while True:
+            self.queue.get()
+            try:
+                self.apply()
+            except Exception as error:
+                logger.error('Error while applying the retention policies to %s: %s', self.output_folder, error)
+            finally:
+                self.queue.task_done()
+
+    def wait(self):
+        """Block until the scheduled applications are completed"""
+        self.queue.join()
@@ -0,0 +1,155 @@
+import os
+import glob
+import queue
+import shutil
+import time
+import tarfile
+import logging
+import threading
+from typing import Callable
+from .retention import SIM_RESULT_FILE, KEEP_FLAG_FILE
+
+logger = logging.getLogger(__name__)
+
+class ArtifactPromoter:
+    """
+    The ArtifactPromoter manages the simulations that run in a fast scratch folder (e.g., /dev/shm):
+    once a simulation is over, a background worker copies the selected artifacts from the scratch folder
+    to the persistent output folder, or archives them there, and then removes the simulation from the scratch folder.
+    """
+    scratch_folder: str
+    output_folder: str
+    artifacts: list
+    archive: bool
+    budget_mb: float
+    budget_check_interval: float
+    on_promoted: Callable
+
+    def __init__(self, scratch_folder: str, output_folder: str, artifacts: list = None, archive: bool = False, budget_mb: float = None,
+                 budget_check_interval: float = 1.0, on_promoted: Callable = None):
+        """Initialize the promoter and start its worker
+        Args:
+            scratch_folder (str): folder where the simulations run
+            output_folder (str): persistent folder where the artifacts are promoted
+            artifacts (list): glob patterns of the files to promote, relative to the simulation folder; all the files if None.
+                              The sim_result.json and KEEP files are always promoted, see SimulationDirectoryManager.
+            archive (bool): if set, the artifacts of each simulation are stored in a single <uuid>.tar.gz file
+            budget_mb (float): if set, maximum disk space (MB) used by the simulations in the scratch folder, see scratch_path()
+                               and over_budget()
+            budget_check_interval (float): minimum time (s) between two measures of the scratch folder in over_budget()
+            on_promoted (Callable): if set, called by the worker without arguments once the artifacts of a simulation are
+                                    promoted, e.g., to apply the retention policies to the output folder
+        """
+        self.scratch_folder = scratch_folder
+        self.output_folder = output_folder
+        self.artifacts = (artifacts + [SIM_RESULT_FILE, KEEP_FLAG_FILE]) if artifacts else ['*']
+        self.archive = archive
+        self.budget_mb = budget_mb
+        self.budget_check_interval = budget_check_interval
+        self.on_promoted = on_promoted
+        self.last_budget_check = None
+        self.last_usage_mb = 0.0
+        os.makedirs(self.scratch_folder, exist_ok=True)
+        os.makedirs(self.output_folder, exist_ok=True)
+
+        self.queue = queue.Queue()
+        self.worker = threading.Thread(target=self._work, daemon=True)
+        self.worker.start()
+
+    def scratch_usage_mb(self) -> float:
+        """Disk space used by the files in the scratch folder (MB)"""
+        size = 0
+        for root, _, files in os.walk(self.scratch_folder):
+            for file_name in files:
+                try:
+                    size += os.path.getsize(os.path.join(root, file_name))
+                except OSError:
+                    pass  # removed in the meantime
+        return size / 2**20
+
+    def scratch_path(self) -> str:
+        """Return the folder where a new simulation should be created.
+            If the scratch folder is above its budget, the pending promotions are awaited to free space;
+            if it is still above its budget, the simulation runs directly in the output folder.
+        """
+        if self.budget_mb is None or self.scratch_usage_mb() < self.budget_mb:
+            return self.scratch_folder
+        self.queue.join()
+        if self.scratch_usage_mb() < self.budget_mb:
+            return self.scratch_folder
+        logger.warning('Scratch folder %s above its budget of %s MB, using %s', self.scratch_folder, self.budget_mb, self.output_folder)
+        return self.output_folder
+
+    def over_budget(self) -> bool:
+        """Whether the scratch folder is above its budget, e.g., because a running simulation keeps writing its artifacts.
+            The folder is measured at most once every budget_check_interval seconds, the last measure is used otherwise.
+        """
+        if self.budget_mb is None:
+            return False
+        now = time.monotonic()
+        if self.last_budget_check is None or now - self.last_budget_check >= self.budget_check_interval:
+            self.last_usage_mb = self.scratch_usage_mb()
+            self.last_budget_check = now
+        return self.last_usage_mb >= self.budget_mb
+
+    def is_scratch(self, sim_path: str) -> bool:
+        return os.path.dirname(os.path.normpath(sim_path)) == os.path.normpath(self.scratch_folder)
+
+    def promote(self, sim_path: str) -> bool:
+        """Schedule the promotion of the artifacts of a simulation that is over; nothing to do if it did not run in scratch
+            Returns:
+                whether the promotion has been scheduled
+        """
+        if not self.is_scratch(sim_path):
+            return False
+        self.queue.put((sim_path, True))
+        return True
+
+    def discard(self, sim_path: str):
+        """Schedule the removal of a simulation from the scratch folder without promoting its artifacts"""
+        if self.is_scratch(sim_path):
+            self.queue.put((sim_path, False))
+
+    def _selected_files(self, sim_path: str) -> list:
+        files = set()
+        for pattern in self.artifacts:
+            files.update(path for path in glob.glob(os.path.join(sim_path, pattern)) if os.path.isfile(path))
+        # The sim_result.json is promoted last: the retention policies consider complete the simulations that have it
+        return sorted(files, key=lambda path: (os.path.basename(path) == SIM_RESULT_FILE, path))
+
+    def _promote(self, sim_path: str):
+        sim_uuid = os.path.basename(os.path.normpath(sim_path))
+        files = self._selected_files(sim_path)
+        if self.archive:
+            with tarfile.open(os.path.join(self.output_folder, sim_uuid + '.tar.gz'), 'w:gz') as archive:
+                for file_path in files:
+                    try:
+                        archive.add(file_path, arcname=os.path.join(sim_uuid, os.path.basename(file_path)))
+                    except FileNotFoundError:
+                        pass  # e.g., the Datalake removes its database once released
+        else:
+            destination = os.path.join(self.output_folder, sim_uuid)
+            os.makedirs(destination, exist_ok=True)
+            for file_path in files:
+                try:
+                    shutil.copy2(file_path, destination)
+                except FileNotFoundError:
+                    pass
+
+    def _work(self):
+        while True:
+            sim_path, promote = self.queue.get()
+            try:
+                if promote:
+                    self._promote(sim_path)
+                shutil.rmtree(sim_path, ignore_errors=True)
+                if promote and self.on_promoted is not None:
+                    self.on_promoted()
+            except Exception as error:
+                logger.error('Error while promoting %s: %s', sim_path, error)
+            finally:
+                self.queue.task_done()
+
+    def wait(self):
+        """Block until all the scheduled promotions are completed"""
+        self.queue.join()
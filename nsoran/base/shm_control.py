@@ -0,0 +1,135 @@
+import os
+import mmap
+import struct
+import numpy as np
+from posix_ipc import SharedMemory, O_CREAT, O_EXCL, ExistentialError
+from .action_controller import ActionController
+
+# Layout of the control segment:
+#   header: magic (uint32), version (uint32), capacity (uint32), record size (uint32),
+#           write sequence (uint64), read sequence (uint64), padding up to HEADER_SIZE
+#   ring of `capacity` records of CONTROL_RECORD_DTYPE
+# The write sequence is the number of records ever written by the agent, the read sequence is the
+# number of records consumed by the simulation. Record i lives in slot i % capacity and stores i as seq,
+# which allows the reader to detect records overwritten before being consumed.
+CONTROL_MAGIC = 0x4E53_4354  # 'NSCT'
+CONTROL_VERSION = 1
+HEADER_FORMAT = '<IIIIQQ'
+HEADER_SIZE = 64
+WRITE_SEQ_OFFSET = 16
+READ_SEQ_OFFSET = 24
+CONTROL_RECORD_DTYPE = np.dtype([('seq', '<u8'), ('timestamp', '<i8'), ('ueId', '<i4'), ('target', '<i4')])
+
+
+def control_segment_name(sim_path: str) -> str:
+    """Name of the shared memory segment of the simulation running in sim_path (see the semaphores in NsOranEnv)"""
+    return "/nsoran_control_" + os.path.basename(os.path.normpath(sim_path))
+
+
+class SharedMemoryActionController(ActionController):
+    """
+    The SharedMemoryActionController delivers the actions to the simulation through a POSIX shared memory
+    ring buffer of fixed-size binary records (seq, timestamp, ueId, target), instead of the control file.
+    The log file is still written for logging purposes and the control file is created for compatibility.
+    """
+    capacity: int
+
+    def __init__(self, sim_path, log_filename, control_filename, header, durability='flush', log_format='csv', capacity: int = 4096):
+        """Initialize Controller, its files and the shared memory segment
+        Args:
+            sim_path (str): the simulation path
+            log_filename (str): the name of the log file, see ActionController
+            control_filename (str): the name of the control file, see ActionController
+            header (list): fields of the action; besides the timestamp, exactly two integer fields are supported
+            durability (str): durability policy of the log file, see ActionController
+            log_format (str): format of the log file, see ActionController
+            capacity (int): number of records of the ring buffer
+        """
+        if len(header) != 3:
+            raise ValueError(f'The shared memory control supports actions of two fields plus the timestamp, {header} given.')
+        super().__init__(sim_path, log_filename, control_filename, header, durability, log_format)
+        self.capacity = capacity
+        self.segment_name = control_segment_name(sim_path)
+        size = HEADER_SIZE + capacity * CONTROL_RECORD_DTYPE.itemsize
+        memory = SharedMemory(self.segment_name, O_CREAT | O_EXCL, size=size)
+        self.mapfile = mmap.mmap(memory.fd, size)
+        memory.close_fd()
+        struct.pack_into(HEADER_FORMAT, self.mapfile, 0, CONTROL_MAGIC, CONTROL_VERSION, capacity,
+                         CONTROL_RECORD_DTYPE.itemsize, 0, 0)
+        self.records = np.ndarray(capacity, dtype=CONTROL_RECORD_DTYPE, buffer=self.mapfile, offset=HEADER_SIZE)
+        self.write_seq = 0
+
+    def create_control_action(self, timestamp: int, actions):
+        """Applies the control action by writing it in the ring buffer (and in the log file)
+            timestamp (int) : action's timestamp
+            actions [(tuple)] or np.ndarray: list of tuples or 2D integer array representing the actions to be sent
+        """
+        self.step += 1
+        actions = np.asarray(actions, dtype=np.int64).reshape(-1, 2)
+        if len(actions) == 0:
+            return
+        read_seq, = struct.unpack_from('<Q', self.mapfile, READ_SEQ_OFFSET)
+        if self.write_seq + len(actions) - read_seq > self.capacity:
+            raise ValueError(f'The control ring buffer is full: {self.write_seq - read_seq} pending records, capacity {self.capacity}.')
+
+        seqs = np.arange(self.write_seq, self.write_seq + len(actions), dtype=np.uint64)
+        slots = seqs % self.capacity
+        self.records['seq'][slots] = seqs
+        self.records['timestamp'][slots] = timestamp
+        self.records['ueId'][slots] = actions[:, 0]
+        self.records['target'][slots] = actions[:, 1]
+        # The write sequence is published after the records, the simulation reads it after the control semaphore
+        self.write_seq += len(actions)
+        struct.pack_into('<Q', self.mapfile, WRITE_SEQ_OFFSET, self.write_seq)
+
+        self.log_actions(timestamp, actions)
+
+    def close(self):
+        """Close the files, unmap and remove the shared memory segment"""
+        super().close()
+        if self.mapfile is None:
+            return
+        self.records = None
+        self.mapfile.close()
+        self.mapfile = None
+        try:
+            SharedMemory(self.segment_name).unlink()
+        except ExistentialError:
+            pass
+
+
+class SharedMemoryActionReader:
+    """
+    Reference reader of the shared memory control ring buffer, i.e., the simulation side of SharedMemoryActionController.
+    """
+
+    def __init__(self, segment_name: str):
+        """Attach to an existing control segment
+        Args:
+            segment_name (str): name of the segment, see control_segment_name()
+        """
+        memory = SharedMemory(segment_name)
+        self.mapfile = mmap.mmap(memory.fd, memory.size)
+        memory.close_fd()
+        magic, version, self.capacity, record_size, _, self.read_seq = struct.unpack_from(HEADER_FORMAT, self.mapfile, 0)
+        if magic != CONTROL_MAGIC or version != CONTROL_VERSION or record_size != CONTROL_RECORD_DTYPE.itemsize:
+            raise ValueError(f'{segment_name} is not a control segment of version {CONTROL_VERSION}.')
+        self.records = np.ndarray(self.capacity, dtype=CONTROL_RECORD_DTYPE, buffer=self.mapfile, offset=HEADER_SIZE)
+
+    def read(self) -> np.ndarray:
+        """Consume the records written since the last read
+            Returns:
+                structured array of CONTROL_RECORD_DTYPE in the order the actions were written
+        """
+        write_seq, = struct.unpack_from('<Q', self.mapfile, WRITE_SEQ_OFFSET)
+        seqs = np.arange(self.read_seq, write_seq, dtype=np.uint64)
+        records = self.records[seqs % self.capacity]
+        if np.any(records['seq'] != seqs):
+            raise ValueError(f'Control records between {self.read_seq} and {write_seq} have been overwritten.')
+        self.read_seq = write_seq
+        struct.pack_into('<Q', self.mapfile, READ_SEQ_OFFSET, self.read_seq)
+        return records
+
+    def close(self):
+        self.records = None
+        self.mapfile.close()
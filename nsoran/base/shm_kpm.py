@@ -0,0 +1,158 @@
+import os
+import mmap
+import struct
+import numpy as np
+from posix_ipc import SharedMemory, O_CREAT, O_EXCL, ExistentialError
+from .datalake import SQLiteDatabaseAPI
+
+# Tables of the KPM segment, in the order their rings appear in the segment
+KPM_TABLES = {
+    'lte_cu_cp': SQLiteDatabaseAPI.lte_cu_cp_keys,
+    'gnb_cu_cp': SQLiteDatabaseAPI.gnb_cu_cp_keys,
+    'lte_cu_up': SQLiteDatabaseAPI.lte_cu_up_keys,
+    'gnb_cu_up': SQLiteDatabaseAPI.gnb_cu_up_keys,
+    'du': SQLiteDatabaseAPI.du_keys,
+}
+SQL_TO_NUMPY = {'INTEGER': '<i8', 'REAL': '<f8'}
+
+# Layout of the KPM segment:
+#   header: magic (uint32), version (uint32), number of tables (uint32), capacity (uint32),
+#           then the write sequence (uint64) of each table, padding up to HEADER_SIZE
+#   one ring of `capacity` records for each table, whose dtype is given by kpm_dtype()
+# The write sequence is the number of records ever written in the table; record i lives in slot i % capacity.
+KPM_MAGIC = 0x4E53_4B50  # 'NSKP'
+KPM_VERSION = 1
+HEADER_FORMAT = '<IIII'
+HEADER_SIZE = 64
+WRITE_SEQ_OFFSET = 16
+
+
+def kpm_dtype(keys: dict) -> np.dtype:
+    """Fixed layout of the records of a table, one field for each column of the Datalake table"""
+    return np.dtype([(SQLiteDatabaseAPI.sanitize_column_name(name), SQL_TO_NUMPY[sql_type]) for name, sql_type in keys.items()])
+
+
+KPM_DTYPES = {table_name: kpm_dtype(keys) for table_name, keys in KPM_TABLES.items()}
+
+
+def kpm_segment_name(sim_path: str) -> str:
+    """Name of the KPM shared memory segment of the simulation running in sim_path"""
+    return "/nsoran_kpm_" + os.path.basename(os.path.normpath(sim_path))
+
+
+class KpmSegment:
+    """
+    Base class of the two sides of the KPM shared memory segment, which exposes the ring of each table
+    as a NumPy structured array backed by the shared memory, i.e., without copies.
+    """
+
+    def __init__(self, segment_name: str, capacity: int = None):
+        """Create the segment if the capacity is given, otherwise attach to an existing one
+        Args:
+            segment_name (str): name of the segment, see kpm_segment_name()
+            capacity (int): number of records of the ring of each table
+        """
+        self.segment_name = segment_name
+        if capacity is not None:
+            size = HEADER_SIZE + sum(capacity * dtype.itemsize for dtype in KPM_DTYPES.values())
+            memory = SharedMemory(segment_name, O_CREAT | O_EXCL, size=size)
+            self.mapfile = mmap.mmap(memory.fd, size)
+            struct.pack_into(HEADER_FORMAT, self.mapfile, 0, KPM_MAGIC, KPM_VERSION, len(KPM_DTYPES), capacity)
+        else:
+            memory = SharedMemory(segment_name)
+            self.mapfile = mmap.mmap(memory.fd, memory.size)
+            magic, version, num_tables, capacity = struct.unpack_from(HEADER_FORMAT, self.mapfile, 0)
+            if magic != KPM_MAGIC or version != KPM_VERSION or num_tables != len(KPM_DTYPES):
+                raise ValueError(f'{segment_name} is not a KPM segment of version {KPM_VERSION}.')
+        memory.close_fd()
+        self.capacity = capacity
+
+        self.rings = {}
+        self.seq_offsets = {}
+        offset = HEADER_SIZE
+        for index, (table_name, dtype) in enumerate(KPM_DTYPES.items()):
+            self.rings[table_name] = np.ndarray(capacity, dtype=dtype, buffer=self.mapfile, offset=offset)
+            self.seq_offsets[table_name] = WRITE_SEQ_OFFSET + 8 * index
+            offset += capacity * dtype.itemsize
+
+    def write_seq(self, table_name: str) -> int:
+        return struct.unpack_from('<Q', self.mapfile, self.seq_offsets[table_name])[0]
+
+    def close(self):
+        self.rings = None
+        self.mapfile.close()
+
+
+class SharedMemoryKpmReader(KpmSegment):
+    """
+    The SharedMemoryKpmReader is the environment side of the KPM segment: it creates the segment before the
+    simulation is launched and consumes the records written since the last read.
+    """
+
+    def __init__(self, sim_path: str, num_ues: int, indications: int = 4):
+        """Create the KPM segment of the simulation
+        Args:
+            sim_path (str): the simulation path
+            num_ues (int): number of UEs in the scenario, i.e., the records of a table in one indication
+            indications (int): number of indications each ring can hold before being consumed
+        """
+        super().__init__(kpm_segment_name(sim_path), capacity=num_ues * indications)
+        self.read_seqs = {table_name: 0 for table_name in KPM_DTYPES}
+
+    def read(self, table_name: str) -> np.ndarray:
+        """Consume the records of a table written since the last read
+            Returns:
+                structured array of KPM_DTYPES[table_name]; it is a view of the shared memory unless the records wrap
+                around the end of the ring, and it is valid until the simulation writes the next indication
+        """
+        read_seq = self.read_seqs[table_name]
+        write_seq = self.write_seq(table_name)
+        if write_seq - read_seq > self.capacity:
+            raise ValueError(f'{write_seq - read_seq - self.capacity} records of {table_name} have been overwritten before being read.')
+        self.read_seqs[table_name] = write_seq
+
+        start, end = read_seq % self.capacity, write_seq % self.capacity
+        ring = self.rings[table_name]
+        if write_seq - read_seq == 0:
+            return ring[:0]
+        if start < end:
+            return ring[start:end]
+        return np.concatenate([ring[start:], ring[:end]])
+
+    def close(self):
+        """Unmap and remove the segment"""
+        if self.rings is None:
+            return
+        super().close()
+        try:
+            SharedMemory(self.segment_name).unlink()
+        except ExistentialError:
+            pass
+
+
+class SharedMemoryKpmWriter(KpmSegment):
+    """
+    The SharedMemoryKpmWriter is the simulation side of the KPM segment, see the local stand-in simulator.
+    """
+
+    def __init__(self, sim_path: str):
+        super().__init__(kpm_segment_name(sim_path))
+        self.write_seqs = {table_name: self.write_seq(table_name) for table_name in KPM_DTYPES}
+
+    def write(self, table_name: str, rows: dict):
+        """Append rows to a table; the KPMs missing from rows are set to 0
+            Args:
+                table_name (str): name of the table
+                rows (dict): keys are the KPM names of the Datalake table, values are scalars or arrays with one value per row
+        """
+        size = len(rows['ueImsiComplete'])
+        write_seq = self.write_seqs[table_name]
+        slots = np.arange(write_seq, write_seq + size) % self.capacity
+        ring = self.rings[table_name]
+        records = np.zeros(size, dtype=ring.dtype)
+        for name, value in rows.items():
+            records[SQLiteDatabaseAPI.sanitize_column_name(name)] = value
+        ring[slots] = records
+        # The write sequence is published after the records, the environment reads it after the metrics semaphore
+        self.write_seqs[table_name] = write_seq + size
+        struct.pack_into('<Q', self.mapfile, self.seq_offsets[table_name], write_seq + size)
@@ -0,0 +1,174 @@
+import shutil
+import selectors
+import threading
+import subprocess
+from collections import deque
+from typing import Callable
+from posix_ipc import Semaphore
+from .action_controller import ActionController
+from .datalake import SQLiteDatabaseAPI
+from .shm_kpm import SharedMemoryKpmReader
+from .waiter import SimulationWaiter
+from .stream_capture import StreamCapture
+from .memory import rss_bytes
+
+class SimulationInstance:
+    """
+    The SimulationInstance class gathers everything that belongs to a single launched simulation,
+    i.e., the simulation folder, the process, the semaphores, the Datalake and the Action Controller.
+    """
+    sim_path: str
+    sim_result: dict
+    sim_process: subprocess.Popen
+    metricsReadySemaphore: Semaphore
+    controlSemaphore: Semaphore
+    action_controller: ActionController
+    datalake: SQLiteDatabaseAPI
+    waiter: SimulationWaiter
+    kpm_reader: SharedMemoryKpmReader
+    stdout_capture: StreamCapture
+    stderr_capture: StreamCapture
+
+    def __init__(self, sim_path, sim_result, sim_process, metricsReadySemaphore, controlSemaphore, action_controller, datalake,
+                 kpm_reader=None, stdout_capture=None, stderr_capture=None):
+        self.sim_path = sim_path
+        self.sim_result = sim_result
+        self.sim_process = sim_process
+        self.metricsReadySemaphore = metricsReadySemaphore
+        self.controlSemaphore = controlSemaphore
+        self.action_controller = action_controller
+        self.datalake = datalake
+        # None when the KPMs are delivered through the csv files
+        self.kpm_reader = kpm_reader
+        self.waiter = SimulationWaiter(metricsReadySemaphore, sim_process)
+        # The output of the simulation is moved to the captures, see read_streams()
+        self.stdout_capture = stdout_capture
+        self.stderr_capture = stderr_capture
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(sim_process.stdout, selectors.EVENT_READ)
+        self.selector.register(sim_process.stderr, selectors.EVENT_READ)
+        # Set once the first indication is available or the simulation ended before producing it
+        self.ready = threading.Event()
+        self.metrics_acquired = False
+
+    def wait_first_metrics(self):
+        """Block until ns-3 posts the first set of metrics or the process exits.
+            When the metrics are posted, the metrics semaphore is consumed and metrics_acquired is set.
+        """
+        # The output is consumed while waiting, so that a verbose simulation never blocks on a full pipe
+        self.metrics_acquired = self.waiter.wait(streams=[self.sim_process.stdout, self.sim_process.stderr],
+                                                 on_output=self.read_streams)
+        self.ready.set()
+
+    def read_streams(self):
+        """Move the available output of the simulation to the stdout and stderr captures"""
+        events = self.selector.select(timeout=0)  # Non-blocking check
+
+        for key, _ in events:
+            data = key.fileobj.read()
+            if not data:
+                continue
+            if key.fileobj is self.sim_process.stdout:
+                self.stdout_capture.write(data)
+            elif key.fileobj is self.sim_process.stderr:
+                self.stderr_capture.write(data)
+
+    def close_streams(self):
+        """Move the remaining output to the captures and close them"""
+        self.read_streams()
+        self.selector.close()
+        self.stdout_capture.close()
+        self.stderr_capture.close()
+
+    def rss_bytes(self) -> int:
+        """Resident memory of the simulation process, 0 if it cannot be read"""
+        return rss_bytes(self.sim_process.pid)
+
+    def terminate(self):
+        """Kill the simulation, remove its semaphores and its folder, since it never ran an episode"""
+        self.metricsReadySemaphore.release()
+        self.sim_process.kill()
+        self.sim_process.wait()
+        # The warm-up thread returns as soon as the process exits
+        self.ready.wait()
+        self.close_streams()
+        self.waiter.close()
+        self.action_controller.close()
+        if self.kpm_reader is not None:
+            self.kpm_reader.close()
+        self.controlSemaphore.unlink()
+        self.metricsReadySemaphore.unlink()
+        shutil.rmtree(self.sim_path, ignore_errors=True)
+
+
+class SimulationPool:
+    """
+    The SimulationPool keeps a number of simulations launched in advance, so that the next episode can start
+    from a simulation that is already initialized and whose first metrics are available.
+    Simulations are launched with the configuration of the environment at launch time.
+    """
+    size: int
+    max_memory_mb: float
+
+    def __init__(self, launcher: Callable[[], SimulationInstance], size: int = 1, max_memory_mb: float = None):
+        """Initialize the pool
+        Args:
+            launcher (callable): function that launches a new simulation and returns its SimulationInstance
+            size (int): number of simulations kept warm in the background
+            max_memory_mb (float): if set, no new simulation is pre-spawned while the resident memory
+                                   of the warm simulations exceeds this value (in MB). The memory of a simulation
+                                   is measured once it produced its first metrics, the ones still warming up are
+                                   accounted as the largest warm simulation seen so far
+        """
+        if size < 1:
+            raise ValueError(f'The pool size must be at least 1, {size} given.')
+        self.launcher = launcher
+        self.size = size
+        self.max_memory_mb = max_memory_mb
+        self.instances = deque()
+        self.lock = threading.Lock()
+        # Largest resident memory (MB) of a warm simulation seen so far
+        self.sim_memory_mb = 0.0
+
+    def _memory_mb(self) -> float:
+        memory_mb = 0.0
+        for instance in self.instances:
+            instance_mb = instance.rss_bytes() / 2**20
+            if instance.ready.is_set():
+                self.sim_memory_mb = max(self.sim_memory_mb, instance_mb)
+            else:
+                # Right after the launch the simulation has not allocated its memory yet
+                instance_mb = max(instance_mb, self.sim_memory_mb)
+            memory_mb += instance_mb
+        return memory_mb
+
+    def _launch(self) -> SimulationInstance:
+        instance = self.launcher()
+        threading.Thread(target=instance.wait_first_metrics, daemon=True).start()
+        return instance
+
+    def fill(self):
+        """Pre-spawn simulations until the pool is full or the memory limit is reached"""
+        with self.lock:
+            while len(self.instances) < self.size:
+                if self.max_memory_mb is not None and self.instances:
+                    if not self.sim_memory_mb:
+                        # The first simulation is measured once warm, before launching the others
+                        self.instances[0].ready.wait()
+                    if self._memory_mb() >= self.max_memory_mb:
+                        break
+                self.instances.append(self._launch())
+
+    def get(self) -> SimulationInstance:
+        """Return the oldest warm simulation, waiting for its first metrics, and launch its replacement"""
+        with self.lock:
+            instance = self.instances.popleft() if self.instances else self._launch()
+        self.fill()
+        instance.ready.wait()
+        return instance
+
+    def close(self):
+        """Terminate all the warm simulations"""
+        with self.lock:
+            while self.instances:
+                self.instances.popleft().terminate()
@@ -0,0 +1,47 @@
+import gzip
+from collections import deque
+
+class StreamCapture:
+    """
+    The StreamCapture class stores an output stream of the simulation (e.g., stdout) in a file that stays open in append mode,
+    optionally compressed with gzip, and keeps in memory the last tail_bytes of the stream for fast error reporting.
+    """
+    file_path: str
+    tail_bytes: int
+
+    def __init__(self, file_path: str, tail_bytes: int = 64 * 1024, compress: bool = False):
+        """Open the capture file
+        Args:
+            file_path (str): path of the file; if compress is set, the .gz extension is added
+            tail_bytes (int): size of the in-memory tail of the stream
+            compress (bool): if set, the stream is compressed on the fly
+        """
+        self.tail_bytes = tail_bytes
+        if compress:
+            self.file_path = file_path + '.gz'
+            self.file = gzip.open(self.file_path, 'at')
+        else:
+            self.file_path = file_path
+            self.file = open(self.file_path, 'a')
+        self.chunks = deque()
+        self.tail_size = 0
+
+    def write(self, data: str):
+        """Append data to the file and to the in-memory tail"""
+        self.file.write(data)
+        self.chunks.append(data)
+        self.tail_size += len(data)
+        # Drop the oldest chunks that are entirely out of the tail
+        while self.chunks and self.tail_size - len(self.chunks[0]) >= self.tail_bytes:
+            self.tail_size -= len(self.chunks.popleft())
+
+    def tail(self) -> str:
+        """Return the last tail_bytes characters of the stream"""
+        return ''.join(self.chunks)[-self.tail_bytes:] if self.tail_bytes > 0 else ''
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
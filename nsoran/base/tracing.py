@@ -0,0 +1,103 @@
+import os
+import json
+import time
+import itertools
+from contextlib import nullcontext
+
+TRACE_FILE = 'trace.json'
+_NULL_SPAN = nullcontext()
+# Track of each tracer in the timeline, so that the environments of the same process are shown apart
+_track_ids = itertools.count(1)
+
+
+def trace_clock() -> int:
+    """Timestamp (microseconds) of the trace events. On Linux, perf_counter is the system-wide monotonic clock,
+        thus the traces written by different processes are aligned when merged."""
+    return time.perf_counter_ns() // 1000
+
+
+class _Span:
+    __slots__ = ('tracer', 'name', 'category', 'args', 'start')
+
+    def __init__(self, tracer, name, category, args):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.start = trace_clock()
+
+    def __exit__(self, *exc):
+        self.tracer.add_span(self.name, self.category, self.start, trace_clock() - self.start, self.args)
+
+
+def trace_span(tracer, name: str, category: str = 'env', args: dict = None):
+    """Span of the tracer, if any, or a shared no-op context manager"""
+    return _NULL_SPAN if tracer is None else _Span(tracer, name, category, args)
+
+
+class ChromeTracer:
+    """
+    The ChromeTracer records the spans of the environment lifecycle as complete events of the Chrome trace-event format,
+    which can be opened with chrome://tracing or https://ui.perfetto.dev, e.g.,
+        with tracer.span('read_kpms', 'datalake'):
+            ...
+    The events are kept in memory until write() stores them, e.g., once per episode in the simulation folder.
+    """
+    label: str
+    pid: int
+    tid: int
+
+    def __init__(self, label: str = 'NsOranEnv'):
+        """Initialize the tracer
+        Args:
+            label (str): name of the track of the tracer in the timeline, followed by the number of the track
+        """
+        self.label = label
+        self.pid = os.getpid()
+        self.tid = next(_track_ids)
+        self.events = []
+
+    def span(self, name: str, category: str = 'env', args: dict = None):
+        return _Span(self, name, category, args)
+
+    def add_span(self, name: str, category: str, start: int, duration: int, args: dict = None):
+        """Record a span that started at start (see trace_clock()) and lasted duration microseconds"""
+        event = {'name': name, 'cat': category, 'ph': 'X', 'ts': start, 'dur': duration, 'pid': self.pid, 'tid': self.tid}
+        if args:
+            event['args'] = args
+        self.events.append(event)
+
+    def _metadata(self) -> list:
+        return [
+            {'name': 'process_name', 'ph': 'M', 'pid': self.pid, 'tid': self.tid, 'args': {'name': f'python {self.pid}'}},
+            {'name': 'thread_name', 'ph': 'M', 'pid': self.pid, 'tid': self.tid, 'args': {'name': f'{self.label} #{self.tid}'}},
+        ]
+
+    def write(self, file_path: str):
+        """Write the recorded events in a trace file and forget them"""
+        with open(file_path, 'w') as trace_file:
+            json.dump({'traceEvents': self._metadata() + self.events, 'displayTimeUnit': 'ms'}, trace_file)
+        self.events = []
+
+
+def merge_traces(trace_paths: list, output_path: str):
+    """Merge trace files (e.g., of the episodes of several environments or of a campaign) in a single timeline
+        Args:
+            trace_paths (list): paths of the trace files written by ChromeTracer
+            output_path (str): path of the merged trace file
+    """
+    events = []
+    metadata = {}
+    for trace_path in trace_paths:
+        with open(trace_path, 'r') as trace_file:
+            for event in json.load(trace_file)['traceEvents']:
+                if event['ph'] == 'M':
+                    # The same track is described by each of its episodes
+                    metadata[(event['name'], event['pid'], event['tid'])] = event
+                else:
+                    events.append(event)
+    events.sort(key=lambda event: event['ts'])
+    with open(output_path, 'w') as output_file:
+        json.dump({'traceEvents': list(metadata.values()) + events, 'displayTimeUnit': 'ms'}, output_file)
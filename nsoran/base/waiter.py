@@ -0,0 +1,109 @@
+import os
+import selectors
+import threading
+import subprocess
+from typing import Callable
+from posix_ipc import Semaphore
+
+class SimulationWaiter:
+    """
+    The SimulationWaiter class waits for whichever happens first between the simulation posting new metrics
+    on the metrics semaphore and the simulation process exiting.
+    A helper thread blocks on the semaphore and notifies the waiter through a pipe, while the exit of the process
+    is detected through a pidfd on Linux. On other platforms the process is polled every POLL_INTERVAL seconds.
+    """
+    POLL_INTERVAL = 0.1
+
+    semaphore: Semaphore
+    process: subprocess.Popen
+
+    def __init__(self, semaphore: Semaphore, process: subprocess.Popen):
+        """Initialize the waiter
+        Args:
+            semaphore (Semaphore): semaphore posted by the simulation when new metrics are available
+            process (subprocess.Popen): process of the simulation
+        """
+        self.semaphore = semaphore
+        self.process = process
+        self.lock = threading.Lock()
+        self.read_fd, self.write_fd = os.pipe()
+        self.thread = None
+        self.thread_done = False
+        self.closed = False
+
+        self.pidfd = None
+        if hasattr(os, 'pidfd_open'):
+            try:
+                self.pidfd = os.pidfd_open(process.pid)
+            except OSError:
+                # e.g., the process has already been reaped or the kernel is older than 5.3
+                self.pidfd = None
+
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.read_fd, selectors.EVENT_READ)
+        if self.pidfd is not None:
+            self.selector.register(self.pidfd, selectors.EVENT_READ)
+
+    def _acquire(self):
+        """Body of the helper thread: block on the semaphore and notify the waiter"""
+        self.semaphore.acquire()
+        with self.lock:
+            self.thread_done = True
+            if self.closed:
+                # The semaphore has been posted to wake us up while closing
+                os.close(self.write_fd)
+            else:
+                os.write(self.write_fd, b'\0')
+
+    def _process_exited(self, events) -> bool:
+        if self.pidfd is not None:
+            return any(key.fd == self.pidfd for key, _ in events)
+        return self.process.poll() is not None
+
+    def wait(self, streams: list = (), on_output: Callable[[], None] = None) -> bool:
+        """Block until new metrics are available or the simulation process exits.
+            Args:
+                streams (list): file objects (e.g., stdout and stderr of the process) that wake the waiter when readable
+                on_output (callable): called when any of the streams is readable, it must consume the available data
+            Returns:
+                True if the metrics semaphore has been acquired, False if the process exited before.
+        """
+        if self.thread is None:
+            with self.lock:
+                self.thread_done = False
+            self.thread = threading.Thread(target=self._acquire, daemon=True)
+            self.thread.start()
+
+        for stream in streams:
+            self.selector.register(stream, selectors.EVENT_READ)
+        try:
+            while True:
+                timeout = None if self.pidfd is not None else self.POLL_INTERVAL
+                events = self.selector.select(timeout=timeout)
+                if any(key.fd == self.read_fd for key, _ in events):
+                    os.read(self.read_fd, 1)
+                    self.thread = None
+                    return True
+                if any(key.fileobj in streams for key, _ in events):
+                    on_output()
+                    # Readable streams at EOF mean that the process is exiting
+                    if self.process.poll() is not None:
+                        return False
+                if self._process_exited(events):
+                    return False
+        finally:
+            for stream in streams:
+                self.selector.unregister(stream)
+
+    def close(self):
+        """Release the file descriptors. A helper thread still blocked on the semaphore closes its end of the pipe once woken up"""
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            self.selector.close()
+            os.close(self.read_fd)
+            if self.pidfd is not None:
+                os.close(self.pidfd)
+            if self.thread is None or self.thread_done:
+                os.close(self.write_fd)
@@ -7,28 +7,36 @@ import logging
 
 # -- Private Imports
 from nsoran.base.ns_env import NsOranEnv
+from nsoran.logs import log_to_file
+from nsoran.utils import ActionMapper
 from constants import *
 
 # -- Global Variables
+logger = logging.getLogger(__name__)
 
 
 # -- Functions
 
 class PowerSavingEng(NsOranEnv):
     def __init__(self, ns3_path:str, scenario_configuration:dict, output_folder:str, optimized:bool, verbose=False,
-                 time_factor=0.001, Cf=1.0, lambdaf=0.1):
+                 w_throughput=1.0, w_power=1.0, w_rlf=1.0, static_power_ratio=0.5, action_type='multibinary', **kwargs):
         """
         Environment specific parameters:
         verbose (bool): enables logging
-        time_factor (float): applies convertion from seconds to another multiple (eg. ms). See compute_reward
-        Cf (float): Cost factor for handovers. See compute_reward
-        lambdaf (float): Decay factor for handover cost. See compute_reward
+        w_throughput (float): weight of the throughput in the reward. See compute_reward
+        w_power (float): weight of the power consumption in the reward. See compute_reward
+        w_rlf (float): weight of the UEs in radio link failure in the reward. See compute_reward
+        static_power_ratio (float): share of POWER_TX_W consumed by an active cell without traffic. See compute_reward
+        action_type (str): 'multibinary' for an on/off bit per cell, 'discrete' for the index of the combination of
+                           the states of the cells, see ActionMapper. See compute_action
+        Any other keyword argument (e.g., options, see EnvOptions) is forwarded to NsOranEnv
         """
         super().__init__(ns3_path=ns3_path, scenario='scenario-test', scenario_configuration=scenario_configuration,
                          output_folder=output_folder, optimized=optimized,
-                         control_header=['timestamp', 'ueId', 'nrCellId'], log_file='TsActions.txt',
-                         control_file='ts_actions_for_ns3.csv')
+                         control_header=['timestamp', 'cellId', 'state'], log_file='EsActions.txt',
+                         control_file='es_actions_for_ns3.csv', **kwargs)
 
+        # The per cell KPMs are repeated in the du rows of each UE, they are averaged per cell (see get_obs)
         self.columns_state = [
             'QosFlow.PdcpPduVolumeDL_Filter',  # Throughput (bytes transmitted at PDCP layer)
             'RRU.PrbUsedDl',                   # Number of scheduled PRBs
@@ -42,58 +50,110 @@ class PowerSavingEng(NsOranEnv):
         self.columns_reward = [
             'QosFlow.PdcpPduVolumeDL_Filter',  # Throughput
             'RRU.PrbUsedDl',  # Power consumption (approximated by PRB usage)
-            'TB.ErrTotalNbrDl.1',  # Number of UEs in RLF
-            'L1M.RS-SINR.Bin34'  # SINR for RLF detection (optional)
+            'L1M.RS-SINR.Bin34'  # Number of UEs in RLF
         ]
-        self.observation_space = spaces.Box(shape=(NUM_GNB, len(self.columns_state)), low=-np.inf, high=np.inf, dtype=np.float64)
-        self.action_space = spaces.MultiBinary(int(2**NUM_GNB))
+        self.reward_index = [self.columns_state.index(column) for column in self.columns_reward]
+        # obs_space size: (#gnb, #state_columns + number of UEs served=1)
+        self.observation_space = spaces.Box(shape=(NUM_GNB, len(self.columns_state) + 1), low=-np.inf, high=np.inf, dtype=np.float64)
+        if action_type not in ['multibinary', 'discrete']:
+            raise ValueError(f"{action_type} is not a valid action type. Values accepted are: ['multibinary', 'discrete']")
+        self.action_type = action_type
+        self.action_mapper = ActionMapper(minVal=0, maxVal=2**NUM_GNB - 1, num_bits=NUM_GNB)
+        self.action_space = spaces.MultiBinary(NUM_GNB) if action_type == 'multibinary' else spaces.Discrete(2**NUM_GNB)
+        # The gNBs are identified by ID from 2 to NUM_GNB + 1, the cell of ID i is the row i-2 of the state
+        self.cell_ids = np.arange(2, NUM_GNB + 2)
+        # On (True) / off (False) state of each cell, as requested by the last action
+        self.cell_states = np.ones(NUM_GNB, dtype=bool)
+        self.observations = np.zeros(self.observation_space.shape, dtype=np.float64)
+        # Per cell KPMs of the last timestamp read, see read_cell_kpms
+        self.cell_kpms_timestamp = None
+        self.cell_kpms = None
 
-        # Stores the kpms of the previous timestamp (see compute_reward)
-        self.previous_df = None
-        self.previous_kpms = None
-
-        # Keeps track of last handover time (see compute_reward)
-        self.handovers_dict = dict()
         self.verbose = verbose
         if self.verbose:
-            logging.basicConfig(filename='reward_ts.log', level=logging.DEBUG, format='%(asctime)s - %(message)s')
-        self.time_factor = time_factor
-        self.Cf = Cf
-        self.lambdaf = lambdaf
-
-    def _compute_action(self, action):
+            log_to_file(logger, 'reward_power.log')
+        self.w_throughput = w_throughput
+        self.w_power = w_power
+        self.w_rlf = w_rlf
+        self.static_power_ratio = static_power_ratio
+
+    def _attach_sim(self, instance):
+        super()._attach_sim(instance)
+        # Every cell is on at the beginning of the simulation
+        self.cell_states.fill(True)
+        self.cell_kpms_timestamp = None
+
+    def _compute_action(self, action) -> np.ndarray:
         """
-        Pass the actions to the ORAN environment (Sim/Testbed)
+        Pass the actions to the ORAN environment (Sim/Testbed): the action is the on/off state of each cell, or the
+        index of its row in the lookup table of the ActionMapper (the first cell is the most significant bit);
+        only the cells whose state changes are sent as (cellId, state) rows
         """
-        assert len(action) == NUM_GNB
+        if self.action_type == 'discrete':
+            cell_states = self.action_mapper.decode(int(action))
+        else:
+            assert len(action) == NUM_GNB
+            cell_states = np.asarray(action, dtype=bool)
+        changed = np.nonzero(cell_states != self.cell_states)[0]
+        self.cell_states[:] = cell_states
+        return np.column_stack([self.cell_ids[changed], cell_states[changed].astype(np.int64)])
+
+    def _fill_datalake_usecase(self):
+        # We don't need fill_datalake_usecase in the power saving use case
+        pass
 
-        return action
+    def _read_cell_kpms(self, timestamp: int) -> np.ndarray:
+        """The per cell KPMs at a timestamp, i.e., the number of UEs followed by columns_state for each cell, read from
+            the datalake with a single query and cached until the next timestamp
+        """
+        if timestamp != self.cell_kpms_timestamp:
+            cell_kpms = self.datalake.read_cell_kpms(timestamp, self.columns_state)
+            rows = np.array(cell_kpms or [], dtype=np.float64).reshape(-1, len(self.columns_state) + 2)
+            slots = rows[:, 0].astype(np.int64) - self.cell_ids[0]
+            valid = (slots >= 0) & (slots < NUM_GNB)
+            # The cells without UEs (e.g., the ones switched off) have null KPMs
+            self.cell_kpms = np.zeros((NUM_GNB, len(self.columns_state) + 1))
+            self.cell_kpms[slots[valid]] = np.nan_to_num(rows[valid, 1:])
+            self.cell_kpms_timestamp = timestamp
+        return self.cell_kpms
 
     def _get_obs(self):
         """
-        The state info contains KPMs:
-        1. Ratio between throughput and energy consumption at cell i
-        2. Number of UEs in RLF at cell i
-        3. Percentage of UEs in RLF at cell i
-        4. Number of scheduled PRBs at cell i
-        5. Percentage of scheduled PRBs at cell i
-        6. Number of MAC PDUs with a MCS that uses 64QAM
-        7. Number of bytes transmitted at PHY layer
-        8. Cost to activate at cell i
+        The state has a row for each cell with the number of UEs it serves followed by its KPMs:
+        1. Number of bytes transmitted at PDCP layer
+        2. Number of scheduled PRBs
+        3. Number of UEs in RLF, i.e., with a SINR in the lowest bin
+        4. Average number of active UEs
+        5. Number of MAC PDUs with a MCS that uses 64QAM
+        6. Number of erroneous DL transmissions
+        7. Number of MAC PDUs with a MCS in the lowest bin
+        8. Buffer size
         :return:
         """
-        ue_kpms = self.datalake.read_kpms(self.last_timestamp, self.columns_state)
-
-        self.observations = np.array(ue_kpms)
-
+        self.observations[:] = self._read_cell_kpms(self.last_timestamp)
         return self.observations
 
     def _compute_reward(self):
         """
-        The total reward is the sum of per gBN reward,
-        where per gNB reward = w1*throughput - w2*power_consumption - w3*activeUEs
+        The total reward is the sum of per gNB reward,
+        where per gNB reward = w_throughput * throughput / capacity - w_power * power / POWER_TX_W - w_rlf * RLF UEs / UEs
+        The capacity of a cell is NUM_RBS * RB_EFFICIENCY, while its power consumption grows linearly with the share of
+        PRBs used from static_power_ratio * POWER_TX_W to POWER_TX_W if the cell is on, and it is 0 otherwise.
         """
-        pass
-
-
-
+        cell_kpms = self._read_cell_kpms(self.last_timestamp)
+        num_ues = cell_kpms[:, 0]
+        volume, prb_used, rlf_ues = cell_kpms[:, 1:][:, self.reward_index].T
+        period = self.scenario_configuration['indicationPeriodicity']
+
+        throughput = volume * 8 / period  # bit/s
+        prb_ratio = np.minimum(prb_used / (NUM_RBS * period / TTI), 1.0)
+        power = np.where(self.cell_states, POWER_TX_W * (self.static_power_ratio + (1 - self.static_power_ratio) * prb_ratio), 0.0)
+        rlf_ratio = rlf_ues / np.maximum(num_ues, 1)
+
+        rewards = (self.w_throughput * throughput / (NUM_RBS * RB_EFFICIENCY) - self.w_power * power / POWER_TX_W
+                   - self.w_rlf * rlf_ratio)
+        if self.verbose:
+            logger.debug("Reward for cells %s: %s (Throughput: %s, Power: %s, RLF: %s)", self.cell_ids, rewards,
+                         throughput, power, rlf_ratio)
+        self.reward = float(rewards.sum())
+        return self.reward
@@ -1,20 +1,27 @@
 import numpy as np
 import pandas as pd
 from nsoran.base.ns_env import NsOranEnv 
+from nsoran.base.handover_tracker import HandoverTracker
 from gymnasium import spaces
 import logging
+from nsoran.logs import log_to_file
+
+logger = logging.getLogger(__name__)
 
 class TrafficSteeringEnv(NsOranEnv):
-    def __init__(self, ns3_path:str, scenario_configuration:dict, output_folder:str, optimized:bool, verbose=False, time_factor=0.001, Cf=1.0, lambdaf=0.1):
+    def __init__(self, ns3_path:str, scenario_configuration:dict, output_folder:str, optimized:bool, verbose=False, time_factor=0.001, Cf=1.0, lambdaf=0.1, obs_dtype=np.float64, skip_serving_cell_handovers=False, **kwargs):
         """Environment specific parameters:
             verbose (bool): enables logging
             time_factor (float): applies convertion from seconds to another multiple (eg. ms). See compute_reward
             Cf (float): Cost factor for handovers. See compute_reward
             lambdaf (float): Decay factor for handover cost. See compute_reward
+            obs_dtype (np.dtype): dtype of the observations, e.g., np.float32. See get_obs
+            skip_serving_cell_handovers (bool): drops the handovers to the cell serving the UE. See compute_action
+            Any other keyword argument (e.g., options, see EnvOptions) is forwarded to NsOranEnv
         """
         super().__init__(ns3_path=ns3_path, scenario='scenario-test', scenario_configuration=scenario_configuration,
                          output_folder=output_folder, optimized=optimized,
-                         control_header = ['timestamp','ueId','nrCellId'], log_file='TsActions.txt', control_file='ts_actions_for_ns3.csv')
+                         control_header = ['timestamp','ueId','nrCellId'], log_file='TsActions.txt', control_file='ts_actions_for_ns3.csv', **kwargs)
         # These features can be hardcoded since they are specific for the use case
         self.columns_state = ['RRU.PrbUsedDl', 'L3 serving SINR', 'DRB.MeanActiveUeDl', 
                               'TB.TotNbrDlInitial.Qpsk', 'TB.TotNbrDlInitial.16Qam', 
@@ -22,41 +29,78 @@ class TrafficSteeringEnv(NsOranEnv):
 
         # We need the throughput as well as the cell id to determine whether an handover occurred
         self.columns_reward = ['DRB.UEThpDl.UEID', 'nrCellId']
+        # Both are read with a single query per timestamp, the columns of each one are sliced from its result
+        self.columns_kpms = list(dict.fromkeys(self.columns_state + self.columns_reward))
+        self.state_index = [0] + [self.columns_kpms.index(column) + 1 for column in self.columns_state]
+        self.reward_index = [0] + [self.columns_kpms.index(column) + 1 for column in self.columns_reward]
+        # KPMs of the last timestamps read, see _read_kpms
+        self.kpms_cache = {}
         # obs_space size: (#ues_per_gnb * #gnb, #observation_columns + timestamp=1)
-        self.observation_space = spaces.Box(shape=(self.scenario_configuration['ues']*7,len(self.columns_state)+1), low=-np.inf, high=np.inf, dtype=np.float64)
+        self.observation_space = spaces.Box(shape=(self.scenario_configuration['ues']*7,len(self.columns_state)+1), low=-np.inf, high=np.inf, dtype=obs_dtype)
+        # The observation is written in place in a buffer, where each UE has a fixed row (see get_obs)
+        self.observations = np.zeros(self.observation_space.shape, dtype=self.observation_space.dtype)
+        self.obs_mask = np.zeros(self.observation_space.shape[0], dtype=bool)
+        # Serving cell of each UE at the last observation, 0 if unknown
+        self.serving_cells = np.zeros(self.observation_space.shape[0], dtype=np.int64)
+        self.skip_serving_cell_handovers = skip_serving_cell_handovers
         # In the traffic steering use case, the action is a combination between 
         n_gnbs = 7  # scenario one has always 7 gnbs 
         n_actions_ue = 7 # each UE can connect to a gNB identified by ID (from 2 to 8), 0 is No Action
         self.action_space = spaces.MultiDiscrete([n_actions_ue] * self.scenario_configuration['ues'] *  n_gnbs)
         # Stores the kpms of the previous timestamp (see compute_reward)
-        self.previous_df = None
         self.previous_kpms = None
-        # Keeps track of last handover time (see compute_reward)
-        self.handovers_dict = dict()
+        # Keeps track of the handovers of each UE (see compute_reward)
+        self.handover_tracker = HandoverTracker(capacity=self.scenario_configuration['ues'] * n_gnbs)
         self.verbose = verbose
         if self.verbose:
-            logging.basicConfig(filename='reward_ts.log', level=logging.DEBUG, format='%(asctime)s - %(message)s')
+            log_to_file(logger, 'reward_ts.log')
         self.time_factor = time_factor
         self.Cf = Cf
         self.lambdaf = lambdaf
 
-    def _compute_action(self, action) -> list[tuple]:    
-        # action from multidiscrete shall become a list of ueId, targetCell.
+    def _compute_action(self, action) -> np.ndarray:
+        # action from multidiscrete shall become an array of (ueId, targetCell) rows.
         # If a targetCell is 0, it means No Handover, thus we don't send it
-        action_list = []
-        for ueId, targetCellId in enumerate(action):
-            if targetCellId != 0: # and 
-                # Once we are in this condition, we need to transform the action from the one of gym to the one of ns-O-RAN
-                action_list.append((ueId + 1, targetCellId + 2))
+        action = np.asarray(action)
+        ue_indexes = np.nonzero(action)[0]
+        # The action of gym is transformed in the one of ns-O-RAN, whose gNBs are identified by ID from 2 to 8
+        target_cells = action[ue_indexes].astype(np.int64) + 2
+        if self.skip_serving_cell_handovers:
+            # A handover to the serving cell would be a no-op for ns-3
+            changed = target_cells != self.serving_cells[ue_indexes]
+            ue_indexes, target_cells = ue_indexes[changed], target_cells[changed]
+        return np.column_stack([ue_indexes + 1, target_cells])
+
+    def _attach_sim(self, instance):
+        super()._attach_sim(instance)
+        # The KPMs and the handovers of the previous simulation are not valid anymore
+        self.kpms_cache = {}
+        self.previous_kpms = None
+        self.handover_tracker.reset()
 
-        return action_list
+    def _read_kpms(self, timestamp: int, cache: bool = True) -> np.ndarray:
+        """KPMs of each UE at a timestamp, i.e., ueImsiComplete followed by columns_kpms, read from the datalake once
+            and cached along with the ones of the previous timestamp, unless cache is False
+        """
+        kpms = self.kpms_cache.get(timestamp)
+        if kpms is None:
+            ue_kpms = self.datalake.read_kpms(timestamp, self.columns_kpms)
+            kpms = np.array(ue_kpms or [], dtype=np.float64).reshape(-1, len(self.columns_kpms) + 1)
+            if cache:
+                self.kpms_cache[timestamp] = kpms
+                if len(self.kpms_cache) > 2:
+                    del self.kpms_cache[next(iter(self.kpms_cache))]
+        return kpms
 
     def _fill_datalake_usecase(self):
         # We don't need fill_datalake_usecase in TS use case
         pass
 
-    def _get_obs(self) -> list:
-        ue_kpms = self.datalake.read_kpms(self.last_timestamp, self.columns_state)                          
+    def _get_obs(self) -> np.ndarray:
+        """The observation has a row for each UE, the one of the UE with ueImsiComplete i is i-1 as in the action.
+            The rows of the UEs missing from the indication are zeros, including the ueImsiComplete, and obs_mask tells
+            which rows are valid. The observation is always the same buffer, which is overwritten at each step.
+        """
         # 'TB.TOTNBRDLINITIAL.QPSK_RATIO', 'TB.TOTNBRDLINITIAL.16QAM_RATIO', 'TB.TOTNBRDLINITIAL.64QAM_RATIO'
         # From per-UE values we need to extract per-Cell Values
         # obs_kpms = []
@@ -66,9 +110,27 @@ class TrafficSteeringEnv(NsOranEnv):
 
         # _RATIO values are the per Cell value / Tot nbr dl initial
 
-        self.observations = np.array(ue_kpms)
+        slots, kpms = self._observation_at(self.last_timestamp, self.observations)
+        self.obs_mask.fill(False)
+        self.obs_mask[slots] = True
+        self.serving_cells.fill(0)
+        self.serving_cells[slots] = np.nan_to_num(kpms[:, self.columns_kpms.index('nrCellId') + 1])
         return self.observations
-    
+
+    def _observation_at(self, timestamp: int, out: np.ndarray, cache: bool = True) -> tuple[np.ndarray, np.ndarray]:
+        """Write the observation of a timestamp in out, see get_obs
+            Returns:
+                the rows of the UEs in the indication and their KPMs (see read_kpms)
+        """
+        kpms = self._read_kpms(timestamp, cache)
+        slots = kpms[:, 0].astype(np.int64) - 1
+        valid = (slots >= 0) & (slots < len(out))
+        if not valid.all():
+            logger.warning('Unexpected ueImsiComplete %s at timestamp %s', kpms[~valid, 0], timestamp)
+        out.fill(0)
+        out[slots[valid]] = kpms[valid][:, self.state_index]
+        return slots[valid], kpms[valid]
+
     def _compute_reward(self) -> float:
         # Computes the reward for the traffic steering environment. Based off journal on TS
         # The total reward is the sum of per ue rewards, calculated as the difference in the
@@ -77,52 +139,61 @@ class TrafficSteeringEnv(NsOranEnv):
         # function punishes frequent handovers.
         # See the docs for more info.
 
-        total_reward = 0.0
-        current_kpms = self.datalake.read_kpms(self.last_timestamp, self.columns_reward)
-        print(f"\nself.previous_kpms: {self.previous_kpms}\n")
-        print(f"\ncurrent_kpms: {current_kpms}\n")
+        current_kpms = self._read_kpms(self.last_timestamp)[:, self.reward_index]
 
         # If this is the first iteration we do not have the previous kpms
         if(self.previous_kpms is None):
             if self.verbose:
-                logging.debug(f'Starting first reward computation at timestamp {self.last_timestamp}')
+                logger.debug('Starting first reward computation at timestamp %s', self.last_timestamp)
             self.previous_timestamp = self.last_timestamp - (self.scenario_configuration['indicationPeriodicity'] * 1000)
-            self.previous_kpms = self.datalake.read_kpms(self.previous_timestamp, self.columns_reward)
-            print(f"\nself.previous_kpms: {self.previous_kpms}\n")
-
-        #Assuming they are of the same lenght
-        print(f"\nself.previous_kpms: {self.previous_kpms}\n")
-        print(f"\ncurrent_kpms: {current_kpms}\n")
-        for t_o, t_n in zip(self.previous_kpms, current_kpms):
-            ueImsi_o, ueThpDl_o, sourceCell = t_o
-            ueImsi_n, ueThpDl_n, currentCell = t_n
-            if ueImsi_n == ueImsi_o:
-                HoCost = 0
-                if currentCell != sourceCell:
-                    lastHo = self.handovers_dict.get(ueImsi_n, 0)  # Retrieve last handover time or default to 0
-                    if lastHo != 0: # If this is the first HO the cost is 0
-                        timeDiff = (self.last_timestamp - lastHo) * self.time_factor
-                        HoCost = self.Cf * ((1 - self.lambdaf) ** timeDiff)
-                    self.handovers_dict[ueImsi_n] = self.last_timestamp  # Update dictionary
- 
-                LogOld = 0
-                LogNew = 0
-                if ueThpDl_o != 0:
-                    LogOld = np.log10(ueThpDl_o)
-                if ueThpDl_n != 0:
-                    LogNew = np.log10(ueThpDl_n)
-
-                LogDiff = LogNew - LogOld
-                reward_ue = LogDiff - HoCost
-                if self.verbose:
-                    logging.debug(f"Reward for UE {ueImsi_n}: {reward_ue} (LogDiff: {LogDiff}, HoCost: {HoCost})")
-                total_reward += reward_ue
-            else:
-                if self.verbose:
-                    logging.error(f"Unexpected UeImsi mismatch: {ueImsi_o} != {ueImsi_n} (current ts: {self.last_timestamp})")
+            # Usually cached by the observation of the reset
+            self.previous_kpms = self._read_kpms(self.previous_timestamp)[:, self.reward_index]
+
+        logger.debug("previous_kpms: %s, current_kpms: %s", self.previous_kpms, current_kpms)
+        total_reward = self._reward_from_kpms(self.previous_kpms, current_kpms)
         if(self.verbose):
-            logging.debug(f"Total reward: {total_reward}")
+            logger.debug("Total reward: %s", total_reward)
         self.previous_kpms = current_kpms
         self.previous_timestamp = self.last_timestamp
         self.reward = total_reward
         return self.reward
+
+    def _usecase_info(self) -> dict:
+        return {'handovers': self.handover_tracker.summary()}
+
+    def _reward_from_kpms(self, previous_kpms: np.ndarray, current_kpms: np.ndarray) -> float:
+        """Sum of the per UE rewards between two indications, computed with array operations
+            Args:
+                previous_kpms (np.ndarray): (ueImsiComplete, throughput, nrCellId) of each UE at the previous indication
+                current_kpms (np.ndarray): (ueImsiComplete, throughput, nrCellId) of each UE at the current indication
+        """
+        # The UEs are paired by position, assuming they are of the same length
+        previous = np.array([] if previous_kpms is None else previous_kpms, dtype=np.float64).reshape(-1, 3)
+        current = np.array([] if current_kpms is None else current_kpms, dtype=np.float64).reshape(-1, 3)
+        num_ues = min(len(previous), len(current))
+        previous, current = previous[:num_ues], current[:num_ues]
+        imsis = current[:, 0].astype(np.int64)
+
+        matched = previous[:, 0] == current[:, 0]
+        if self.verbose and not matched.all():
+            logger.error("Unexpected UeImsi mismatch: %s != %s (current ts: %s)",
+                         previous[~matched, 0], current[~matched, 0], self.last_timestamp)
+
+        # Handover cost, 0 for the first handover of a UE
+        handover = matched & (current[:, 2] != previous[:, 2])
+        handover_imsis = imsis[handover]
+        last_handover = self.handover_tracker.last_handover_time(handover_imsis)
+        time_diff = (self.last_timestamp - last_handover) * self.time_factor
+        decay = np.power(1 - self.lambdaf, time_diff, dtype=np.float64)
+        ho_cost = np.zeros(num_ues)
+        ho_cost[handover] = np.where(last_handover != 0, self.Cf * decay, 0)
+        self.handover_tracker.record(self.last_timestamp, handover_imsis, previous[handover, 2], current[handover, 2])
+
+        # The log of a null throughput is 0
+        log_old = np.log10(previous[:, 1], out=np.zeros(num_ues), where=previous[:, 1] != 0)
+        log_new = np.log10(current[:, 1], out=np.zeros(num_ues), where=current[:, 1] != 0)
+        rewards = (log_new - log_old) - ho_cost
+        if self.verbose and logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Reward for UEs %s: %s (LogDiff: %s, HoCost: %s)", imsis[matched], rewards[matched],
+                         (log_new - log_old)[matched], ho_cost[matched])
+        return float(rewards[matched].sum())
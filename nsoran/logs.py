@@ -0,0 +1,73 @@
+import os
+import atexit
+import logging
+import logging.handlers
+import queue
+
+# Every module of nsoran logs with logging.getLogger(__name__), thus the subsystems are the modules, e.g.,
+# nsoran.base.ns_env (lifecycle of the environment), nsoran.base.datalake (queries), nsoran.environments.ts_env (rewards)
+ROOT_LOGGER = 'nsoran'
+DEFAULT_FORMAT = '%(asctime)s %(levelname)s %(name)s: %(message)s'
+
+_handler = None
+_listener = None
+
+
+def _stop_listener():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def configure_logging(level=logging.WARNING, levels: dict = None, handler: logging.Handler = None,
+                      asynchronous: bool = False, fmt: str = DEFAULT_FORMAT) -> logging.Handler:
+    """Configure the loggers of nsoran; calling it again replaces the previous configuration.
+        Args:
+            level (int or str): level of all the subsystems
+            levels (dict): level of specific subsystems, e.g., {'base.datalake': 'DEBUG'} or {'nsoran.base.ns_env': logging.INFO}
+            handler (logging.Handler): where the records are emitted, stderr if None
+            asynchronous (bool): if set, the records are put in a queue and emitted by a background thread,
+                                 so that slow handlers (e.g., terminal or files) never block the control loop
+            fmt (str): format of the records
+        Returns:
+            the handler attached to the nsoran logger, i.e., a QueueHandler if asynchronous
+    """
+    global _handler, _listener
+    root = logging.getLogger(ROOT_LOGGER)
+    if _handler is not None:
+        root.removeHandler(_handler)
+    _stop_listener()
+
+    root.setLevel(level)
+    for name, subsystem_level in (levels or {}).items():
+        name = name if name.startswith(ROOT_LOGGER + '.') else f'{ROOT_LOGGER}.{name}'
+        logging.getLogger(name).setLevel(subsystem_level)
+
+    handler = handler if handler is not None else logging.StreamHandler()
+    handler.setFormatter(logging.Formatter(fmt))
+    if asynchronous:
+        records = queue.SimpleQueue()
+        _listener = logging.handlers.QueueListener(records, handler, respect_handler_level=True)
+        _listener.start()
+        _handler = logging.handlers.QueueHandler(records)
+    else:
+        _handler = handler
+    root.addHandler(_handler)
+    # The records are emitted once, by our handler
+    root.propagate = False
+    return _handler
+
+
+def log_to_file(logger: logging.Logger, filename: str, fmt: str = '%(asctime)s - %(message)s'):
+    """Emit the debug records of a single subsystem in a file, e.g., the rewards of an environment in verbose mode"""
+    path = os.path.abspath(filename)
+    if not any(isinstance(handler, logging.FileHandler) and handler.baseFilename == path for handler in logger.handlers):
+        handler = logging.FileHandler(path)
+        handler.setFormatter(logging.Formatter(fmt))
+        logger.addHandler(handler)
+    logger.setLevel(logging.DEBUG)
+
+
+# The records still in the queue are emitted at exit
+atexit.register(_stop_listener)
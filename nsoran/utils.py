@@ -11,12 +11,17 @@ import numpy as np
 
 
 class ActionMapper:
-    def __init__(self, minVal, maxVal):
+    def __init__(self, minVal, maxVal, num_bits):
         # Total number of discrete actions
         self.minVal = minVal
         self.maxVal = maxVal
         self.num_actions = (maxVal - minVal + 1)
-        self.actions = list(range(minVal, maxVal+1))
+        self.actions = np.arange(minVal, maxVal + 1)
+        # Lookup table of the boolean actions: the row of index idx is its binary representation,
+        # the most significant bit first, e.g., with 7 bits the row 5 is [0, 0, 0, 0, 1, 0, 1]
+        self.num_bits = num_bits
+        self.bit_weights = 1 << np.arange(num_bits - 1, -1, -1)
+        self.bool_actions = (np.arange(2 ** num_bits)[:, np.newaxis] & self.bit_weights) != 0
 
     def idx_to_action(self, idx):
         """
@@ -28,11 +33,23 @@ class ActionMapper:
         return int(self.actions[idx])
 
     def idx_to_bool_action(self, idx):
-        if idx < self.minVal or idx > self.maxVal:
-            raise ValueError(f"Action index {idx} is out of range [{self.minVal}, {self.maxVal}]")
+        if idx < self.minVal or idx > self.maxVal or idx >= len(self.bool_actions):
+            raise ValueError(f"Action index {idx} is out of range [{self.minVal}, {min(self.maxVal, len(self.bool_actions) - 1)}]")
 
-            # Convert the integer index to a binary string
-        binary_str = format(idx, f"0{7}b")
+        return self.bool_actions[idx].tolist()
 
-        # Convert the binary string to a list of boolean values
-        return [bool(int(bit)) for bit in binary_str]
\ No newline at end of file
+    def decode(self, indices):
+        """
+        Map a batch of indices to their boolean actions, i.e., an array of shape (batch, num_bits), with one gather
+        """
+        indices = np.asarray(indices)
+        if indices.size and (indices.min() < 0 or indices.max() >= len(self.bool_actions)):
+            raise ValueError(f"Action indices out of range [0, {len(self.bool_actions) - 1}]")
+
+        return self.bool_actions[indices]
+
+    def encode(self, bool_actions):
+        """
+        Map a batch of boolean actions, i.e., an array of shape (batch, num_bits), to their indices
+        """
+        return np.asarray(bool_actions, dtype=np.int64) @ self.bit_weights
@@ -0,0 +1,35 @@
+import weakref
+import dataclasses
+import pytest
+from nsoran.environments.ts_env import TrafficSteeringEnv
+from nsoran.base.local_sim import LOCAL_SIM_COMMAND
+from nsoran.base.options import EnvOptions
+
+SCENARIO_CONFIGURATION = {'ues': [2], 'indicationPeriodicity': [0.1], 'simTime': [0.5]}
+
+
+@pytest.fixture
+def make_env(tmp_path):
+    """Factory of environments driven by the local stand-in simulator, unless options.sim_command is set.
+        make_env(env_class, scenario_configuration, options=None, output_folder=None, **kwargs) builds an env_class in
+        tmp_path, or in output_folder if set; the other keyword arguments are forwarded to env_class.
+        The environments that are still alive at the end of the test are closed.
+    """
+    envs = []
+
+    def make(env_class=TrafficSteeringEnv, scenario_configuration=SCENARIO_CONFIGURATION, options: EnvOptions = None,
+             output_folder: str = None, **kwargs):
+        options = options if options is not None else EnvOptions()
+        if options.sim_command is None:
+            options = dataclasses.replace(options, sim_command=LOCAL_SIM_COMMAND)
+        env = env_class(ns3_path=None, scenario_configuration=scenario_configuration,
+                        output_folder=output_folder or str(tmp_path), optimized=False, options=options, **kwargs)
+        # A weak reference, so that a test can check what happens once an environment is garbage collected
+        envs.append(weakref.ref(env))
+        return env
+
+    yield make
+    for env_ref in envs:
+        env = env_ref()
+        if env is not None:
+            env.close()
@@ -0,0 +1,30 @@
+import os
+import numpy as np
+from nsoran.base.action_controller import ActionController
+
+HEADER = ['timestamp', 'ueId', 'nrCellId']
+
+
+def test_batch_formatting_matches_line_format():
+    actions = [(1, 3), (2, 8), (14, 2)]
+    expected = ''.join(f"{100},{','.join(map(str, action))}\n" for action in actions)
+    assert ActionController.format_actions(100, actions) == expected
+    assert ActionController.format_actions(100, np.array(actions)) == expected
+    assert ActionController.format_actions(100, []) == ''
+
+
+def test_control_and_log_files(tmp_path):
+    controller = ActionController(str(tmp_path), 'TsActions.txt', 'ts_actions_for_ns3.csv', HEADER, durability='buffered')
+    controller.create_control_action(100, [(1, 3)])
+    # The control file is always flushed at each step
+    with open(tmp_path / 'ts_actions_for_ns3.csv') as control_file:
+        assert control_file.read() == '100,1,3\n'
+
+    # A control file removed by the simulation is created again
+    os.remove(tmp_path / 'ts_actions_for_ns3.csv')
+    controller.create_control_action(200, np.array([[2, 4], [3, 5]]))
+    controller.close()
+    with open(tmp_path / 'ts_actions_for_ns3.csv') as control_file:
+        assert control_file.read() == '200,2,4\n200,3,5\n'
+    with open(tmp_path / 'TsActions.txt') as log_file:
+        assert log_file.read() == 'timestamp,ueId,nrCellId\n100,1,3\n200,2,4\n200,3,5\n'
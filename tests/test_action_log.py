@@ -0,0 +1,65 @@
+import gc
+import os
+import numpy as np
+from nsoran.base.action_controller import ActionController
+from nsoran.base.action_log import read_action_log, join_actions_kpms
+from nsoran.base.datalake import SQLiteDatabaseAPI
+from nsoran.base.options import EnvOptions, OutputOptions, TransportOptions
+from nsoran.environments.ts_env import TrafficSteeringEnv
+
+
+def test_binary_action_log_join(tmp_path):
+    controller = ActionController(str(tmp_path), 'TsActions.txt', 'ts_actions_for_ns3.csv',
+                                  ['timestamp', 'ueId', 'nrCellId'], log_format='binary')
+    controller.create_control_action(100, [(1, 3), (2, 4)])
+    controller.create_control_action(200, [])
+    controller.create_control_action(300, np.array([[2, 5]]))
+    controller.close()
+
+    actions = read_action_log(str(tmp_path / 'TsActions.bin'))
+    assert actions['timestamp'].tolist() == [100, 100, 300]
+    assert actions['step'].tolist() == [1, 1, 3]
+    assert actions['ueId'].tolist() == [1, 2, 2]
+    assert actions['target'].tolist() == [3, 4, 5]
+
+    datalake = SQLiteDatabaseAPI(str(tmp_path), num_ues_gnb=1)
+    for timestamp, imsi, throughput in [(100, 1, 10.0), (100, 2, 20.0), (300, 2, 30.0)]:
+        datalake.insert_du({'timestamp': timestamp, 'ueImsiComplete': imsi, 'nrCellId': 2, 'DRB.UEThpDl.UEID': throughput})
+
+    joined = join_actions_kpms(actions, datalake, ['DRB.UEThpDl.UEID', 'nrCellId'])
+    assert joined['ueId'].tolist() == [1, 2, 2]
+    assert joined['DRB.UEThpDl.UEID'].tolist() == [10.0, 20.0, 30.0]
+    assert joined['nrCellId'].tolist() == [2, 2, 2]
+
+
+def test_join_skips_indications_without_actions(tmp_path):
+    controller = ActionController(str(tmp_path), 'TsActions.txt', 'ts_actions_for_ns3.csv',
+                                  ['timestamp', 'ueId', 'nrCellId'], log_format='binary')
+    controller.create_control_action(100, [(1, 3)])
+    controller.create_control_action(300, [(1, 4)])
+    controller.close()
+    actions = read_action_log(str(tmp_path / 'TsActions.bin'))
+
+    datalake = SQLiteDatabaseAPI(str(tmp_path), num_ues_gnb=1)
+    for timestamp, throughput in [(0, 1.0), (100, 10.0), (200, 20.0), (300, 30.0), (400, 40.0)]:
+        datalake.insert_du({'timestamp': timestamp, 'ueImsiComplete': 1, 'nrCellId': 2, 'DRB.UEThpDl.UEID': throughput})
+
+    joined = join_actions_kpms(actions, datalake, ['DRB.UEThpDl.UEID'])
+    assert joined['timestamp'].tolist() == [100, 300]
+    assert joined['DRB.UEThpDl.UEID'].tolist() == [10.0, 30.0]
+
+
+def test_keep_datalake(make_env):
+    env = make_env(TrafficSteeringEnv, {'ues': [1], 'indicationPeriodicity': [0.1], 'simTime': [0.3]},
+                   EnvOptions(output=OutputOptions(keep_datalake=True), transport=TransportOptions(action_log_format='binary')))
+    env.reset()
+    env.step(np.ones(env.action_space.shape, dtype=np.int64))
+    env.close()
+    sim_path = env.sim_path
+    del env
+    gc.collect()
+    # The actions can be joined with the KPMs once the environment is gone
+    datalake = SQLiteDatabaseAPI(sim_path, num_ues_gnb=1, keep_database=True)
+    joined = join_actions_kpms(read_action_log(os.path.join(sim_path, 'TsActions.bin')), datalake, ['nrCellId'])
+    assert len(joined) == 7
+    assert not joined['nrCellId'].isna().all()
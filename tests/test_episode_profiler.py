@@ -0,0 +1,22 @@
+import pytest
+from nsoran.base.episode_profiler import EpisodeProfiler
+
+
+def busy_step():
+    return sum(i * i for i in range(200_000))
+
+
+@pytest.mark.parametrize('mode', ['cprofile', 'sampling'])
+def test_episode_profiler_step_range(tmp_path, mode):
+    profiler = EpisodeProfiler(mode, episode=1, steps=(1, 3), interval=0.001)
+    for episode in range(2):
+        for step in range(5):
+            profiler.update(episode, step, str(tmp_path))
+            assert profiler.active == (episode == 1 and 1 <= step < 3)
+            busy_step()
+    profiler.stop(str(tmp_path))
+
+    stacks = (tmp_path / 'profile.collapsed').read_text().splitlines()
+    assert any('busy_step' in stack for stack in stacks)
+    assert all(int(stack.rsplit(' ', 1)[1]) > 0 for stack in stacks)
+    assert (tmp_path / ('profile.prof' if mode == 'cprofile' else 'profile.txt')).exists()
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+from nsoran.base.frame_stack import FrameStackWrapper
+from nsoran.base.normalization import NormalizeObservationWrapper
+from nsoran.environments.ts_env import TrafficSteeringEnv
+
+SCENARIO_CONFIGURATION = {'ues': [2], 'indicationPeriodicity': [0.1], 'simTime': [0.6]}
+
+
+@pytest.fixture
+def env(make_env):
+    return make_env(TrafficSteeringEnv, SCENARIO_CONFIGURATION)
+
+
+def observation_at(env, timestamp):
+    out = np.empty(env.observation_space.shape, dtype=env.observation_space.dtype)
+    env._observation_at(timestamp, out, cache=False)
+    return out
+
+
+@pytest.mark.parametrize('padding', ['repeat', 'zero'])
+def test_stack_and_padding(env, padding):
+    wrapper = FrameStackWrapper(env, num_stack=3, padding=padding)
+    obs, _ = wrapper.reset()
+    assert wrapper.observation_space.contains(obs)
+    # Only the first indication is in the datalake
+    first = obs[-1].copy()
+    assert np.array_equal(obs[0], first if padding == 'repeat' else np.zeros_like(first))
+    zeros = np.zeros(env.action_space.shape, dtype=np.int64)
+    timestamps = [env.last_timestamp]
+    for _ in range(4):
+        obs, _, _, _, _ = wrapper.step(zeros)
+        timestamps.append(env.last_timestamp)
+        assert obs.base is wrapper.frames
+        assert np.array_equal(obs[-1], env.observations)
+    for frame, timestamp in zip(obs, timestamps[-3:]):
+        assert np.array_equal(frame, observation_at(env, timestamp))
+
+
+def test_history_from_datalake(env, monkeypatch):
+    wrapper = FrameStackWrapper(env, num_stack=4, copy=True)
+    wrapper.reset()
+    zeros = np.zeros(env.action_space.shape, dtype=np.int64)
+    for _ in range(3):
+        wrapper.step(zeros)
+    timestamps = env.datalake.read_timestamps()
+    assert timestamps[-1] == env.last_timestamp and timestamps == sorted(timestamps)
+    assert env.datalake.read_timestamps(before=env.last_timestamp, limit=2) == timestamps[-3:-1]
+    # A reset that finds previous indications in the datalake takes the history from it
+    monkeypatch.setattr(env, 'reset', lambda **kwargs: (env._get_obs(), {}))
+    obs, _ = wrapper.reset()
+    assert obs.base is None
+    for frame, timestamp in zip(obs, timestamps[-4:]):
+        assert np.array_equal(frame, observation_at(env, timestamp))
+
+
+def test_history_through_normalization(env, monkeypatch):
+    normalized = NormalizeObservationWrapper(env, skip_columns=[0])
+    wrapper = FrameStackWrapper(normalized, num_stack=4, copy=True)
+    wrapper.reset()
+    zeros = np.zeros(env.action_space.shape, dtype=np.int64)
+    for _ in range(3):
+        wrapper.step(zeros)
+    normalized.freeze()
+    count = normalized.statistics.count
+    monkeypatch.setattr(env, 'reset', lambda **kwargs: (env._get_obs(), {}))
+    obs, _ = wrapper.reset()
+    # The past observations are normalized as the current one, without updating the statistics
+    assert normalized.statistics.count == count
+    for frame, timestamp in zip(obs, env.datalake.read_timestamps()[-4:]):
+        expected = observation_at(env, timestamp)
+        normalized.normalize(expected, expected[:, 0] != 0)
+        assert np.allclose(frame, expected)
+
+
+def test_stacked_normalization_rejected(env):
+    with pytest.raises(ValueError, match='FrameStackWrapper'):
+        NormalizeObservationWrapper(FrameStackWrapper(env, num_stack=3))
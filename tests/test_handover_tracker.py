@@ -0,0 +1,36 @@
+import numpy as np
+from nsoran.base.handover_tracker import HandoverTracker
+from nsoran.environments.ts_env import TrafficSteeringEnv
+
+
+def test_handover_tracker():
+    tracker = HandoverTracker(capacity=2, ping_pong_window=300)
+    assert tracker.last_handover_time(np.array([11, 3])).tolist() == [0, 0]
+
+    tracker.record(100, np.array([11, 3]), np.array([2, 4]), np.array([5, 6]))
+    # Back to the previous cell within the window: ping-pong
+    tracker.record(300, np.array([11]), np.array([5]), np.array([2]))
+    # Back to the previous cell after the window, and a new UE beyond the capacity
+    tracker.record(900, np.array([3, 20]), np.array([6, 7]), np.array([4, 8]))
+
+    assert tracker.last_handover_time(np.array([3, 11, 20, 5])).tolist() == [900, 300, 900, 0]
+    slots = tracker.slots(np.array([11, 3, 20]))
+    assert tracker.handover_count[slots].tolist() == [2, 2, 1]
+    assert tracker.ping_pong_count[slots].tolist() == [1, 0, 0]
+    assert tracker.previous_cell[slots].tolist() == [5, 6, 7]
+    assert tracker.summary() == {'tracked_ues': 4, 'handovers': 5, 'ping_pongs': 1, 'ues_with_handover': 3, 'max_handovers_per_ue': 2}
+
+    tracker.reset()
+    assert tracker.summary()['tracked_ues'] == 0
+    assert tracker.last_handover_time(np.array([11])).tolist() == [0]
+    assert tracker.slots(np.array([11])).tolist() == [0]
+
+
+def test_handovers_reset_between_episodes(make_env):
+    env = make_env(TrafficSteeringEnv, {'ues': [1], 'indicationPeriodicity': [0.1], 'simTime': [0.3]})
+    env.reset()
+    env.handover_tracker.record(env.last_timestamp, np.array([1]), np.array([2]), np.array([3]))
+    env.reset()
+    # A handover of the previous episode is not a recent handover of the new one
+    assert env.handover_tracker.summary()['handovers'] == 0
+    assert env.handover_tracker.last_handover_time(np.array([1])).tolist() == [0]
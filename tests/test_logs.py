@@ -0,0 +1,43 @@
+import logging
+import pytest
+from nsoran import logs
+from nsoran.logs import configure_logging, ROOT_LOGGER
+
+
+@pytest.fixture(autouse=True)
+def restore_logging():
+    """Save the handlers, levels and propagate flags of the root and nsoran loggers, restored after the test"""
+    def loggers():
+        return [logging.getLogger()] + [logging.getLogger(name) for name in list(logging.Logger.manager.loggerDict)
+                                        if name == ROOT_LOGGER or name.startswith(ROOT_LOGGER + '.')]
+    saved = {logger.name: (list(logger.handlers), logger.level, logger.propagate) for logger in loggers()}
+    yield
+    logs._stop_listener()
+    logs._handler = None
+    for logger in loggers():
+        handlers, level, propagate = saved.get(logger.name, ([], logging.NOTSET, True))
+        logger.handlers[:] = handlers
+        logger.setLevel(level)
+        logger.propagate = propagate
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+def test_configure_logging_levels():
+    handler = ListHandler()
+    queue_handler = configure_logging(level=logging.WARNING, levels={'base.datalake': 'DEBUG'}, handler=handler, asynchronous=True)
+    logging.getLogger('nsoran.base.datalake').debug('query: %s', 'SELECT 1')
+    logging.getLogger('nsoran.base.ns_env').debug('actions: %s', [(1, 2)])
+    logging.getLogger('nsoran.base.ns_env').warning('above %s', 'budget')
+    assert isinstance(queue_handler, logging.handlers.QueueHandler)
+
+    # Reconfiguring stops the background thread, which emits the pending records
+    configure_logging(handler=logging.NullHandler())
+    assert handler.messages == ['query: SELECT 1', 'above budget']
@@ -0,0 +1,40 @@
+import tracemalloc
+import pytest
+from nsoran.base.memory import MemoryProfiler
+
+
+def test_memory_profiler_slope():
+    profiler = MemoryProfiler(every=5, top=3, max_slope_kb=100_000, warmup_steps=0)
+    leak = []
+    try:
+        profiler.begin_episode()
+        for _ in range(20):
+            leak.append(bytearray(256 * 1024))
+            profiler.sample()
+        assert profiler.end_episode() > 0
+        assert len(profiler.top_allocators) == 3
+        assert profiler.top_allocators[0]['allocators'][0]['size_diff_kb'] >= 5 * 256
+
+        profiler.max_slope_kb = 1
+        profiler.begin_episode()
+        for _ in range(20):
+            leak.append(bytearray(256 * 1024))
+            profiler.sample()
+        with pytest.raises(AssertionError):
+            profiler.end_episode()
+    finally:
+        profiler.close()
+
+
+def test_memory_profiler_keeps_external_tracing():
+    tracemalloc.start()
+    try:
+        MemoryProfiler().close()
+        # The tracing was not started by the profiler, thus it is still running
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
+    profiler = MemoryProfiler()
+    assert tracemalloc.is_tracing()
+    profiler.close()
+    assert not tracemalloc.is_tracing()
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+from nsoran.base.normalization import RunningStatistics, NormalizeObservationWrapper
+from nsoran.environments.ts_env import TrafficSteeringEnv
+
+SCENARIO_CONFIGURATION = {'ues': [2], 'indicationPeriodicity': [0.1], 'simTime': [0.5]}
+
+
+def test_running_statistics(tmp_path):
+    rng = np.random.default_rng(0)
+    batches = [rng.normal(rng.uniform(-1e3, 1e3, 4), rng.uniform(1, 1e4, 4), size=(rng.integers(1, 30), 4)) for _ in range(20)]
+    statistics = RunningStatistics(4)
+    for batch in batches[:10]:
+        statistics.update(batch)
+    other = RunningStatistics(4)
+    for batch in batches[10:]:
+        other.update(batch)
+    statistics.merge(other)
+    rows = np.concatenate(batches)
+    assert statistics.count == len(rows)
+    assert np.allclose(statistics.mean, rows.mean(axis=0))
+    assert np.allclose(statistics.var, rows.var(axis=0))
+
+    statistics.save(tmp_path / 'statistics.npz')
+    loaded = RunningStatistics.load(tmp_path / 'statistics.npz')
+    assert loaded.count == statistics.count
+    assert np.array_equal(loaded.mean, statistics.mean) and np.array_equal(loaded.var, statistics.var)
+
+
+@pytest.fixture
+def envs(make_env):
+    return [make_env(TrafficSteeringEnv, SCENARIO_CONFIGURATION, obs_dtype=np.float32) for _ in range(2)]
+
+
+def test_wrapper_shared_and_frozen(envs):
+    statistics = RunningStatistics(envs[0].observation_space.shape[-1])
+    wrappers = [NormalizeObservationWrapper(env, statistics=statistics, skip_columns=[0]) for env in envs]
+    for wrapper in wrappers:
+        obs, _ = wrapper.reset()
+        # Normalized in place, the ueImsiComplete is left untouched
+        assert obs is wrapper.unwrapped.observations
+        assert np.array_equal(obs[:, 0], np.arange(1, len(obs) + 1))
+    assert statistics.count == 2 * envs[0].observation_space.shape[0]
+
+    wrappers[0].freeze()
+    count = statistics.count
+    mean = statistics.mean.copy()
+    obs, _, _, _, _ = wrappers[0].step(np.zeros(envs[0].action_space.shape, dtype=np.int64))
+    assert statistics.count == count
+    raw = wrappers[0].unwrapped._read_kpms(wrappers[0].unwrapped.last_timestamp)[:, wrappers[0].unwrapped.state_index]
+    raw = raw[np.argsort(raw[:, 0])]
+    expected = (raw[:, 1:] - mean[1:]) / np.sqrt(statistics.var[1:] + 1e-8)
+    assert np.allclose(obs[:, 1:], expected, rtol=1e-4, atol=1e-4)
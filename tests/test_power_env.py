@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+from nsoran.environments.power_env import PowerSavingEng
+from nsoran.base.action_controller import ActionController
+from constants import NUM_GNB, NUM_RBS, RB_EFFICIENCY
+
+SCENARIO_CONFIGURATION = {'ues': [3], 'indicationPeriodicity': [0.1], 'simTime': [0.5]}
+
+
+@pytest.fixture
+def env(make_env):
+    return make_env(PowerSavingEng, SCENARIO_CONFIGURATION)
+
+
+def test_per_cell_state(env, monkeypatch):
+    obs, _ = env.reset()
+    assert env.observation_space.contains(obs)
+    # Each cell serves its own UEs at the beginning of the simulation
+    assert np.array_equal(obs[:, 0], np.full(NUM_GNB, SCENARIO_CONFIGURATION['ues'][0]))
+    rows = env.datalake.read_kpms(env.last_timestamp, ['nrCellId'] + env.columns_state)
+    for cell_id, cell_obs in zip(env.cell_ids, obs):
+        cell_rows = np.array([row[2:] for row in rows if row[1] == cell_id], dtype=np.float64)
+        assert np.allclose(cell_obs[1:], cell_rows.mean(axis=0))
+
+    queries = []
+    read_cell_kpms = env.datalake.read_cell_kpms
+    monkeypatch.setattr(env.datalake, 'read_cell_kpms', lambda *args: queries.append(args) or read_cell_kpms(*args))
+    env.step(np.ones(NUM_GNB, dtype=np.int8))
+    assert len(queries) == 1
+
+
+def test_reward(env):
+    env.reset()
+    env.cell_states[:] = True
+    cell_kpms = np.zeros((NUM_GNB, len(env.columns_state) + 1))
+    cell_kpms[:, 0] = 4
+    # Cell 2 at full capacity and with all PRBs, cell 3 idle with 2 UEs in RLF, cell 4 switched off
+    cell_kpms[0, 1 + env.columns_state.index('QosFlow.PdcpPduVolumeDL_Filter')] = NUM_RBS * RB_EFFICIENCY * 0.1 / 8
+    cell_kpms[0, 1 + env.columns_state.index('RRU.PrbUsedDl')] = NUM_RBS * 100
+    cell_kpms[1, 1 + env.columns_state.index('L1M.RS-SINR.Bin34')] = 2
+    env.cell_states[2] = False
+    env.cell_kpms, env.cell_kpms_timestamp = cell_kpms, env.last_timestamp
+    static = env.static_power_ratio
+    expected = (1 - 1) + (0 - static - 0.5) + 0 + (NUM_GNB - 3) * -static
+    assert env._compute_reward() == pytest.approx(expected)
+
+
+def test_cell_on_off_actions(env):
+    env.reset()
+    actions = env._compute_action(np.ones(NUM_GNB, dtype=np.int8))
+    assert actions.shape == (0, 2)
+    action = np.ones(NUM_GNB, dtype=np.int8)
+    action[[1, 4]] = 0
+    actions = env._compute_action(action)
+    assert actions.tolist() == [[3, 0], [6, 0]]
+    assert ActionController.format_actions(100, actions) == '100,3,0\n100,6,0\n'
+    assert env._compute_action(np.ones(NUM_GNB, dtype=np.int8)).tolist() == [[3, 1], [6, 1]]
+
+
+def test_discrete_actions(make_env):
+    env = make_env(PowerSavingEng, SCENARIO_CONFIGURATION, action_type='discrete')
+    assert env.action_space.n == 2 ** NUM_GNB
+    env.reset()
+    # 0b1011111: the second cell is switched off
+    assert env._compute_action(0b1011111).tolist() == [[3, 0]]
+    _, reward, _, _, _ = env.step(env.action_space.sample())
+    assert np.isfinite(reward)
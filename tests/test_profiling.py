@@ -0,0 +1,34 @@
+import random
+import numpy as np
+from nsoran.base.profiling import PhaseTimer, StreamingHistogram
+
+
+def test_streaming_histogram_percentiles():
+    rng = random.Random(0)
+    values = [rng.expovariate(100) for _ in range(10000)]
+    histogram = StreamingHistogram()
+    for value in values:
+        histogram.add(value)
+    for q in (50, 95, 99):
+        assert abs(histogram.percentile(q) / np.percentile(values, q) - 1) < 0.03
+    assert histogram.summary()['max'] == max(values)
+
+
+def test_phase_timer():
+    timer = PhaseTimer(enabled=True)
+    for prefix in ('reset/', '', ''):
+        timer.new_step(prefix)
+        with timer.phase('fill_du'):
+            pass
+        with timer.phase('fill_du'):
+            pass
+        timings = timer.end_step()
+        assert list(timings) == [prefix + 'fill_du']
+    assert timer.summary()['fill_du']['count'] == 2
+    assert timer.summary()['reset/fill_du']['count'] == 1
+
+    disabled = PhaseTimer()
+    disabled.new_step()
+    with disabled.phase('fill_du'):
+        pass
+    assert disabled.end_step() == {} and disabled.summary() == {}
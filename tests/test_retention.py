@@ -0,0 +1,46 @@
+import json
+import os
+import tarfile
+from nsoran.base.retention import SimulationDirectoryManager
+
+
+def make_run(folder, sim_uuid, start_time, exitcode=0, size=0, keep=False, archive=False):
+    sim_path = folder / sim_uuid
+    sim_path.mkdir()
+    (sim_path / 'sim_result.json').write_text(json.dumps({'params': {'ues': 3}, 'meta': {'id': sim_uuid, 'start_time': start_time, 'exitcode': exitcode}}))
+    (sim_path / 'stdout').write_bytes(b'x' * size)
+    if keep:
+        (sim_path / 'KEEP').touch()
+    if archive:
+        with tarfile.open(folder / f'{sim_uuid}.tar.gz', 'w:gz') as tar:
+            tar.add(sim_path, arcname=sim_uuid)
+        for file_path in sim_path.iterdir():
+            file_path.unlink()
+        sim_path.rmdir()
+
+
+def test_retention_policies(tmp_path):
+    make_run(tmp_path, 'a', 1, keep=True)
+    make_run(tmp_path, 'b', 2, exitcode=1)
+    make_run(tmp_path, 'c', 3, archive=True)
+    make_run(tmp_path, 'd', 4)
+    make_run(tmp_path, 'e', 5)
+    (tmp_path / 'running').mkdir()  # not finished, never managed
+
+    manager = SimulationDirectoryManager(str(tmp_path), keep_last=2)
+    manager.schedule()
+    manager.wait()
+    assert sorted(os.listdir(tmp_path)) == ['a', 'b', 'd', 'e', 'running', 'runs_index.json']
+    index = json.loads((tmp_path / 'runs_index.json').read_text())
+    assert [run['id'] for run in index] == ['a', 'b', 'd', 'e']
+    assert index[1]['failed'] and index[0]['flagged']
+    assert index[0]['params'] == {'ues': 3}
+
+
+def test_retention_quota(tmp_path):
+    for i, sim_uuid in enumerate(['a', 'b', 'c']):
+        make_run(tmp_path, sim_uuid, i, size=2**20, keep=(sim_uuid == 'a'), archive=(sim_uuid == 'b'))
+    manager = SimulationDirectoryManager(str(tmp_path), max_total_mb=1.5)
+    manager.apply()
+    # The oldest simulations are deleted until the quota is met, the flagged one is always kept
+    assert [run['id'] for run in manager.runs()] == ['a']
@@ -0,0 +1,96 @@
+import os
+import tarfile
+from nsoran.base.scratch import ArtifactPromoter
+from nsoran.base.retention import SIM_RESULT_FILE
+from nsoran.base.options import EnvOptions, ScratchOptions
+from nsoran.environments.ts_env import TrafficSteeringEnv
+
+
+def make_simulation(folder, name, size=0):
+    sim_path = os.path.join(folder, name)
+    os.makedirs(sim_path)
+    for file_name in [SIM_RESULT_FILE, 'stdout', 'database.db']:
+        with open(os.path.join(sim_path, file_name), 'w') as sim_file:
+            sim_file.write(file_name)
+    with open(os.path.join(sim_path, 'trace.bin'), 'wb') as trace_file:
+        trace_file.write(b'\0' * size)
+    return sim_path
+
+
+def test_promote(tmp_path):
+    promoter = ArtifactPromoter(str(tmp_path / 'scratch'), str(tmp_path / 'output'), artifacts=['stdout'])
+    sim_path = make_simulation(promoter.scratch_folder, 'sim')
+    assert promoter.is_scratch(sim_path)
+    # The sim_result.json is always promoted, and last
+    assert [os.path.basename(path) for path in promoter._selected_files(sim_path)] == ['stdout', SIM_RESULT_FILE]
+    promoter.promote(sim_path)
+    promoter.wait()
+    assert not os.path.exists(sim_path)
+    assert sorted(os.listdir(tmp_path / 'output' / 'sim')) == [SIM_RESULT_FILE, 'stdout']
+    with open(tmp_path / 'output' / 'sim' / 'stdout') as stdout:
+        assert stdout.read() == 'stdout'
+
+
+def test_promote_archive(tmp_path):
+    promoter = ArtifactPromoter(str(tmp_path / 'scratch'), str(tmp_path / 'output'), archive=True)
+    sim_path = make_simulation(promoter.scratch_folder, 'sim')
+    promoter.promote(sim_path)
+    promoter.wait()
+    assert not os.path.exists(sim_path)
+    assert os.listdir(tmp_path / 'output') == ['sim.tar.gz']
+    with tarfile.open(tmp_path / 'output' / 'sim.tar.gz') as archive:
+        assert sorted(archive.getnames()) == ['sim/' + name for name in sorted([SIM_RESULT_FILE, 'database.db', 'stdout', 'trace.bin'])]
+
+
+def test_discard(tmp_path):
+    promoter = ArtifactPromoter(str(tmp_path / 'scratch'), str(tmp_path / 'output'))
+    sim_path = make_simulation(promoter.scratch_folder, 'sim')
+    promoter.discard(sim_path)
+    # A simulation outside of the scratch folder is left untouched
+    output_sim_path = make_simulation(promoter.output_folder, 'other')
+    promoter.promote(output_sim_path)
+    promoter.discard(output_sim_path)
+    promoter.wait()
+    assert not os.path.exists(sim_path)
+    assert os.listdir(tmp_path / 'output') == ['other']
+
+
+def test_budget(tmp_path):
+    promoter = ArtifactPromoter(str(tmp_path / 'scratch'), str(tmp_path / 'output'), budget_mb=1, budget_check_interval=3600)
+    assert promoter.scratch_path() == promoter.scratch_folder
+    assert not promoter.over_budget()
+    sim_path = make_simulation(promoter.scratch_folder, 'sim', size=2**21)
+    # The last measure is used until budget_check_interval has elapsed
+    assert not promoter.over_budget()
+    promoter.last_budget_check -= 3600
+    assert promoter.over_budget()
+    # A new simulation runs in the output folder while the scratch folder is full
+    assert promoter.scratch_path() == promoter.output_folder
+    promoter.promote(sim_path)
+    assert promoter.scratch_path() == promoter.scratch_folder
+
+
+def test_episode_truncated_over_budget(make_env, tmp_path):
+    env = make_env(TrafficSteeringEnv, {'ues': [1], 'indicationPeriodicity': [0.1], 'simTime': [1]},
+                   EnvOptions(scratch=ScratchOptions(folder=str(tmp_path / 'scratch'), budget_mb=1e-6)),
+                   output_folder=str(tmp_path / 'output'))
+    env.reset()
+    assert env.promoter.is_scratch(env.sim_path)
+    _, _, terminated, truncated, _ = env.step(env.action_space.sample())
+    assert truncated and not terminated
+    env.close()
+    assert os.path.exists(tmp_path / 'output' / os.path.basename(env.sim_path) / SIM_RESULT_FILE)
+
+
+def test_on_promoted(tmp_path):
+    promoted = []
+    output_folder = str(tmp_path / 'output')
+    promoter = ArtifactPromoter(str(tmp_path / 'scratch'), output_folder,
+                                on_promoted=lambda: promoted.append(sorted(os.listdir(output_folder))))
+    assert promoter.promote(make_simulation(promoter.scratch_folder, 'sim'))
+    # Nothing to promote outside of the scratch folder
+    assert not promoter.promote(make_simulation(output_folder, 'other'))
+    promoter.discard(make_simulation(promoter.scratch_folder, 'discarded'))
+    promoter.wait()
+    # The callback sees the promoted artifacts
+    assert promoted == [['other', 'sim']]
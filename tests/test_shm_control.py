@@ -0,0 +1,36 @@
+import os
+import numpy as np
+import pytest
+from nsoran.base.shm_control import SharedMemoryActionController, SharedMemoryActionReader, control_segment_name
+
+
+def test_shm_control_round_trip(tmp_path):
+    sim_path = tmp_path / 'shm-control-test'
+    os.makedirs(sim_path)
+    controller = SharedMemoryActionController(str(sim_path), 'TsActions.txt', 'ts_actions_for_ns3.csv',
+                                              ['timestamp', 'ueId', 'nrCellId'], capacity=4)
+    reader = SharedMemoryActionReader(control_segment_name(str(sim_path)))
+    try:
+        controller.create_control_action(100, [(1, 3), (2, 4), (3, 5)])
+        records = reader.read()
+        assert records['seq'].tolist() == [0, 1, 2]
+        assert records['timestamp'].tolist() == [100] * 3
+        assert records['ueId'].tolist() == [1, 2, 3]
+        assert records['target'].tolist() == [3, 4, 5]
+
+        # Records wrap around the ring once consumed
+        controller.create_control_action(200, np.array([[4, 6], [5, 7], [6, 8]]))
+        records = reader.read()
+        assert records['seq'].tolist() == [3, 4, 5]
+        assert records['ueId'].tolist() == [4, 5, 6]
+        assert len(reader.read()) == 0
+
+        with pytest.raises(ValueError):
+            controller.create_control_action(300, [(1, 2)] * 5)
+
+        with open(sim_path / 'TsActions.txt') as log_file:
+            assert log_file.read().splitlines() == ['timestamp,ueId,nrCellId', '100,1,3', '100,2,4', '100,3,5',
+                                                    '200,4,6', '200,5,7', '200,6,8']
+    finally:
+        reader.close()
+        controller.close()
@@ -0,0 +1,26 @@
+import os
+import numpy as np
+from nsoran.base.shm_kpm import SharedMemoryKpmReader, SharedMemoryKpmWriter, KPM_DTYPES
+
+
+def test_shm_kpm_round_trip(tmp_path):
+    sim_path = tmp_path / 'shm-kpm-test'
+    os.makedirs(sim_path)
+    reader = SharedMemoryKpmReader(str(sim_path), num_ues=3, indications=2)
+    writer = SharedMemoryKpmWriter(str(sim_path))
+    try:
+        for timestamp in (100, 200, 300):
+            writer.write('du', {'timestamp': timestamp, 'ueImsiComplete': np.arange(1, 4), 'nrCellId': 2,
+                                'DRB.UEThpDl.UEID': np.array([1.5, 2.5, 3.5])})
+            records = reader.read('du')
+            assert records.dtype == KPM_DTYPES['du']
+            assert records['timestamp'].tolist() == [timestamp] * 3
+            assert records['ueimsicomplete'].tolist() == [1, 2, 3]
+            assert records['nrcellid'].tolist() == [2, 2, 2]
+            assert records['drbuethpdlueid'].tolist() == [1.5, 2.5, 3.5]
+            assert records['rruprbuseddl'].tolist() == [0.0] * 3
+        assert len(reader.read('du')) == 0
+        assert len(reader.read('gnb_cu_cp')) == 0
+    finally:
+        writer.close()
+        reader.close()
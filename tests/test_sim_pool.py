@@ -0,0 +1,54 @@
+import os
+import sys
+from nsoran.environments.ts_env import TrafficSteeringEnv
+from nsoran.base.options import EnvOptions, PoolOptions, OutputOptions
+
+SCENARIO_CONFIGURATION = {'ues': [1], 'indicationPeriodicity': [0.1], 'simTime': [0.3]}
+# Local simulator that writes 1 MB on stdout before its first indication, more than the capacity of a pipe
+VERBOSE_SIM_COMMAND = [sys.executable, '-c', "print('x' * 2**20, flush=True); from nsoran.base.local_sim import main; main()"]
+
+
+def test_warm_get_and_refill(make_env):
+    env = make_env(TrafficSteeringEnv, SCENARIO_CONFIGURATION, EnvOptions(pool=PoolOptions(size=2)))
+    assert len(env.pool.instances) == 2
+    warm = list(env.pool.instances)
+    env.reset()
+    # The oldest warm simulation is used and it is replaced
+    assert env.sim_path == warm[0].sim_path
+    assert warm[0].metrics_acquired
+    assert len(env.pool.instances) == 2 and env.pool.instances[0] is warm[1]
+    env.step(env.action_space.sample())
+
+
+def test_close_removes_warm_simulations(make_env, tmp_path):
+    env = make_env(TrafficSteeringEnv, SCENARIO_CONFIGURATION, EnvOptions(pool=PoolOptions(size=2)))
+    env.reset()
+    warm = list(env.pool.instances)
+    env.close()
+    assert not env.pool.instances
+    for instance in warm:
+        assert instance.sim_process.poll() is not None
+        assert not os.path.exists(instance.sim_path)
+    # Only the simulation of the episode is left
+    assert os.listdir(tmp_path) == [os.path.basename(env.sim_path)]
+
+
+def test_memory_cap(make_env):
+    env = make_env(TrafficSteeringEnv, SCENARIO_CONFIGURATION, EnvOptions(pool=PoolOptions(size=3, max_memory_mb=1)))
+    # The first simulation is measured once warm, and it is above the cap alone
+    assert len(env.pool.instances) == 1
+    assert env.pool.sim_memory_mb > 1
+    env.reset()
+    assert len(env.pool.instances) == 1
+
+
+def test_warm_up_drains_output(make_env):
+    env = make_env(TrafficSteeringEnv, SCENARIO_CONFIGURATION,
+                   EnvOptions(sim_command=VERBOSE_SIM_COMMAND, pool=PoolOptions(size=1), output=OutputOptions(stream_tail_kb=1)))
+    instance = env.pool.instances[0]
+    assert instance.ready.wait(timeout=30)
+    assert instance.metrics_acquired
+    env.reset()
+    env.close()
+    with open(os.path.join(env.sim_path, 'stdout')) as stdout:
+        assert stdout.readline() == 'x' * 2**20 + '\n'
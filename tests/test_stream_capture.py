@@ -0,0 +1,49 @@
+import gzip
+from nsoran.base.stream_capture import StreamCapture
+
+
+def test_append_without_truncation(tmp_path):
+    file_path = str(tmp_path / 'stdout')
+    capture = StreamCapture(file_path, tail_bytes=4)
+    capture.write('first\n')
+    capture.close()
+    # A second capture of the same stream appends to the file
+    capture = StreamCapture(file_path, tail_bytes=4)
+    capture.write('second\n')
+    capture.close()
+    with open(file_path) as stream:
+        assert stream.read() == 'first\nsecond\n'
+
+
+def test_tail_eviction():
+    capture = StreamCapture('/dev/null', tail_bytes=5)
+    for data in ['abc', 'def', 'ghi']:
+        capture.write(data)
+    assert capture.tail() == 'efghi'
+    # The chunks that are entirely out of the tail are dropped
+    assert list(capture.chunks) == ['def', 'ghi']
+    capture.write('0123456789')
+    assert capture.tail() == '56789'
+    assert list(capture.chunks) == ['0123456789']
+    capture.close()
+
+
+def test_empty_tail():
+    capture = StreamCapture('/dev/null', tail_bytes=0)
+    capture.write('abc')
+    capture.write('')
+    assert capture.tail() == ''
+    assert not capture.chunks and capture.tail_size == 0
+    capture.close()
+
+
+def test_gzip_output(tmp_path):
+    capture = StreamCapture(str(tmp_path / 'stderr'), tail_bytes=3, compress=True)
+    assert capture.file_path == str(tmp_path / 'stderr.gz')
+    capture.write('error\n')
+    capture.write('more\n')
+    capture.close()
+    capture.close()
+    with gzip.open(str(tmp_path / 'stderr.gz'), 'rt') as stream:
+        assert stream.read() == 'error\nmore\n'
+    assert capture.tail() == 're\n'
@@ -0,0 +1,24 @@
+import json
+from nsoran.base.tracing import ChromeTracer, merge_traces, trace_span
+
+
+def test_trace_merge(tmp_path):
+    tracers = [ChromeTracer('TrafficSteeringEnv'), ChromeTracer('TrafficSteeringEnv')]
+    for episode in range(2):
+        for tracer in tracers:
+            with trace_span(tracer, 'wait_metrics', 'step'):
+                pass
+            with trace_span(tracer, 'read_kpms', 'datalake', {'rows': 2}):
+                pass
+            tracer.write(str(tmp_path / f'{tracer.tid}_{episode}.json'))
+    with trace_span(None, 'wait_metrics'):
+        pass
+
+    merge_traces(sorted(str(path) for path in tmp_path.iterdir()), str(tmp_path / 'merged.json'))
+    events = json.loads((tmp_path / 'merged.json').read_text())['traceEvents']
+    spans = [event for event in events if event['ph'] == 'X']
+    assert len(spans) == 8
+    assert [span['ts'] for span in spans] == sorted(span['ts'] for span in spans)
+    assert set(span['tid'] for span in spans) == set(tracer.tid for tracer in tracers)
+    # One track name for each environment
+    assert len([event for event in events if event['name'] == 'thread_name']) == 2
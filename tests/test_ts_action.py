@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+from nsoran.environments.ts_env import TrafficSteeringEnv
+from nsoran.base.action_controller import ActionController
+
+SCENARIO_CONFIGURATION = {'ues': [2], 'indicationPeriodicity': [0.1], 'simTime': [0.5]}
+
+
+@pytest.fixture
+def env(make_env):
+    return make_env(TrafficSteeringEnv, SCENARIO_CONFIGURATION)
+
+
+def test_action_matches_loop(env):
+    for seed in range(10):
+        action = env.action_space.sample()
+        expected = [(ueId + 1, targetCellId + 2) for ueId, targetCellId in enumerate(action) if targetCellId != 0]
+        actions = env._compute_action(action)
+        assert actions.dtype.kind == 'i'
+        assert ActionController.format_actions(100, actions) == ActionController.format_actions(100, expected)
+    assert env._compute_action(np.zeros(env.action_space.shape, dtype=np.int64)).shape == (0, 2)
+
+
+def test_skip_serving_cell_handovers(env):
+    action = np.arange(env.action_space.shape[0]) % 7
+    env.serving_cells[:] = 3
+    assert len(env._compute_action(action)) == np.count_nonzero(action)
+    env.skip_serving_cell_handovers = True
+    actions = env._compute_action(action)
+    # Target cell 3 is the action 1
+    assert np.array_equal(actions[:, 0], np.nonzero((action != 0) & (action != 1))[0] + 1)
+    assert (actions[:, 1] != 3).all()
+
+
+def test_serving_cells_from_observation(env):
+    env.skip_serving_cell_handovers = True
+    env.reset()
+    assert (env.serving_cells >= 2).all() and (env.serving_cells <= 8).all()
+    # Handovers to the serving cells are dropped
+    assert len(env._compute_action(env.serving_cells - 2)) == 0
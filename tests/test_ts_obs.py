@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+from nsoran.environments.ts_env import TrafficSteeringEnv
+
+SCENARIO_CONFIGURATION = {'ues': [2], 'indicationPeriodicity': [0.1], 'simTime': [0.5]}
+
+
+@pytest.fixture(params=[np.float64, np.float32])
+def env(make_env, request):
+    return make_env(TrafficSteeringEnv, SCENARIO_CONFIGURATION, obs_dtype=request.param)
+
+
+def test_observation_matches_space(env):
+    obs, _ = env.reset()
+    assert env.observation_space.contains(obs)
+    assert env.obs_mask.all()
+    assert np.array_equal(obs[:, 0], np.arange(1, len(obs) + 1))
+    next_obs, _, _, _, _ = env.step(np.zeros(env.action_space.shape, dtype=np.int64))
+    # The buffer is reused
+    assert next_obs is obs
+    assert env.observation_space.contains(next_obs)
+
+
+def test_missing_and_unordered_ues(env, monkeypatch):
+    num_ues = env.observation_space.shape[0]
+    kpms = np.arange(1, len(env.columns_kpms) + 1) * np.ones((num_ues, 1))
+    kpms = np.column_stack([np.arange(1, num_ues + 1), kpms])
+    # UE 3 is missing, the others are in reverse order, and the last one is not part of the scenario
+    rows = np.concatenate([np.delete(kpms, 2, axis=0)[::-1], [[num_ues + 1] + [1.0] * len(env.columns_kpms)]])
+    monkeypatch.setattr(env, '_read_kpms', lambda timestamp, cache=True: rows)
+    env.last_timestamp = 100
+    obs = env._get_obs()
+    assert obs.shape == env.observation_space.shape and obs.dtype == env.observation_space.dtype
+    expected_mask = np.ones(num_ues, dtype=bool)
+    expected_mask[2] = False
+    assert np.array_equal(env.obs_mask, expected_mask)
+    assert np.array_equal(obs[expected_mask], kpms[expected_mask][:, env.state_index].astype(obs.dtype))
+    assert not obs[2].any()
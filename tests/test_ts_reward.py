@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+from nsoran.environments.ts_env import TrafficSteeringEnv
+
+SCENARIO_CONFIGURATION = {'ues': [3], 'indicationPeriodicity': [0.1], 'simTime': [1.0]}
+
+
+def reference_reward(previous_kpms, current_kpms, handovers_dict, last_timestamp, time_factor, Cf, lambdaf):
+    """Per UE loop of the reward before it was vectorized"""
+    total_reward = 0.0
+    for t_o, t_n in zip(previous_kpms, current_kpms):
+        ueImsi_o, ueThpDl_o, sourceCell = t_o
+        ueImsi_n, ueThpDl_n, currentCell = t_n
+        if ueImsi_n == ueImsi_o:
+            HoCost = 0
+            if currentCell != sourceCell:
+                lastHo = handovers_dict.get(ueImsi_n, 0)
+                if lastHo != 0:
+                    timeDiff = (last_timestamp - lastHo) * time_factor
+                    HoCost = Cf * ((1 - lambdaf) ** timeDiff)
+                handovers_dict[ueImsi_n] = last_timestamp
+            LogOld = 0
+            LogNew = 0
+            if ueThpDl_o != 0:
+                LogOld = np.log10(ueThpDl_o)
+            if ueThpDl_n != 0:
+                LogNew = np.log10(ueThpDl_n)
+            total_reward += LogNew - LogOld - HoCost
+    return total_reward
+
+
+@pytest.fixture
+def env(make_env):
+    return make_env(TrafficSteeringEnv, SCENARIO_CONFIGURATION)
+
+
+def test_vectorized_reward_matches_loop(env):
+    rng = np.random.default_rng(0)
+    num_ues = 21
+    handovers_dict = {}
+    cells = rng.integers(2, 9, num_ues)
+    previous = [(imsi + 1, float(thp), int(cell)) for imsi, (thp, cell) in enumerate(zip(rng.exponential(1e3, num_ues), cells))]
+    for step in range(1, 50):
+        env.last_timestamp = step * 100
+        cells = np.where(rng.random(num_ues) < 0.3, rng.integers(2, 9, num_ues), cells)
+        throughputs = np.where(rng.random(num_ues) < 0.1, 0.0, rng.exponential(1e3, num_ues))
+        current = [(imsi + 1, float(thp), int(cell)) for imsi, (thp, cell) in enumerate(zip(throughputs, cells))]
+        if step % 10 == 0:
+            # A UE missing from the indication breaks the pairing of the following ones
+            current = current[:5] + current[6:]
+        expected = reference_reward(previous, current, handovers_dict, env.last_timestamp, env.time_factor, env.Cf, env.lambdaf)
+        assert env._reward_from_kpms(previous, current) == pytest.approx(expected, rel=1e-12, abs=1e-12)
+        previous = current
+
+
+def test_single_read_per_step(env, monkeypatch):
+    env.reset()
+    queries = []
+    read_kpms = env.datalake.read_kpms
+    monkeypatch.setattr(env.datalake, 'read_kpms', lambda timestamp, kpms: queries.append(timestamp) or read_kpms(timestamp, kpms))
+    for step in range(1, 4):
+        obs, reward, terminated, truncated, _ = env.step(np.zeros(env.action_space.shape, dtype=np.int64))
+        assert len(queries) == step
+        expected = np.array(read_kpms(env.last_timestamp, env.columns_state), dtype=np.float64)
+        assert np.array_equal(obs[env.obs_mask], expected[np.argsort(expected[:, 0])])
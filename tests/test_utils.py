@@ -0,0 +1,22 @@
+import numpy as np
+import pytest
+from nsoran.utils import ActionMapper
+
+
+def test_bool_actions_match_binary_strings():
+    action_mapper = ActionMapper(minVal=0, maxVal=127, num_bits=7)
+    for idx in [0, 1, 5, 64, 127]:
+        assert action_mapper.idx_to_bool_action(idx) == [bool(int(bit)) for bit in format(idx, '07b')]
+    with pytest.raises(ValueError):
+        action_mapper.idx_to_bool_action(128)
+
+
+@pytest.mark.parametrize('num_bits', [1, 3, 7, 10])
+def test_batch_encode_decode(num_bits):
+    action_mapper = ActionMapper(minVal=0, maxVal=2 ** num_bits - 1, num_bits=num_bits)
+    indices = np.random.default_rng(0).integers(0, 2 ** num_bits, size=(32,))
+    bool_actions = action_mapper.decode(indices)
+    assert bool_actions.shape == (32, num_bits) and bool_actions.dtype == bool
+    assert np.array_equal(bool_actions[0], [bool(int(bit)) for bit in format(indices[0], f'0{num_bits}b')])
+    assert np.array_equal(action_mapper.encode(bool_actions), indices)
+    assert np.array_equal(action_mapper.encode(action_mapper.bool_actions), np.arange(2 ** num_bits))
@@ -0,0 +1,82 @@
+import os
+import sys
+import time
+import uuid
+import subprocess
+import pytest
+from posix_ipc import Semaphore, O_CREAT
+from nsoran.base.waiter import SimulationWaiter
+from nsoran.base.local_sim import LOCAL_SIM_COMMAND
+from nsoran.base.options import EnvOptions, PoolOptions
+from nsoran.environments.ts_env import TrafficSteeringEnv
+
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def launch(tmp_path):
+    """Launch the local simulator with the semaphores created as done by NsOranEnv"""
+    launched = []
+
+    def launch(sim_time: float):
+        sim_path = tmp_path / str(uuid.uuid4())
+        sim_path.mkdir()
+        metrics = Semaphore('/sem_metrics_' + sim_path.name, O_CREAT, 0)
+        control = Semaphore('/sem_control_' + sim_path.name, O_CREAT, 0)
+        process = subprocess.Popen(LOCAL_SIM_COMMAND + ['--ues=1', f'--simTime={sim_time}', '--indicationPeriodicity=0.1'],
+                                   cwd=sim_path, env=dict(os.environ, PYTHONPATH=PACKAGE_ROOT),
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        waiter = SimulationWaiter(metrics, process)
+        launched.append((process, waiter, metrics, control))
+        return process, waiter, control
+
+    yield launch
+    for process, waiter, metrics, control in launched:
+        process.kill()
+        process.wait()
+        metrics.release()
+        waiter.close()
+        metrics.unlink()
+        control.unlink()
+
+
+def test_metrics_from_semaphore(launch):
+    process, waiter, control = launch(sim_time=0.2)
+    assert waiter.wait()
+    control.release()
+    assert waiter.wait()
+    control.release()
+    # The simulation is over after the last indication
+    assert not waiter.wait()
+    assert process.poll() == 0
+
+
+@pytest.mark.skipif(not hasattr(os, 'pidfd_open'), reason='pidfd is available on Linux only')
+def test_exit_detected_by_pidfd(launch):
+    process, waiter, _ = launch(sim_time=0.2)
+    assert waiter.pidfd is not None
+    assert waiter.wait()
+    process.kill()
+    start = time.perf_counter()
+    assert not waiter.wait()
+    # The exit is detected as soon as it happens, not at the next poll
+    assert time.perf_counter() - start < SimulationWaiter.POLL_INTERVAL
+
+
+def test_exit_detected_by_polling(launch, monkeypatch):
+    monkeypatch.delattr(os, 'pidfd_open', raising=False)
+    # No indication at all, the simulation exits right away
+    process, waiter, _ = launch(sim_time=0)
+    assert waiter.pidfd is None
+    assert not waiter.wait()
+    assert process.poll() == 0
+
+
+@pytest.mark.parametrize('pool_size', [0, 1])
+def test_reset_fails_when_the_simulation_exits(make_env, pool_size):
+    env = make_env(TrafficSteeringEnv, {'ues': [1]},
+                   EnvOptions(sim_command=[sys.executable, '-c', "import sys; sys.stderr.write('boom'); sys.exit(3)"],
+                              pool=PoolOptions(size=pool_size)))
+    with pytest.raises(RuntimeError, match='code 3 before its first metrics(.|\n)*boom'):
+        env.reset()
+    assert not env.is_open